@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .last_used import last_used_tracker
 from .models import APIKey, APIKeyUsage, RateLimitTracker
 
 
@@ -20,7 +21,7 @@ class APIKeyAdmin(admin.ModelAdmin):
         "id",
         "total_requests",
         "total_tokens",
-        "last_used",
+        "live_last_used",
         "created_at",
         "updated_at",
     ]
@@ -42,11 +43,15 @@ class APIKeyAdmin(admin.ModelAdmin):
         ),
         (
             "Usage Statistics",
-            {"fields": ("total_requests", "total_tokens", "last_used")},
+            {"fields": ("total_requests", "total_tokens", "live_last_used")},
         ),
         ("Timestamps", {"fields": ("created_at", "updated_at")}),
     )
 
+    @admin.display(description="Last used")
+    def live_last_used(self, obj):
+        return last_used_tracker.latest(obj)
+
 
 @admin.register(APIKeyUsage)
 class APIKeyUsageAdmin(admin.ModelAdmin):
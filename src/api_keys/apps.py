@@ -5,3 +5,6 @@ class ApiKeysConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api_keys"
     verbose_name = "API Keys"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,7 +1,8 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from .cache import api_key_cache
+from .last_used import last_used_tracker
 from .models import APIKey
-from datetime import datetime
 
 
 class APIKeyUser:
@@ -26,7 +27,7 @@ class APIKeyAuthentication(BaseAuthentication):
 
     keyword = "Bearer"
 
-    def authenticate(self, request):
+    def get_raw_key(self, request):
         auth_header = request.META.get("HTTP_AUTHORIZATION")
 
         if not auth_header:
@@ -37,22 +38,53 @@ class APIKeyAuthentication(BaseAuthentication):
         if len(auth_parts) != 2 or auth_parts[0] != self.keyword:
             return None
 
-        api_key_value = auth_parts[1]
-
-        try:
-            api_key = APIKey.objects.select_related("user").get(
-                key=api_key_value, status="active"
-            )
-        except APIKey.DoesNotExist:
-            raise AuthenticationFailed("Invalid API key")
+        return auth_parts[1]
 
+    def check_key(self, api_key):
         # Check if key is expired
         if not api_key.is_active:
             raise AuthenticationFailed("API key is expired or inactive")
 
-        # Update last used timestamp
-        api_key.last_used = datetime.now()
-        api_key.save(update_fields=["last_used"])
+    def authenticate(self, request):
+        api_key_value = self.get_raw_key(request)
+        if api_key_value is None:
+            return None
+
+        api_key = api_key_cache.get(api_key_value)
+        if api_key is None:
+            try:
+                api_key = APIKey.objects.select_related("user").get(
+                    key=api_key_value, status="active"
+                )
+            except APIKey.DoesNotExist:
+                raise AuthenticationFailed("Invalid API key")
+            api_key_cache.set(api_key_value, api_key)
+
+        self.check_key(api_key)
+
+        # Update last used timestamp (written back in coalesced batches)
+        last_used_tracker.touch(api_key)
+
+        return (APIKeyUser(api_key), api_key)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` for the ASGI views"""
+        api_key_value = self.get_raw_key(request)
+        if api_key_value is None:
+            return None
+
+        api_key = api_key_cache.get(api_key_value)
+        if api_key is None:
+            try:
+                api_key = await APIKey.objects.select_related("user").aget(
+                    key=api_key_value, status="active"
+                )
+            except APIKey.DoesNotExist:
+                raise AuthenticationFailed("Invalid API key")
+            api_key_cache.set(api_key_value, api_key)
+
+        self.check_key(api_key)
+        await last_used_tracker.atouch(api_key)
 
         return (APIKeyUser(api_key), api_key)
 
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def hash_key(raw_key):
+    """Hash a raw API key so plaintext keys are never used as cache keys"""
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+class APIKeyCache:
+    """
+    Per-process LRU cache of resolved ``APIKey`` objects with a TTL.
+
+    Entries are evicted by the model signals in ``api_keys.signals`` when a
+    key is saved or deleted in this process; other processes pick up the
+    change once the TTL expires.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return settings.API_KEY_CACHE_TTL > 0 and settings.API_KEY_CACHE_MAX_SIZE > 0
+
+    def get(self, raw_key):
+        if not self.enabled:
+            return None
+        digest = hash_key(raw_key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            api_key, expires = entry
+            if expires < time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return api_key
+
+    def set(self, raw_key, api_key):
+        if not self.enabled:
+            return
+        digest = hash_key(raw_key)
+        expires = time.monotonic() + settings.API_KEY_CACHE_TTL
+        with self._lock:
+            self._entries[digest] = (api_key, expires)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > settings.API_KEY_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def evict(self, raw_key):
+        with self._lock:
+            self._entries.pop(hash_key(raw_key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+api_key_cache = APIKeyCache()
@@ -0,0 +1,75 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from core.background import PeriodicWorker
+from .models import APIKey
+
+
+class LastUsedTracker:
+    """
+    Keeps ``APIKey.last_used`` in memory and writes it back at most once per
+    key every ``API_KEY_LAST_USED_INTERVAL`` seconds, with a single UPDATE
+    covering every key touched since the previous flush.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def touch(self, api_key, when=None):
+        when = when or timezone.now()
+        api_key.last_used = when
+
+        if settings.API_KEY_LAST_USED_INTERVAL <= 0:
+            APIKey.objects.filter(pk=api_key.pk).update(last_used=when)
+            return
+
+        with self._lock:
+            self._pending[api_key.pk] = when
+            if self._worker is None:
+                self._worker = PeriodicWorker(
+                    "last-used-flusher",
+                    self.flush,
+                    settings.API_KEY_LAST_USED_INTERVAL,
+                )
+        self._worker.start()
+
+    async def atouch(self, api_key):
+        if settings.API_KEY_LAST_USED_INTERVAL <= 0:
+            await sync_to_async(self.touch)(api_key)
+        else:
+            self.touch(api_key)
+
+    def latest(self, api_key):
+        """Return the most recent last_used known to this process"""
+        pending = self._pending.get(api_key.pk)
+        if pending and (not api_key.last_used or pending > api_key.last_used):
+            return pending
+        return api_key.last_used
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            APIKey.objects.filter(pk__in=pending.keys()).update(
+                last_used=Case(
+                    *[When(pk=pk, then=Value(when)) for pk, when in pending.items()],
+                    output_field=DateTimeField(),
+                )
+            )
+        except Exception:
+            # Keep the timestamps for the next flush unless newer ones arrived
+            with self._lock:
+                for pk, when in pending.items():
+                    self._pending.setdefault(pk, when)
+            raise
+
+
+last_used_tracker = LastUsedTracker()
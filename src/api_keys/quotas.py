@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from core.shared_table import open_slot_table
+
+QuotaStatus = namedtuple(
+    "QuotaStatus", ["allowed", "requests_limit", "requests_used", "tokens_limit", "tokens_used"]
+)
+
+SECONDS_PER_DAY = 86400
+
+
+def get_quota_limits(api_key):
+    """
+    Return ``(requests_per_day, tokens_per_day)`` for a key, ``None`` meaning
+    unlimited. The request limit is the lower of the key's own
+    ``requests_per_day`` and its plan's limit.
+    """
+    plan = settings.API_PLAN_QUOTAS.get(api_key.plan, {})
+    requests_limit = plan.get("requests_per_day")
+    if api_key.requests_per_day and (
+        requests_limit is None or api_key.requests_per_day < requests_limit
+    ):
+        requests_limit = api_key.requests_per_day
+    return requests_limit, plan.get("tokens_per_day")
+
+
+class DailyQuota:
+    """
+    Running per-key request and token counters for the current UTC day.
+
+    Counters live in the same kind of shared slot table as the rate limiter
+    and are reset lazily the first time a key is seen in a new day, so a
+    check is a constant-time lookup regardless of usage history.
+    """
+
+    def __init__(self):
+        self._table = None
+        self._setup_lock = threading.Lock()
+
+    def _setup(self):
+        with self._setup_lock:
+            if self._table is None:
+                self._table = open_slot_table(
+                    "quota",
+                    # day, requests, tokens
+                    fields=3,
+                    backend=settings.RATE_LIMIT_BACKEND,
+                    path=settings.QUOTA_SHARED_PATH,
+                    slots=settings.RATE_LIMIT_SHARED_SLOTS,
+                )
+
+    def _counters(self, api_key):
+        if self._table is None:
+            self._setup()
+        return self._table.record(api_key.pk)
+
+    @staticmethod
+    def _roll(counters):
+        today = time.time() // SECONDS_PER_DAY
+        if counters[0] != today:
+            counters[:] = [today, 0, 0]
+
+    def check(self, api_key):
+        """Count a new request, unless the key has used up today's quota"""
+        requests_limit, tokens_limit = get_quota_limits(api_key)
+        with self._counters(api_key) as counters:
+            self._roll(counters)
+            _, requests_used, tokens_used = counters
+            allowed = (requests_limit is None or requests_used < requests_limit) and (
+                tokens_limit is None or tokens_used < tokens_limit
+            )
+            if allowed:
+                counters[1] += 1
+        return QuotaStatus(
+            allowed=allowed,
+            requests_limit=requests_limit,
+            requests_used=int(counters[1]),
+            tokens_limit=tokens_limit,
+            tokens_used=int(counters[2]),
+        )
+
+    def add_tokens(self, api_key, tokens):
+        """Charge tokens to today's quota once they are known"""
+        if not tokens:
+            return
+        with self._counters(api_key) as counters:
+            self._roll(counters)
+            counters[2] += tokens
+
+
+daily_quota = DailyQuota()
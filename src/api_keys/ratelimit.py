@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.background import PeriodicWorker
+from core.shared_table import open_slot_table
+from .models import RateLimitTracker
+
+RateLimitStatus = namedtuple(
+    "RateLimitStatus", ["allowed", "limit", "remaining", "reset_seconds", "retry_after"]
+)
+
+
+def format_reset(seconds):
+    """Format a duration the way OpenAI's x-ratelimit-reset-* headers do"""
+    if seconds < 1:
+        return f"{int(seconds * 1000)}ms"
+    minutes, seconds = divmod(seconds, 60)
+    seconds = f"{seconds:.3f}".rstrip("0").rstrip(".")
+    if minutes:
+        return f"{int(minutes)}m{seconds}s"
+    return f"{seconds}s"
+
+
+class RequestRateLimiter:
+    """
+    Token bucket per API key holding ``requests_per_minute`` tokens and
+    refilling continuously at ``requests_per_minute / 60`` tokens a second.
+
+    Buckets live in a slot table shared by the workers on this host (see
+    ``core.shared_table``), so a check never touches the database. Accepted
+    requests are also counted per minute in memory and periodically added
+    to ``RateLimitTracker`` for reporting.
+    """
+
+    def __init__(self):
+        self._table = None
+        self._setup_lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._counts_lock = threading.Lock()
+        self._worker = None
+
+    def _setup(self):
+        with self._setup_lock:
+            if self._table is None:
+                self._worker = PeriodicWorker(
+                    "rate-limit-snapshots",
+                    self.snapshot,
+                    settings.RATE_LIMIT_SNAPSHOT_INTERVAL,
+                )
+                self._table = open_slot_table(
+                    "ratelimit",
+                    fields=2,
+                    backend=settings.RATE_LIMIT_BACKEND,
+                    path=settings.RATE_LIMIT_SHARED_PATH,
+                    slots=settings.RATE_LIMIT_SHARED_SLOTS,
+                )
+
+    def check(self, api_key):
+        if self._table is None:
+            self._setup()
+
+        limit = max(api_key.requests_per_minute, 1)
+        rate = limit / 60.0
+        now = time.time()
+
+        with self._table.record(api_key.pk) as bucket:
+            tokens, refilled_at = bucket
+            if refilled_at == 0:
+                tokens = limit
+            else:
+                tokens = min(limit, tokens + (now - refilled_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            bucket[0], bucket[1] = tokens, now
+
+        if allowed:
+            self._count(api_key, now)
+        self._worker.start()
+
+        return RateLimitStatus(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            reset_seconds=(limit - tokens) / rate,
+            retry_after=0 if allowed else (1 - tokens) / rate,
+        )
+
+    def _count(self, api_key, now):
+        window_start = int(now // 60) * 60
+        with self._counts_lock:
+            self._counts[(api_key.pk, window_start)] += 1
+
+    def snapshot(self):
+        """Add the per-minute counts seen since the last snapshot to the database"""
+        with self._counts_lock:
+            counts, self._counts = self._counts, defaultdict(int)
+
+        for (api_key_id, window_start), requests in counts.items():
+            lookup = {
+                "api_key_id": api_key_id,
+                "window_type": "minute",
+                "window_start": datetime.fromtimestamp(window_start, dt_timezone.utc),
+            }
+            increment = {"requests_count": F("requests_count") + requests}
+            if RateLimitTracker.objects.filter(**lookup).update(**increment):
+                continue
+            try:
+                with transaction.atomic():
+                    RateLimitTracker.objects.create(requests_count=requests, **lookup)
+            except IntegrityError:
+                # Another worker created the row first
+                RateLimitTracker.objects.filter(**lookup).update(**increment)
+
+
+rate_limiter = RequestRateLimiter()
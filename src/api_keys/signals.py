@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import api_key_cache
+from .models import APIKey
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def evict_cached_api_key(sender, instance, **kwargs):
+    """Drop a key from the auth cache when it is edited, toggled or deleted"""
+    if instance.key:
+        api_key_cache.evict(instance.key)
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from ..models import APIKey
+from ..quotas import SECONDS_PER_DAY, DailyQuota, get_quota_limits
+
+
+@override_settings(
+    API_PLAN_QUOTAS={"free": {"requests_per_day": 5, "tokens_per_day": 100}}
+)
+class DailyQuotaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            RATE_LIMIT_BACKEND="shared",
+            QUOTA_SHARED_PATH=os.path.join(directory, "quota.tbl"),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create(username="owner")
+        self.key = APIKey.objects.create(
+            user=user, name="test", plan="free", requests_per_day=2
+        )
+        # Late in a UTC day
+        self.now = 20000 * SECONDS_PER_DAY + SECONDS_PER_DAY - 1
+        clock = mock.patch("api_keys.quotas.time.time", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.quota = DailyQuota()
+
+    def test_key_limit_lowers_the_plan_limit(self):
+        self.assertEqual(get_quota_limits(self.key), (2, 100))
+        self.key.requests_per_day = 50
+        self.assertEqual(get_quota_limits(self.key), (5, 100))
+
+    def test_requests_are_limited_until_the_next_day(self):
+        statuses = [self.quota.check(self.key) for _ in range(3)]
+        self.assertEqual([s.allowed for s in statuses], [True, True, False])
+        self.assertEqual(statuses[-1].requests_used, 2)
+
+        self.now += 1
+        status = self.quota.check(self.key)
+        self.assertTrue(status.allowed)
+        self.assertEqual(status.requests_used, 1)
+
+    def test_tokens_are_limited_until_the_next_day(self):
+        self.assertTrue(self.quota.check(self.key).allowed)
+        self.quota.add_tokens(self.key, 100)
+        status = self.quota.check(self.key)
+        self.assertFalse(status.allowed)
+        self.assertEqual(status.tokens_used, 100)
+
+        self.now += 1
+        # Tokens charged for yesterday's request are not carried over
+        self.quota.add_tokens(self.key, 10)
+        status = self.quota.check(self.key)
+        self.assertTrue(status.allowed)
+        self.assertEqual((status.requests_used, status.tokens_used), (1, 10))
+
+    def test_workers_share_counters(self):
+        other = DailyQuota()
+        self.assertTrue(self.quota.check(self.key).allowed)
+        self.assertTrue(other.check(self.key).allowed)
+        self.assertFalse(self.quota.check(self.key).allowed)
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from ..models import APIKey, RateLimitTracker
+from ..ratelimit import RequestRateLimiter, format_reset
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            RATE_LIMIT_BACKEND="shared",
+            RATE_LIMIT_SHARED_PATH=os.path.join(directory, "ratelimit.tbl"),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create(username="owner")
+        self.key = APIKey.objects.create(user=user, name="test", requests_per_minute=3)
+        self.now = 1_000_000.0
+        clock = mock.patch("api_keys.ratelimit.time.time", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def limiter(self):
+        limiter = RequestRateLimiter()
+        self.addCleanup(lambda: limiter._worker and limiter._worker.stop())
+        return limiter
+
+    def test_bucket_empties_and_refills(self):
+        limiter = self.limiter()
+        statuses = [limiter.check(self.key) for _ in range(4)]
+        self.assertEqual([s.allowed for s in statuses], [True, True, True, False])
+        self.assertEqual(statuses[2].remaining, 0)
+        # One token comes back every 60 / 3 seconds
+        self.assertAlmostEqual(statuses[3].retry_after, 20)
+
+        self.now += 20
+        self.assertTrue(limiter.check(self.key).allowed)
+        self.assertFalse(limiter.check(self.key).allowed)
+
+    def test_workers_share_buckets(self):
+        # Two limiters map the same file, as two worker processes do
+        first, second = self.limiter(), self.limiter()
+        self.assertTrue(first.check(self.key).allowed)
+        self.assertTrue(second.check(self.key).allowed)
+        self.assertTrue(first.check(self.key).allowed)
+        self.assertFalse(second.check(self.key).allowed)
+
+    def test_accepted_requests_are_snapshotted_per_minute(self):
+        limiter = self.limiter()
+        for _ in range(5):
+            limiter.check(self.key)
+        limiter.snapshot()
+        limiter.snapshot()
+        tracker = RateLimitTracker.objects.get(api_key=self.key)
+        self.assertEqual(tracker.requests_count, 3)
+
+    def test_format_reset(self):
+        self.assertEqual(format_reset(0.25), "250ms")
+        self.assertEqual(format_reset(6.5), "6.5s")
+        self.assertEqual(format_reset(90), "1m30s")
@@ -0,0 +1,65 @@
+import uuid
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from ..models import APIKey, APIKeyUsage
+from ..usage import UsageBuffer
+
+
+@override_settings(
+    USAGE_BUFFER_MAX_SIZE=2, USAGE_FLUSH_BATCH_SIZE=100, USAGE_FLUSH_INTERVAL=60
+)
+class UsageBufferTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="owner")
+        self.key = APIKey.objects.create(user=user, name="test")
+        self.buffer = UsageBuffer()
+
+    def tearDown(self):
+        if self.buffer._worker is not None:
+            self.buffer._worker.stop()
+
+    def usage(self, tokens=1):
+        return APIKeyUsage(
+            api_key=self.key,
+            endpoint="embeddings",
+            model="text-embedding-3-small",
+            total_tokens=tokens,
+            request_id=str(uuid.uuid4()),
+            response_time_ms=1,
+            status_code=200,
+        )
+
+    def test_records_are_written_on_flush(self):
+        for _ in range(2):
+            self.buffer.record(self.usage(tokens=5))
+        self.assertFalse(APIKeyUsage.objects.exists())
+        self.buffer.flush()
+        self.key.refresh_from_db()
+        self.assertEqual((self.key.total_requests, self.key.total_tokens), (2, 10))
+        self.assertEqual(APIKeyUsage.objects.count(), 2)
+
+    def test_full_queue_is_flushed_inline(self):
+        for _ in range(3):
+            async_to_sync(self.buffer.arecord)(self.usage())
+        # The third record found the queue full and flushed the first two
+        self.assertEqual(APIKeyUsage.objects.count(), 2)
+        self.buffer.flush()
+        self.assertEqual(APIKeyUsage.objects.count(), 3)
+
+    def test_queue_refilled_during_the_flush_writes_directly(self):
+        for _ in range(2):
+            self.buffer.record(self.usage())
+
+        def flush_while_others_record():
+            UsageBuffer.flush(self.buffer)
+            for _ in range(2):
+                self.buffer._queue.put_nowait(self.usage())
+
+        with mock.patch.object(self.buffer, "flush", flush_while_others_record):
+            async_to_sync(self.buffer.arecord)(self.usage())
+        self.assertEqual(APIKeyUsage.objects.count(), 3)
+        self.assertEqual(self.buffer._queue.qsize(), 2)
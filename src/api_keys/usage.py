@@ -0,0 +1,123 @@
+import queue
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.background import PeriodicWorker
+from .models import APIKey, APIKeyUsage
+
+
+def write_usage(records):
+    """
+    Persist a batch of unsaved ``APIKeyUsage`` records with one INSERT and
+    fold their counters into a single UPDATE per API key.
+    """
+    if not records:
+        return
+
+    totals = defaultdict(lambda: [0, 0])
+    for record in records:
+        totals[record.api_key_id][0] += 1
+        totals[record.api_key_id][1] += record.total_tokens
+
+    with transaction.atomic():
+        APIKeyUsage.objects.bulk_create(records)
+        for api_key_id, (requests, tokens) in totals.items():
+            APIKey.objects.filter(pk=api_key_id).update(
+                total_requests=F("total_requests") + requests,
+                total_tokens=F("total_tokens") + tokens,
+            )
+
+
+class UsageBuffer:
+    """
+    Write-behind buffer for usage records.
+
+    Records are queued in memory and written by a background thread when
+    ``USAGE_FLUSH_BATCH_SIZE`` records are waiting or every
+    ``USAGE_FLUSH_INTERVAL`` seconds, whichever comes first. When the queue
+    is full the caller flushes inline rather than dropping records.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._worker = None
+        self._flush_lock = threading.Lock()
+        self._setup_lock = threading.Lock()
+
+    def _setup(self):
+        with self._setup_lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=settings.USAGE_BUFFER_MAX_SIZE)
+                self._worker = PeriodicWorker(
+                    "usage-flusher", self.flush, settings.USAGE_FLUSH_INTERVAL
+                )
+
+    def record(self, usage):
+        if self._queue is None:
+            self._setup()
+        self._worker.start()
+        try:
+            self._queue.put_nowait(usage)
+        except queue.Full:
+            self.flush()
+            self._queue.put(usage)
+        if self._queue.qsize() >= settings.USAGE_FLUSH_BATCH_SIZE:
+            self._worker.wake()
+
+    async def arecord(self, usage):
+        """Like ``record`` but never blocks the event loop on a full queue"""
+        if self._queue is None:
+            self._setup()
+        self._worker.start()
+        try:
+            self._queue.put_nowait(usage)
+        except queue.Full:
+            await sync_to_async(self.flush)()
+            try:
+                self._queue.put_nowait(usage)
+            except queue.Full:
+                # Other requests refilled the queue during the flush
+                await sync_to_async(write_usage)([usage])
+                return
+        if self._queue.qsize() >= settings.USAGE_FLUSH_BATCH_SIZE:
+            self._worker.wake()
+
+    def flush(self):
+        """Write every queued record, in batches of ``USAGE_FLUSH_BATCH_SIZE``"""
+        if self._queue is None:
+            return
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < settings.USAGE_FLUSH_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                write_usage(batch)
+
+
+usage_buffer = UsageBuffer()
+
+
+def record_usage(usage):
+    """Store a usage record according to ``USAGE_LOGGING_MODE``"""
+    if settings.USAGE_LOGGING_MODE == "buffered":
+        usage_buffer.record(usage)
+    else:
+        write_usage([usage])
+
+
+async def arecord_usage(usage):
+    """Async counterpart of ``record_usage``"""
+    if settings.USAGE_LOGGING_MODE == "buffered":
+        await usage_buffer.arecord(usage)
+    else:
+        await sync_to_async(write_usage)([usage])
@@ -0,0 +1,125 @@
+import atexit
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+# Every PeriodicWorker created in this process, for stop_workers()
+_workers = weakref.WeakSet()
+
+
+class PeriodicWorker:
+    """
+    Daemon thread that runs ``target`` every ``interval`` seconds, or sooner
+    when woken. The thread is started lazily and restarted after a fork, so
+    it is safe to create instances at import time under gunicorn. ``target``
+    runs one last time when the process exits.
+    """
+
+    def __init__(self, name, target, interval):
+        self.name = name
+        self.target = target
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        _workers.add(self)
+
+    def start(self):
+        """Start the thread if it is not running in this process"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._wakeup.clear()
+            self._stopping.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def wake(self):
+        """Run ``target`` as soon as possible instead of waiting for the interval"""
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=10):
+        """Stop the thread and run ``target`` a final time"""
+        thread = self._thread
+        if thread and thread.is_alive() and self._pid == os.getpid():
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join(timeout)
+        self._run_target()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            self._run_target()
+
+    def _run_target(self):
+        close_old_connections()
+        try:
+            self.target()
+        except Exception as e:
+            # Keep the worker alive; the next run will retry
+            print(f"Error in background worker {self.name}: {e}")
+
+
+def stop_workers():
+    """
+    Stop every periodic worker now instead of at exit, so their final runs
+    happen while the database they write to still exists (the test runner
+    calls this before destroying the test database).
+    """
+    for worker in list(_workers):
+        worker.stop()
+
+
+class WorkerPool:
+    """
+    Thread pool for background jobs, created lazily and recreated after a
+    fork like ``PeriodicWorker``. Jobs get fresh database connections and
+    their exceptions are printed instead of being lost in a future.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix=self.name
+                    )
+                    self._pid = os.getpid()
+        return self._executor.submit(self._run, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+    def _run(self, fn, *args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Error in background job {self.name}: {e}")
+        finally:
+            close_old_connections()
@@ -0,0 +1,140 @@
+"""
+Fixed-size tables of per-key counters that can be shared between worker
+processes.
+
+``SharedSlotTable`` keeps its records in a memory-mapped file (on tmpfs when
+available) and serializes access with ``fcntl`` byte-range locks, so every
+gunicorn worker on a host sees the same values without a database round
+trip. ``LocalSlotTable`` offers the same interface inside one process and
+is used where ``fcntl`` is not available.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b"OAMT"
+HEADER = struct.Struct("<4sII")
+PROBE = 8
+
+
+def key_digest(key):
+    return hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+
+
+def default_table_path(name):
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"openai_mock_{name}.tbl")
+
+
+class LocalSlotTable:
+    """Per-process table; ``record`` yields a mutable list of floats"""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._records = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def record(self, key):
+        with self._lock:
+            values = self._records.setdefault(key, [0.0] * self.fields)
+            yield values
+
+    def items(self):
+        with self._lock:
+            return [(key, list(values)) for key, values in self._records.items()]
+
+
+class SharedSlotTable:
+    """
+    Open-addressing hash table of ``fields`` doubles per key in a shared
+    file. A key probes ``PROBE`` consecutive slots; when all are taken by
+    other keys the least recently updated one is reused.
+    """
+
+    def __init__(self, path, fields, slots=4096):
+        if fcntl is None:
+            raise RuntimeError("SharedSlotTable requires fcntl")
+        self.path = path
+        self.fields = fields
+        self.slots = slots
+        # key digest, last update time, values
+        self._struct = struct.Struct(f"<16sd{fields}d")
+        self._size = HEADER.size + self._struct.size * (slots + PROBE)
+        self._thread_lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, HEADER.size, 0)
+            expected = HEADER.pack(MAGIC, self._struct.size, self.slots)
+            if header != expected:
+                # New file or a layout from another version: start over
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+                os.pwrite(fd, expected, 0)
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self._size)
+        except Exception:
+            os.close(fd)
+            raise
+
+    def _offset(self, slot):
+        return HEADER.size + slot * self._struct.size
+
+    @contextmanager
+    def record(self, key):
+        digest = key_digest(key)
+        first = int.from_bytes(digest[:8], "little") % self.slots
+        start = self._offset(first)
+        length = self._struct.size * PROBE
+
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+            try:
+                slot, values = self._find(digest, first)
+                yield values
+                self._struct.pack_into(
+                    self._map, self._offset(slot), digest, time.time(), *values
+                )
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _find(self, digest, first):
+        empty = b"\0" * 16
+        oldest = None
+        for slot in range(first, first + PROBE):
+            stored, updated, *values = self._struct.unpack_from(
+                self._map, self._offset(slot)
+            )
+            if stored == digest:
+                return slot, values
+            if stored == empty:
+                return slot, [0.0] * self.fields
+            if oldest is None or updated < oldest[1]:
+                oldest = (slot, updated)
+        return oldest[0], [0.0] * self.fields
+
+
+def open_slot_table(name, fields, backend, path=None, slots=4096):
+    """
+    Return a shared table when ``backend`` is "shared" and the platform
+    supports it, otherwise a process-local one.
+    """
+    if backend == "shared" and fcntl is not None:
+        return SharedSlotTable(path or default_table_path(name), fields, slots)
+    return LocalSlotTable(fields)
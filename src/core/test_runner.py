@@ -0,0 +1,11 @@
+from django.test.runner import DiscoverRunner
+
+from .background import stop_workers
+
+
+class TestRunner(DiscoverRunner):
+    """Flushes the background workers before the test databases are dropped"""
+
+    def teardown_databases(self, old_config, **kwargs):
+        stop_workers()
+        super().teardown_databases(old_config, **kwargs)
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+
+from openai_api.vector_search.ingest import delete_entries
 from .models import StoredFile
-from .models import VectorStore, VectorEntry
+from .models import VectorStore, VectorEntry, VectorStoreFile
 
 
 @admin.register(StoredFile)
@@ -19,3 +22,31 @@ class VectorStoreAdmin(admin.ModelAdmin):
 class VectorEntryAdmin(admin.ModelAdmin):
     list_display = ("document_name", "vector_store", "created_at")
     search_fields = ("document_name", "vector_store__name")
+
+    # Entries carry no signals, so every change bumps its store's version
+    # here, once per save or bulk delete
+    def get_readonly_fields(self, request, obj=None):
+        # Moving an entry would change two stores at once
+        return ("vector_store", "file") if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            obj.version = VectorStore.bump_version(
+                obj.vector_store_id, 0 if change else len(obj.embedding or b"")
+            )
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        delete_entries(obj.vector_store_id, VectorEntry.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        store_pks = queryset.values_list("vector_store_id", flat=True).distinct()
+        for store_pk in list(store_pks):
+            delete_entries(store_pk, queryset.filter(vector_store_id=store_pk))
+
+
+@admin.register(VectorStoreFile)
+class VectorStoreFileAdmin(admin.ModelAdmin):
+    list_display = ("file", "vector_store", "status", "created_at")
+    list_filter = ("status",)
+    search_fields = ("file__name", "vector_store__name")
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from api_keys.models import APIKey
+from openai_api.vector_search.ivf import common_dimensions
 from .models import VectorStore, VectorEntry
 
 
@@ -75,10 +76,41 @@ class APIKeyForm(forms.ModelForm):
 class VectorStoreForm(forms.ModelForm):
     class Meta:
         model = VectorStore
-        fields = ["name", "description"]
+        fields = ["name", "description", "index_type", "index_nprobe", "quantization"]
 
 
 class VectorEntryForm(forms.ModelForm):
+    embedding = forms.JSONField(help_text="A JSON list of floats, e.g. [0.12, -0.08, 0.33]")
+
     class Meta:
         model = VectorEntry
-        fields = ["document_name", "embedding", "metadata"]
+        fields = ["document_name", "metadata"]
+
+    def __init__(self, *args, store=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = store
+
+    def clean_embedding(self):
+        embedding = self.cleaned_data["embedding"]
+        if (
+            not isinstance(embedding, list)
+            or not embedding
+            or not all(
+                isinstance(value, (int, float)) and not isinstance(value, bool)
+                for value in embedding
+            )
+        ):
+            raise forms.ValidationError("Embedding must be a non-empty list of numbers.")
+        if self.store is not None:
+            # Entries of another size could never be searched
+            dimensions = common_dimensions(self.store.entries.all())
+            if dimensions and len(embedding) != dimensions:
+                raise forms.ValidationError(
+                    f"Embedding has {len(embedding)} dimensions, "
+                    f"the vector store uses {dimensions}."
+                )
+        return embedding
+
+    def save(self, commit=True):
+        self.instance.vector = self.cleaned_data["embedding"]
+        return super().save(commit)
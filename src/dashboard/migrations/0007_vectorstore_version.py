@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_alter_storedfile_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_vectorstore_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='index_nprobe',
+            field=models.PositiveIntegerField(default=8),
+        ),
+        migrations.AddField(
+            model_name='vectorstore',
+            name='index_type',
+            field=models.CharField(choices=[('flat', 'Flat (exact)'), ('ivf', 'IVF (approximate)')], default='flat', max_length=10),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations, models
+import numpy as np
+
+
+BATCH_SIZE = 1000
+
+
+def pack_embeddings(apps, schema_editor):
+    VectorEntry = apps.get_model("dashboard", "VectorEntry")
+    batch = []
+    for entry in VectorEntry.objects.only("pk", "embedding").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        values = entry.embedding if isinstance(entry.embedding, list) else []
+        vector = np.asarray(values, dtype="<f4").ravel()
+        entry.embedding_packed = vector.tobytes()
+        entry.dimensions = len(vector)
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            VectorEntry.objects.bulk_update(batch, ["embedding_packed", "dimensions"])
+            batch = []
+    VectorEntry.objects.bulk_update(batch, ["embedding_packed", "dimensions"])
+
+
+def unpack_embeddings(apps, schema_editor):
+    VectorEntry = apps.get_model("dashboard", "VectorEntry")
+    batch = []
+    for entry in VectorEntry.objects.only("pk", "embedding_packed").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        entry.embedding = np.frombuffer(
+            entry.embedding_packed, dtype="<f4"
+        ).tolist()
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            VectorEntry.objects.bulk_update(batch, ["embedding"])
+            batch = []
+    VectorEntry.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0008_vectorstore_index"),
+    ]
+
+    operations = [
+        # Nullable so the column can be restored when migrating backwards
+        migrations.AlterField(
+            model_name="vectorentry",
+            name="embedding",
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name="vectorentry",
+            name="embedding_packed",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.AddField(
+            model_name="vectorentry",
+            name="dimensions",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(pack_embeddings, unpack_embeddings),
+        migrations.RemoveField(
+            model_name="vectorentry",
+            name="embedding",
+        ),
+        migrations.RenameField(
+            model_name="vectorentry",
+            old_name="embedding_packed",
+            new_name="embedding",
+        ),
+        migrations.AlterField(
+            model_name="vectorentry",
+            name="embedding",
+            field=models.BinaryField(),
+        ),
+    ]
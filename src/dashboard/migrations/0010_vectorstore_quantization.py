@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_vectorentry_binary_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='quantization',
+            field=models.CharField(choices=[('none', 'None (float32)'), ('int8', 'Scalar int8 with rescoring')], default='none', max_length=10),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_vectorstore_quantization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorStoreFileBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('in_progress', 'In progress'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='in_progress', max_length=20)),
+                ('vector_store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_batches', to='dashboard.vectorstore')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='VectorStoreFile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('in_progress', 'In progress'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='in_progress', max_length=20)),
+                ('last_error', models.TextField(blank=True)),
+                ('attributes', models.JSONField(blank=True, null=True)),
+                ('chunking_strategy', models.JSONField(blank=True, null=True)),
+                ('usage_bytes', models.PositiveBigIntegerField(default=0)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='dashboard.vectorstorefilebatch')),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vector_store_files', to='dashboard.storedfile')),
+                ('vector_store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='dashboard.vectorstore')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vectorentry',
+            name='file',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='dashboard.vectorstorefile'),
+        ),
+        migrations.AddConstraint(
+            model_name='vectorstorefile',
+            constraint=models.UniqueConstraint(fields=('vector_store', 'file'), name='unique_vector_store_file'),
+        ),
+    ]
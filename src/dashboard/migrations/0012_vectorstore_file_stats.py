@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+STATUSES = ["in_progress", "completed", "failed", "cancelled"]
+
+
+def compute_file_stats(apps, schema_editor):
+    VectorStore = apps.get_model("dashboard", "VectorStore")
+    VectorStoreFile = apps.get_model("dashboard", "VectorStoreFile")
+    stats = VectorStoreFile.objects.values("vector_store").annotate(
+        usage=Sum("usage_bytes"),
+        **{status: Count("pk", filter=Q(status=status)) for status in STATUSES},
+    )
+    for row in stats:
+        VectorStore.objects.filter(pk=row["vector_store"]).update(
+            usage_bytes=row["usage"] or 0,
+            **{f"files_{status}": row[status] for status in STATUSES},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_vector_store_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='files_cancelled',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vectorstore',
+            name='files_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vectorstore',
+            name='files_failed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vectorstore',
+            name='files_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vectorstore',
+            name='usage_bytes',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_file_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_vectorstore_file_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='deleting',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
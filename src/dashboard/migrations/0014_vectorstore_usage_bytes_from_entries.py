@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+
+def compute_usage_bytes(apps, schema_editor):
+    """usage_bytes now counts the stored embeddings of every entry"""
+    VectorStore = apps.get_model("dashboard", "VectorStore")
+    VectorEntry = apps.get_model("dashboard", "VectorEntry")
+    VectorStore.objects.update(usage_bytes=0)
+    sizes = VectorEntry.objects.values("vector_store").annotate(
+        size=Sum(Length("embedding"))
+    )
+    for row in sizes:
+        VectorStore.objects.filter(pk=row["vector_store"]).update(
+            usage_bytes=row["size"] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_vectorstore_deleting'),
+    ]
+
+    operations = [
+        migrations.RunPython(compute_usage_bytes, migrations.RunPython.noop),
+    ]
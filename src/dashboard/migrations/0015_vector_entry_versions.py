@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_vectorstore_usage_bytes_from_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorEntryDeletion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('version', models.PositiveBigIntegerField()),
+                ('entry_ids', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vectorentry',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='vectorentry',
+            index=models.Index(fields=['vector_store', 'version'], name='dashboard_v_vector__494495_idx'),
+        ),
+        migrations.AddField(
+            model_name='vectorentrydeletion',
+            name='vector_store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_deletions', to='dashboard.vectorstore'),
+        ),
+        migrations.AddIndex(
+            model_name='vectorentrydeletion',
+            index=models.Index(fields=['vector_store', 'version'], name='dashboard_v_vector__86726d_idx'),
+        ),
+    ]
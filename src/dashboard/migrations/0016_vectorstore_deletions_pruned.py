@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0015_vector_entry_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vectorstore',
+            name='deletions_pruned',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
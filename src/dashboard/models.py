@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from core.models.base import UUIDTimeStampedModel
+import numpy as np
 import os
 import uuid
 
@@ -35,24 +36,205 @@ class StoredFile(UUIDTimeStampedModel):
         return str(self.id)
 
 
+def pack_embedding(values):
+    """Return ``(bytes, dimensions)`` for a list or array of floats"""
+    vector = np.asarray(values, dtype="<f4").ravel()
+    return vector.tobytes(), len(vector)
+
+
 class VectorStore(UUIDTimeStampedModel):
+    INDEX_CHOICES = [
+        ("flat", "Flat (exact)"),
+        ("ivf", "IVF (approximate)"),
+    ]
+    QUANTIZATION_CHOICES = [
+        ("none", "None (float32)"),
+        ("int8", "Scalar int8 with rescoring"),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="vector_stores"
     )
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    # Bumped once per entry write or delete (see bump_version) so cached
+    # search data built from an older version can be detected
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    # VectorEntryDeletion rows up to this version have been removed, so
+    # search data older than it cannot catch up and is rebuilt instead
+    deletions_pruned = models.PositiveBigIntegerField(default=0, editable=False)
+    index_type = models.CharField(max_length=10, choices=INDEX_CHOICES, default="flat")
+    # Inverted lists scanned per IVF query: higher is slower but more accurate
+    index_nprobe = models.PositiveIntegerField(default=8)
+    # Pick exact-search candidates from int8 codes, then rescore with float32
+    quantization = models.CharField(
+        max_length=10, choices=QUANTIZATION_CHOICES, default="none"
+    )
+    # Materialized so stores can be listed without aggregating their entries
+    # and files. usage_bytes is the size of the stored embeddings, kept
+    # current by the entry write paths (vector_search/ingest.py); change the
+    # file counts only through adjust_file_stats.
+    usage_bytes = models.PositiveBigIntegerField(default=0, editable=False)
+    files_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    files_completed = models.PositiveIntegerField(default=0, editable=False)
+    files_failed = models.PositiveIntegerField(default=0, editable=False)
+    files_cancelled = models.PositiveIntegerField(default=0, editable=False)
+    # Set when the store is deleted; its entries are removed in the
+    # background and the store is hidden until the row itself is gone
+    deleting = models.BooleanField(default=False, editable=False)
+
+    @classmethod
+    def bump_version(cls, pk, usage_bytes=0):
+        """
+        Increment the version of store ``pk``, add ``usage_bytes`` (the
+        embedding bytes written, negative for deletes) and return the new
+        version. Call it once per write or delete of the store's entries,
+        in the same transaction and before touching them, so that
+        concurrent writers to one store take turns on its row.
+        """
+        updates = {"version": models.F("version") + 1}
+        if usage_bytes:
+            updates["usage_bytes"] = models.F("usage_bytes") + usage_bytes
+        cls.objects.filter(pk=pk).update(**updates)
+        return cls.objects.values_list("version", flat=True).get(pk=pk)
+
+    @classmethod
+    def adjust_file_stats(cls, pk, **statuses):
+        """
+        Add deltas to the file counts of store ``pk`` in one UPDATE, e.g.
+        ``adjust_file_stats(pk, in_progress=-1, completed=1)``. Call it in
+        the transaction that changes the files.
+        """
+        updates = {
+            f"files_{status}": models.F(f"files_{status}") + delta
+            for status, delta in statuses.items()
+            if delta
+        }
+        if updates:
+            cls.objects.filter(pk=pk).update(**updates)
+
+    @property
+    def file_counts(self):
+        counts = {
+            status: getattr(self, f"files_{status}")
+            for status, _ in VectorStoreFileBatch.STATUS_CHOICES
+        }
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def __str__(self):
+        return str(self.id)
+
+
+class VectorStoreFileBatch(UUIDTimeStampedModel):
+    STATUS_CHOICES = [
+        ("in_progress", "In progress"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+        ("cancelled", "Cancelled"),
+    ]
+
+    vector_store = models.ForeignKey(
+        VectorStore, on_delete=models.CASCADE, related_name="file_batches"
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="in_progress"
+    )
 
     def __str__(self):
         return str(self.id)
 
 
+class VectorStoreFile(UUIDTimeStampedModel):
+    """A stored file attached to a vector store and its ingestion status"""
+
+    STATUS_CHOICES = VectorStoreFileBatch.STATUS_CHOICES
+
+    vector_store = models.ForeignKey(
+        VectorStore, on_delete=models.CASCADE, related_name="files"
+    )
+    file = models.ForeignKey(
+        StoredFile, on_delete=models.CASCADE, related_name="vector_store_files"
+    )
+    batch = models.ForeignKey(
+        VectorStoreFileBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="files",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="in_progress"
+    )
+    last_error = models.TextField(blank=True)
+    attributes = models.JSONField(blank=True, null=True)
+    chunking_strategy = models.JSONField(blank=True, null=True)
+    # Bytes of chunk text stored for this file
+    usage_bytes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vector_store", "file"], name="unique_vector_store_file"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.file.name} in {self.vector_store.name}"
+
+
 class VectorEntry(UUIDTimeStampedModel):
     vector_store = models.ForeignKey(
         VectorStore, on_delete=models.CASCADE, related_name="entries"
     )
+    # Set for chunks produced from an attached file
+    file = models.ForeignKey(
+        VectorStoreFile,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="entries",
+    )
     document_name = models.CharField(max_length=255)
-    embedding = models.JSONField()  # Store as list of floats (vector)
+    # Packed little-endian float32 values; read and write through ``vector``
+    embedding = models.BinaryField()
+    dimensions = models.PositiveIntegerField(default=0, editable=False)
     metadata = models.JSONField(blank=True, null=True)
+    # Store version of the change that last wrote the row, so search data
+    # synced up to some version only has to read the rows written after it
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["vector_store", "version"])]
+
+    @property
+    def vector(self):
+        """The embedding as a read-only float32 array"""
+        return np.frombuffer(self.embedding, dtype="<f4")
+
+    @vector.setter
+    def vector(self, values):
+        self.embedding, self.dimensions = pack_embedding(values)
 
     def __str__(self):
         return f"{self.document_name} in {self.vector_store.name}"
+
+
+class VectorEntryDeletion(UUIDTimeStampedModel):
+    """
+    Ids of the entries removed by one delete, recorded so search data can
+    drop them without comparing its ids against the whole store. Rows are
+    removed once the store's saved search data has applied them (see
+    ``prune_deletions``).
+    """
+
+    vector_store = models.ForeignKey(
+        VectorStore, on_delete=models.CASCADE, related_name="entry_deletions"
+    )
+    # Store version of the delete
+    version = models.PositiveBigIntegerField()
+    # The deleted entries' UUIDs as concatenated 16-byte values
+    entry_ids = models.BinaryField()
+
+    class Meta:
+        indexes = [models.Index(fields=["vector_store", "version"])]
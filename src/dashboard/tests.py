@@ -0,0 +1,45 @@
+import json
+
+from django.urls import reverse
+
+from dashboard.models import VectorEntry
+from openai_api.tests.base import VectorStoreTestCase
+
+
+class VectorEntryCreateViewTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_entries(self.store, self.random_vectors(3))
+        self.client.force_login(self.user)
+        self.url = reverse("add_vector_entry", kwargs={"store_pk": self.store.pk})
+
+    def post(self, embedding):
+        return self.client.post(
+            self.url,
+            {
+                "document_name": "new",
+                "embedding": json.dumps(embedding),
+                "metadata": "null",
+            },
+        )
+
+    def test_entry_of_the_store_dimensions_is_added(self):
+        response = self.post([0.5] * self.dimensions)
+        self.assertRedirects(
+            response, reverse("vector_store_detail", kwargs={"pk": self.store.pk})
+        )
+        self.assertTrue(VectorEntry.objects.filter(document_name="new").exists())
+
+    def test_entry_of_other_dimensions_is_rejected(self):
+        usage_bytes = self.store.usage_bytes
+        response = self.post([0.5, 0.1, 0.2])
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context["form"],
+            "embedding",
+            "Embedding has 3 dimensions, the vector store uses 8.",
+        )
+        self.assertContains(response, "the vector store uses 8")
+        self.assertFalse(VectorEntry.objects.filter(document_name="new").exists())
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.usage_bytes, usage_bytes)
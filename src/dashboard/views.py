@@ -7,7 +7,10 @@ from django.contrib import messages
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
 from datetime import timedelta
+from api_keys.last_used import last_used_tracker
 from api_keys.models import APIKey, APIKeyUsage
+from openai_api.vector_search.cache import search_cache
+from openai_api.vector_search.ingest import write_chunk
 from .forms import CustomUserCreationForm, APIKeyForm
 from .models import StoredFile
 from django.views.generic.edit import FormView
@@ -78,9 +81,12 @@ class APIKeysView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["api_keys"] = APIKey.objects.filter(user=self.request.user).order_by(
-            "-created_at"
+        api_keys = list(
+            APIKey.objects.filter(user=self.request.user).order_by("-created_at")
         )
+        for api_key in api_keys:
+            api_key.last_used = last_used_tracker.latest(api_key)
+        context["api_keys"] = api_keys
         return context
 
 
@@ -359,10 +365,18 @@ class VectorStoreListView(LoginRequiredMixin, ListView):
     context_object_name = "vector_stores"
 
     def get_queryset(self):
-        return VectorStore.objects.filter(user=self.request.user).order_by(
+        return VectorStore.objects.filter(
+            user=self.request.user, deleting=False
+        ).order_by(
             "-created_at"
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Counters of the worker process serving this page
+        context["search_cache"] = search_cache.stats()
+        return context
+
 
 class VectorStoreCreateView(LoginRequiredMixin, CreateView):
     model = VectorStore
@@ -382,7 +396,7 @@ class VectorStoreDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "vector_store"
 
     def get_queryset(self):
-        return VectorStore.objects.filter(user=self.request.user)
+        return VectorStore.objects.filter(user=self.request.user, deleting=False)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -405,12 +419,22 @@ class VectorEntryCreateView(LoginRequiredMixin, CreateView):
             "vector_store_detail", kwargs={"pk": self.object.vector_store.pk}
         )
 
-    def form_valid(self, form):
-        from .models import VectorStore
-
-        store_pk = self.kwargs["store_pk"]
-        form.instance.vector_store = VectorStore.objects.get(
-            pk=store_pk, user=self.request.user
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["store"] = get_object_or_404(
+            VectorStore,
+            pk=self.kwargs["store_pk"],
+            user=self.request.user,
+            deleting=False,
         )
-        messages.success(self.request, f'Entry "{form.instance.document_name}" added!')
-        return super().form_valid(form)
+        return kwargs
+
+    def form_valid(self, form):
+        store = form.store
+        self.object = form.save(commit=False)
+        self.object.vector_store = store
+        # The shared write path bumps the store version and appends the
+        # entry to the store's search data
+        write_chunk(store, [self.object], [self.object.vector])
+        messages.success(self.request, f'Entry "{self.object.document_name}" added!')
+        return redirect(self.get_success_url())
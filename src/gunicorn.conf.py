@@ -0,0 +1,20 @@
+"""
+Gunicorn settings, read from the working directory on startup.
+
+With ``VECTOR_PRELOAD_STORES`` set, the application is loaded in the master
+process and the listed vector stores are preloaded before any worker is
+forked, so the workers share that memory instead of each loading a copy.
+"""
+
+# Every top-level name here is read as a gunicorn setting, and "config" is
+# one of them
+import decouple
+
+preload_app = bool(decouple.config("VECTOR_PRELOAD_STORES", default=""))
+
+
+def when_ready(server):
+    if preload_app:
+        from openai_api.vector_search.preload import preload_stores
+
+        preload_stores()
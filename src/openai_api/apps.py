@@ -5,3 +5,6 @@ class OpenaiApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "openai_api"
     verbose_name = "OpenAI API"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,178 @@
+"""
+Native async versions of the /v1 endpoints, served when OPENAI_API_ASYNC is
+enabled (the default under ``openai_mock_server.asgi``).
+
+They mirror ``openai_api.views`` but authenticate with the async ORM, log
+usage without blocking the event loop and stream with ``asyncio.sleep``, so
+slow or streaming responses do not hold a thread. Parsing the body, running
+the handler and encoding its JSON happen in a worker thread instead: a
+large embeddings request would otherwise stall every other connection on
+the loop while it is generated and serialized.
+"""
+
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated
+
+from api_keys.authentication import APIKeyAuthentication
+from .exceptions import InvalidRequestError, OpenAIError
+from .handlers import (
+    handle_chat_completion,
+    handle_embeddings,
+    handle_image_generation,
+    handle_moderations,
+)
+from .mixins import OpenAIEndpointMixin
+from .utils import get_available_models
+
+
+class AsyncOpenAIView(OpenAIEndpointMixin, View):
+    """Base async view for OpenAI API endpoints"""
+
+    authentication = APIKeyAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Authenticated with API keys, not session cookies
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            authenticated = await self.authentication.aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+            request.user, request.auth = authenticated
+            self.check_access(request.auth)
+            response = await super().dispatch(request, *args, **kwargs)
+        except OpenAIError as exc:
+            response = JsonResponse(
+                exc.as_dict(), status=exc.status_code, headers=exc.headers
+            )
+        except APIException as exc:
+            response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = self.authentication.keyword
+        return self.add_rate_limit_headers(response)
+
+    def parse_body(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise InvalidRequestError(
+                "We could not parse the JSON body of your request."
+            )
+        if not isinstance(data, dict):
+            raise InvalidRequestError("The request body must be a JSON object.")
+        return data
+
+    async def process(self, request, handler):
+        """Run a request handler, logging usage and turning failures into 500s"""
+        start_time = time.time()
+        data = await sync_to_async(self.parse_body, thread_sensitive=False)(request)
+
+        try:
+            result = await sync_to_async(handler, thread_sensitive=False)(data)
+            if self.supports_streaming and data.get("stream"):
+                return self.stream_response(request, data, result, start_time, True)
+        except OpenAIError:
+            raise
+        except Exception as e:
+            await self.alog_usage(
+                request=request,
+                endpoint=self.endpoint,
+                model=data.get("model", self.default_model),
+                status_code=500,
+                error_message=str(e),
+                response_time_ms=int((time.time() - start_time) * 1000),
+            )
+            return JsonResponse(
+                {"error": {"message": "Internal server error"}}, status=500
+            )
+
+        await self.alog_usage(
+            request=request,
+            endpoint=self.endpoint,
+            model=result.model,
+            tokens_input=result.tokens_input,
+            tokens_output=result.tokens_output,
+            status_code=200,
+            response_time_ms=int((time.time() - start_time) * 1000),
+        )
+        return await sync_to_async(JsonResponse, thread_sensitive=False)(result.data)
+
+
+class ChatCompletionsView(AsyncOpenAIView):
+    """OpenAI Chat Completions API endpoint"""
+
+    endpoint = "chat_completions"
+    permission_field = "can_chat_completions"
+    permission_label = "chat completions"
+    default_model = "gpt-3.5-turbo"
+    supports_streaming = True
+
+    async def post(self, request):
+        return await self.process(request, handle_chat_completion)
+
+
+class EmbeddingsView(AsyncOpenAIView):
+    """OpenAI Embeddings API endpoint"""
+
+    endpoint = "embeddings"
+    permission_field = "can_embeddings"
+    permission_label = "embeddings"
+    default_model = "text-embedding-ada-002"
+
+    async def post(self, request):
+        return await self.process(request, handle_embeddings)
+
+
+class ModerationsView(AsyncOpenAIView):
+    """OpenAI Moderations API endpoint"""
+
+    endpoint = "moderations"
+    permission_field = "can_moderations"
+    permission_label = "moderations"
+    default_model = "text-moderation-latest"
+
+    async def post(self, request):
+        return await self.process(request, handle_moderations)
+
+
+class ImagesGenerationsView(AsyncOpenAIView):
+    """OpenAI Images Generations API endpoint"""
+
+    endpoint = "images_generations"
+    permission_field = "can_images"
+    permission_label = "image generation"
+    default_model = "dall-e-3"
+
+    async def post(self, request):
+        return await self.process(request, handle_image_generation)
+
+
+class ModelsView(AsyncOpenAIView):
+    """OpenAI Models API endpoint"""
+
+    async def get(self, request):
+        """List available models"""
+        return JsonResponse(get_available_models())
+
+
+class ModelDetailsView(AsyncOpenAIView):
+    """OpenAI Model Details API endpoint"""
+
+    async def get(self, request, model_id):
+        """Get details for a specific model"""
+        for model in get_available_models()["data"]:
+            if model["id"] == model_id:
+                return JsonResponse(model)
+
+        return JsonResponse(
+            {"error": {"message": f"Model {model_id} not found"}}, status=404
+        )
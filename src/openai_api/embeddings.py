@@ -0,0 +1,222 @@
+"""
+Batch embedding generation.
+
+A whole request is generated as one float32 NumPy matrix (one row per
+input) instead of one Python float at a time. Rows are L2-normalized like
+OpenAI's embeddings, including after shortening with ``dimensions``.
+
+``EMBEDDING_MODE`` chooses between random vectors and deterministic ones
+derived from the text by feature hashing: every word and word pair adds
++1 or -1 at a few hashed positions, so texts sharing words have a high
+cosine similarity. Deterministic vectors are cached in a memory-bounded
+LRU keyed on (model, dimensions, text hash).
+"""
+
+import base64
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+# Native output size of each embedding model
+EMBEDDING_MODELS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+
+# Models that accept the ``dimensions`` parameter
+SHORTENABLE_MODELS = {"text-embedding-3-small", "text-embedding-3-large"}
+
+MAX_INPUTS = 2048
+
+WORD_RE = re.compile(r"\w+")
+# Positions each hashed feature is spread over
+HASHES_PER_FEATURE = 8
+BIGRAM_WEIGHT = 0.5
+
+
+def native_dimensions(model):
+    return EMBEDDING_MODELS.get(model, DEFAULT_EMBEDDING_DIMENSIONS)
+
+
+def normalize_input(input_data):
+    """
+    Turn an embeddings ``input`` (a string, a list of strings, a token array
+    or a list of token arrays) into a list of items, one per embedding.
+    """
+    if isinstance(input_data, str):
+        return [input_data]
+    if input_data and all(isinstance(token, int) for token in input_data):
+        return [input_data]
+    return list(input_data)
+
+
+def count_tokens(items):
+    return sum(
+        len(item.split()) if isinstance(item, str) else len(item) for item in items
+    )
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    return matrix
+
+
+def random_embeddings(count, dimensions, rng=None):
+    """Return a ``(count, dimensions)`` float32 matrix of random unit vectors"""
+    rng = rng or np.random.default_rng()
+    matrix = rng.random((count, dimensions), dtype=np.float32)
+    matrix *= 2
+    matrix -= 1
+    return normalize_rows(matrix)
+
+
+def item_features(item):
+    """Return the (feature, weight) pairs hashed into an item's embedding"""
+    if isinstance(item, str):
+        words = WORD_RE.findall(item.lower()) or [item.strip()]
+    else:
+        words = [str(token) for token in item]
+    features = [(word, 1.0) for word in words]
+    features += [
+        (f"{first} {second}", BIGRAM_WEIGHT) for first, second in zip(words, words[1:])
+    ]
+    return features
+
+
+@lru_cache(maxsize=65536)
+def feature_digest(feature, model):
+    """Hash bytes of one feature, ``HASHES_PER_FEATURE`` uint32 values long"""
+    return hashlib.blake2b(
+        feature.encode(),
+        digest_size=4 * HASHES_PER_FEATURE,
+        person=model.encode()[:16],
+    ).digest()
+
+
+def hashed_embeddings(items, model, dimensions):
+    """Feature-hash each item into a row of a ``(len(items), dimensions)`` matrix"""
+    feature_ids = {}
+    rows, ids, weights = [], [], []
+    for row, item in enumerate(items):
+        for feature, weight in item_features(item):
+            rows.append(row)
+            ids.append(feature_ids.setdefault(feature, len(feature_ids)))
+            weights.append(weight)
+
+    # Hash each distinct feature of the batch once
+    hashes = np.frombuffer(
+        b"".join(feature_digest(feature, model) for feature in feature_ids),
+        dtype="<u4",
+    ).reshape(len(feature_ids), HASHES_PER_FEATURE)
+    positions = ((hashes >> 1) % dimensions).astype(np.int64)
+    signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+
+    ids = np.asarray(ids, dtype=np.int64)
+    flat = np.repeat(np.asarray(rows, dtype=np.int64) * dimensions, HASHES_PER_FEATURE)
+    flat += positions[ids].ravel()
+    values = (signs[ids] * np.asarray(weights, dtype=np.float32)[:, None]).ravel()
+    matrix = np.bincount(flat, weights=values, minlength=len(items) * dimensions)
+    matrix = matrix.reshape(len(items), dimensions).astype(np.float32)
+    return normalize_rows(matrix)
+
+
+def item_digest(item):
+    text = item if isinstance(item, str) else "\0" + ",".join(map(str, item))
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """LRU of embedding rows bounded by ``EMBEDDING_CACHE_MAX_BYTES``"""
+
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def set(self, key, vector):
+        max_bytes = settings.EMBEDDING_CACHE_MAX_BYTES
+        size = vector.nbytes + self.ENTRY_OVERHEAD
+        if size > max_bytes:
+            return
+        vector.setflags(write=False)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes + self.ENTRY_OVERHEAD
+            self._entries[key] = vector
+            self.bytes += size
+            while self.bytes > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes + self.ENTRY_OVERHEAD
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+embedding_cache = EmbeddingCache()
+
+
+def deterministic_embeddings(items, model, dimensions):
+    """Content-derived embeddings, served from ``embedding_cache`` when possible"""
+    keys = [(model, dimensions, item_digest(item)) for item in items]
+    vectors = [embedding_cache.get(key) for key in keys]
+
+    missing = [index for index, vector in enumerate(vectors) if vector is None]
+    if missing:
+        # Identical inputs in one batch are computed once
+        unique = {}
+        for index in missing:
+            unique.setdefault(keys[index], index)
+        computed = hashed_embeddings(
+            [items[index] for index in unique.values()], model, dimensions
+        )
+        for key, vector in zip(unique, computed):
+            vector = vector.copy()
+            embedding_cache.set(key, vector)
+            unique[key] = vector
+        for index in missing:
+            vectors[index] = unique[keys[index]]
+
+    return np.stack(vectors) if vectors else np.zeros((0, dimensions), np.float32)
+
+
+def embed_batch(items, model, dimensions=None, mode=None):
+    """Return one embedding row per input item"""
+    dimensions = dimensions or native_dimensions(model)
+    if (mode or settings.EMBEDDING_MODE) == "deterministic":
+        return deterministic_embeddings(items, model, dimensions)
+    return random_embeddings(len(items), dimensions)
+
+
+def encode_base64(matrix):
+    """
+    Base64-encode each row as little-endian float32, reading straight from
+    the array buffer without building Python float lists.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    return [base64.b64encode(row).decode("ascii") for row in matrix]
@@ -0,0 +1,50 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class OpenAIError(APIException):
+    """Error rendered in OpenAI's ``{"error": {...}}`` format"""
+
+    status_code = status.HTTP_400_BAD_REQUEST
+    error_type = "invalid_request_error"
+    error_code = None
+
+    def __init__(self, message, param=None, headers=None):
+        super().__init__(message)
+        self.message = message
+        self.param = param
+        self.headers = headers or {}
+
+    def as_dict(self):
+        return {
+            "error": {
+                "message": self.message,
+                "type": self.error_type,
+                "param": self.param,
+                "code": self.error_code,
+            }
+        }
+
+
+class RateLimitError(OpenAIError):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    error_type = "requests"
+    error_code = "rate_limit_exceeded"
+
+
+class InsufficientQuotaError(OpenAIError):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    error_type = "insufficient_quota"
+    error_code = "insufficient_quota"
+
+
+class InvalidRequestError(OpenAIError):
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class PermissionDeniedError(OpenAIError):
+    status_code = status.HTTP_403_FORBIDDEN
+
+
+class NotFoundError(OpenAIError):
+    status_code = status.HTTP_404_NOT_FOUND
@@ -0,0 +1,123 @@
+"""
+Request handling shared by the sync (DRF) and async views.
+
+Each handler validates a parsed request body, builds the mock response and
+returns it with the figures needed for usage logging. Invalid requests
+raise ``InvalidRequestError``.
+"""
+
+from collections import namedtuple
+
+from .embeddings import (
+    MAX_INPUTS,
+    SHORTENABLE_MODELS,
+    native_dimensions,
+    normalize_input,
+)
+from .exceptions import InvalidRequestError
+from .utils import (
+    generate_chat_completion_response,
+    generate_embedding_response,
+    generate_image_response,
+    generate_moderation_response,
+)
+
+HandlerResult = namedtuple(
+    "HandlerResult", ["data", "model", "tokens_input", "tokens_output"]
+)
+
+
+def handle_chat_completion(data):
+    messages = data.get("messages", [])
+    model = data.get("model", "gpt-3.5-turbo")
+    max_tokens = data.get("max_tokens", 150)
+
+    if not messages:
+        raise InvalidRequestError("Messages are required", param="messages")
+
+    response_data = generate_chat_completion_response(messages, model, max_tokens)
+    usage = response_data.get("usage", {})
+    return HandlerResult(
+        response_data,
+        model,
+        usage.get("prompt_tokens", 0),
+        usage.get("completion_tokens", 0),
+    )
+
+
+def handle_embeddings(data):
+    input_text = data.get("input", "")
+    model = data.get("model", "text-embedding-ada-002")
+    dimensions = data.get("dimensions")
+    encoding_format = data.get("encoding_format", "float")
+
+    if not input_text:
+        raise InvalidRequestError("Input is required", param="input")
+    if encoding_format not in ("float", "base64"):
+        raise InvalidRequestError(
+            "encoding_format must be 'float' or 'base64'", param="encoding_format"
+        )
+    if not isinstance(input_text, (str, list)):
+        raise InvalidRequestError(
+            "Input must be a string, an array of strings or an array of token arrays",
+            param="input",
+        )
+
+    items = normalize_input(input_text)
+    if len(items) > MAX_INPUTS:
+        raise InvalidRequestError(
+            f"Input must have at most {MAX_INPUTS} items", param="input"
+        )
+    for item in items:
+        if not item or not (
+            isinstance(item, str)
+            or (isinstance(item, list) and all(isinstance(t, int) for t in item))
+        ):
+            raise InvalidRequestError(
+                "Each input must be a non-empty string or token array", param="input"
+            )
+
+    if dimensions is not None:
+        if model not in SHORTENABLE_MODELS:
+            raise InvalidRequestError(
+                "This model does not support specifying dimensions.",
+                param="dimensions",
+            )
+        if (
+            not isinstance(dimensions, int)
+            or isinstance(dimensions, bool)
+            or not 1 <= dimensions <= native_dimensions(model)
+        ):
+            raise InvalidRequestError(
+                f"dimensions must be an integer between 1 and {native_dimensions(model)}",
+                param="dimensions",
+            )
+
+    response_data = generate_embedding_response(
+        items, model, dimensions, encoding_format
+    )
+    usage = response_data.get("usage", {})
+    return HandlerResult(response_data, model, usage.get("prompt_tokens", 0), 0)
+
+
+def handle_moderations(data):
+    input_text = data.get("input", "")
+
+    if not input_text:
+        raise InvalidRequestError("Input is required", param="input")
+
+    response_data = generate_moderation_response(input_text)
+    tokens = len(input_text.split()) if isinstance(input_text, str) else 0
+    return HandlerResult(response_data, "text-moderation-latest", tokens, 0)
+
+
+def handle_image_generation(data):
+    prompt = data.get("prompt", "")
+    n = data.get("n", 1)
+    size = data.get("size", "1024x1024")
+
+    if not prompt:
+        raise InvalidRequestError("Prompt is required", param="prompt")
+
+    response_data = generate_image_response(prompt, n, size)
+    return HandlerResult(response_data, "dall-e-3", len(prompt.split()), 0)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from openai_api.utils import generate_embedding_response
+
+
+class Command(BaseCommand):
+    help = "Compare response size and render time of float and base64 embeddings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-sizes",
+            type=int,
+            nargs="+",
+            default=[1, 100, 2048],
+            help="Number of inputs per request",
+        )
+        parser.add_argument("--model", default="text-embedding-ada-002")
+        parser.add_argument("--dimensions", type=int, default=None)
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Runs per case; the best is reported"
+        )
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        self.stdout.write(
+            f"{'batch':>6} {'format':>7} {'bytes':>12} {'build ms':>10} {'render ms':>10}"
+        )
+
+        for batch_size in options["batch_sizes"]:
+            inputs = [f"benchmark input number {i}" for i in range(batch_size)]
+            for encoding_format in ("float", "base64"):
+                best_build = best_render = float("inf")
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    data = generate_embedding_response(
+                        inputs,
+                        options["model"],
+                        options["dimensions"],
+                        encoding_format,
+                    )
+                    built = time.perf_counter()
+                    body = renderer.render(data)
+                    rendered = time.perf_counter()
+                    best_build = min(best_build, built - start)
+                    best_render = min(best_render, rendered - built)
+
+                self.stdout.write(
+                    f"{batch_size:>6} {encoding_format:>7} {len(body):>12,} "
+                    f"{best_build * 1000:>10.1f} {best_render * 1000:>10.1f}"
+                )
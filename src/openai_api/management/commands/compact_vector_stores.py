@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import VectorStore
+from openai_api.vector_search.segments import store_segments
+
+
+class Command(BaseCommand):
+    help = "Merge each vector store's embedding segments and drop deleted rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "vector_store_ids",
+            nargs="*",
+            help="Stores to compact (with or without the vs_ prefix); all by default",
+        )
+
+    def handle(self, *args, **options):
+        stores = VectorStore.objects.filter(deleting=False)
+        if options["vector_store_ids"]:
+            stores = stores.filter(
+                pk__in=[pk.removeprefix("vs_") for pk in options["vector_store_ids"]]
+            )
+
+        for store in stores:
+            # Bring the segments up to date first so nothing is lost
+            segments = store_segments.get(store)
+            store_segments.compact(store)
+            self.stdout.write(
+                f"vs_{store.pk}: {len(segments)} live of {segments.total_rows} rows"
+            )
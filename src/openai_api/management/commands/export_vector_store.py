@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import VectorStore
+from openai_api.exceptions import OpenAIError
+from openai_api.vector_search.snapshots import export_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a vector store's entries and search data to a .npz snapshot, "
+        "with its header in a .json file next to it"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vector_store_id", help="With or without the vs_ prefix")
+        parser.add_argument("path", help="Snapshot file to write, e.g. store.npz")
+
+    def handle(self, *args, **options):
+        try:
+            store = VectorStore.objects.get(
+                pk=options["vector_store_id"].removeprefix("vs_"), deleting=False
+            )
+        except (VectorStore.DoesNotExist, ValidationError, ValueError):
+            raise CommandError(f"Vector store {options['vector_store_id']} not found")
+
+        path = Path(options["path"])
+        try:
+            header = export_snapshot(store, path)
+        except OpenAIError as e:
+            raise CommandError(e.message)
+        path.with_suffix(".json").write_text(json.dumps(header, indent=2) + "\n")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {header['entries']} entries of vs_{store.pk} to {path}"
+            )
+        )
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from openai_api.exceptions import OpenAIError
+from openai_api.vector_search.snapshots import restore_snapshot
+
+
+class Command(BaseCommand):
+    help = "Create a vector store from a snapshot written by export_vector_store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Snapshot file (.npz)")
+        parser.add_argument("--user", required=True, help="Username of the new store's owner")
+        parser.add_argument("--name", help="Store name (defaults to the snapshot's)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(**{User.USERNAME_FIELD: options["user"]})
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+
+        try:
+            store = restore_snapshot(options["path"], user, options["name"])
+        except OpenAIError as e:
+            raise CommandError(e.message)
+        self.stdout.write(
+            self.style.SUCCESS(f"Restored {options['path']} as vs_{store.pk}")
+        )
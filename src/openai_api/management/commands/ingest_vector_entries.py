@@ -0,0 +1,47 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import VectorStore
+from openai_api.vector_search.ingest import ingest_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load vector entries from an NDJSON file with one "
+        '{"document_name", "embedding", "metadata"} object per line'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vector_store_id", help="With or without the vs_ prefix")
+        parser.add_argument("path", help="NDJSON file to read, or - for stdin")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Entries per transaction (defaults to VECTOR_INGEST_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            store = VectorStore.objects.get(
+                pk=options["vector_store_id"].removeprefix("vs_"), deleting=False
+            )
+        except (VectorStore.DoesNotExist, ValidationError, ValueError):
+            raise CommandError(f"Vector store {options['vector_store_id']} not found")
+
+        if options["path"] == "-":
+            result = ingest_lines(store, sys.stdin.buffer, options["chunk_size"])
+        else:
+            with open(options["path"], "rb") as f:
+                result = ingest_lines(store, f, options["chunk_size"])
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['message']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created} entries in vs_{store.pk}"
+                + (f", skipped {result.failed} invalid lines" if result.failed else "")
+            )
+        )
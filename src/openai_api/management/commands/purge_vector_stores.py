@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import VectorStore
+from openai_api.vector_search.deletion import purge_store
+
+
+class Command(BaseCommand):
+    help = "Finish deleting vector stores whose background deletion was interrupted"
+
+    def handle(self, *args, **options):
+        for pk in VectorStore.objects.filter(deleting=True).values_list("pk", flat=True):
+            deleted = purge_store(pk)
+            self.stdout.write(f"vs_{pk}: deleted {deleted} entries")
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from dashboard.models import VectorStore
+from openai_api.vector_search.segments import store_segments
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the memory saved by int8 quantization and its recall@k "
+        "against exact search for each vector store"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "vector_store_ids",
+            nargs="*",
+            help="Stores to report on (with or without the vs_ prefix); all by default",
+        )
+        parser.add_argument("--k", type=int, default=10, help="Results per query")
+        parser.add_argument(
+            "--queries", type=int, default=50, help="Queries sampled per store"
+        )
+        parser.add_argument(
+            "--rescore-factors",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="Candidates rescored per result",
+        )
+        parser.add_argument(
+            "--noise",
+            type=float,
+            default=0.1,
+            help="Noise added to the stored vectors used as queries",
+        )
+
+    def handle(self, *args, **options):
+        stores = VectorStore.objects.filter(deleting=False)
+        if options["vector_store_ids"]:
+            stores = stores.filter(
+                pk__in=[pk.removeprefix("vs_") for pk in options["vector_store_ids"]]
+            )
+
+        k = options["k"]
+        rng = np.random.default_rng(0)
+        for store in stores:
+            segments = store_segments.get(store)
+            floats, codes = segments.nbytes
+            self.stdout.write(
+                f"vs_{store.pk} ({store.name}): {len(segments)} vectors, "
+                f"float32 {floats / 2**20:.1f} MiB, int8 {codes / 2**20:.1f} MiB"
+                + (f" ({1 - codes / floats:.0%} saved)" if floats else "")
+            )
+            queries = self.sample_queries(segments, options["queries"], options["noise"], rng)
+            if not len(queries):
+                continue
+
+            exact, exact_seconds = self.run(segments, queries, k, None)
+            self.stdout.write(
+                f"  {'search':<16} {'recall@' + str(k):>10} {'ms/query':>10}"
+            )
+            self.stdout.write(
+                f"  {'exact float32':<16} {1:>10.3f} {exact_seconds * 1000:>10.2f}"
+            )
+            for factor in options["rescore_factors"]:
+                results, seconds = self.run(segments, queries, k, k * factor)
+                recall = np.mean(
+                    [
+                        len(set(found) & set(expected)) / max(len(expected), 1)
+                        for found, expected in zip(results, exact)
+                    ]
+                )
+                self.stdout.write(
+                    f"  {'int8 x' + str(factor) + ' rescore':<16} "
+                    f"{recall:>10.3f} {seconds * 1000:>10.2f}"
+                )
+
+    def sample_queries(self, segments, count, noise, rng):
+        """Perturbed copies of randomly chosen stored vectors"""
+        total = len(segments)
+        if not total:
+            return []
+        picks = set(rng.choice(total, min(count, total), replace=False).tolist())
+        queries, seen = [], 0
+        for _, vectors in segments.live_chunks():
+            for row in sorted(pick - seen for pick in picks if seen <= pick < seen + len(vectors)):
+                queries.append(np.array(vectors[row], dtype=np.float32))
+            seen += len(vectors)
+        queries = np.stack(queries)
+        queries += rng.normal(0, noise / np.sqrt(segments.dimensions), queries.shape)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries.astype(np.float32)
+
+    def run(self, segments, queries, k, candidates):
+        start = time.perf_counter()
+        results = [segments.search(query, k, candidates)[0] for query in queries]
+        return results, (time.perf_counter() - start) / len(queries)
@@ -0,0 +1,165 @@
+import time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from api_keys.models import APIKeyUsage
+from api_keys.quotas import daily_quota
+from api_keys.ratelimit import format_reset, rate_limiter
+from api_keys.usage import arecord_usage, record_usage
+from .exceptions import InsufficientQuotaError, PermissionDeniedError, RateLimitError
+from .streaming import astream_events, iter_chat_completion_chunks, stream_events
+from .utils import generate_request_id
+
+
+class OpenAIEndpointMixin:
+    """
+    Access checks, usage logging and streaming shared by the sync (DRF) and
+    async OpenAI views. Views set ``endpoint`` to the ``APIKeyUsage`` endpoint
+    name and ``permission_field`` to the ``APIKey`` flag they require.
+    """
+
+    endpoint = None
+    permission_field = None
+    permission_label = None
+    default_model = None
+    supports_streaming = False
+    rate_limit = None
+
+    def check_access(self, api_key):
+        self.check_permission(api_key)
+        self.check_rate_limit(api_key)
+        self.check_quota(api_key)
+
+    def check_permission(self, api_key):
+        """Check if API key has required permissions"""
+        if self.permission_field and not getattr(api_key, self.permission_field, True):
+            raise PermissionDeniedError(
+                f"API key does not have permission for {self.permission_label}"
+            )
+
+    def check_rate_limit(self, api_key):
+        """Enforce the API key's requests_per_minute limit"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        self.rate_limit = rate_limiter.check(api_key)
+        if not self.rate_limit.allowed:
+            raise RateLimitError(
+                f"Rate limit reached for requests on API key {api_key.masked_key}: "
+                f"Limit {self.rate_limit.limit} / min. "
+                f"Please try again in {format_reset(self.rate_limit.retry_after)}.",
+                headers={"retry-after": str(max(1, round(self.rate_limit.retry_after)))},
+            )
+
+    def check_quota(self, api_key):
+        """Enforce the daily request and token quota of the key's plan"""
+        if not settings.QUOTA_ENABLED:
+            return
+        if not daily_quota.check(api_key).allowed:
+            raise InsufficientQuotaError(
+                "You exceeded your current quota, please check your plan and "
+                "billing details."
+            )
+
+    def add_rate_limit_headers(self, response):
+        if self.rate_limit:
+            response["x-ratelimit-limit-requests"] = str(self.rate_limit.limit)
+            response["x-ratelimit-remaining-requests"] = str(self.rate_limit.remaining)
+            response["x-ratelimit-reset-requests"] = format_reset(
+                self.rate_limit.reset_seconds
+            )
+        return response
+
+    def get_client_ip(self, request):
+        """Get client IP address"""
+        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+        if x_forwarded_for:
+            ip = x_forwarded_for.split(",")[0]
+        else:
+            ip = request.META.get("REMOTE_ADDR")
+        return ip
+
+    def build_usage(
+        self,
+        request,
+        endpoint,
+        model,
+        tokens_input=0,
+        tokens_output=0,
+        status_code=200,
+        error_message="",
+        response_time_ms=0,
+    ):
+        return APIKeyUsage(
+            api_key_id=request.auth.pk,
+            endpoint=endpoint,
+            model=model,
+            tokens_input=tokens_input,
+            tokens_output=tokens_output,
+            total_tokens=tokens_input + tokens_output,
+            user_agent=request.META.get("HTTP_USER_AGENT", ""),
+            ip_address=self.get_client_ip(request),
+            request_id=generate_request_id(),
+            response_time_ms=response_time_ms,
+            status_code=status_code,
+            error_message=error_message,
+        )
+
+    def log_usage(self, request, endpoint, model, **kwargs):
+        """Log API usage for tracking"""
+        try:
+            if request.auth:
+                record_usage(self.build_usage(request, endpoint, model, **kwargs))
+                self.charge_quota(request, **kwargs)
+        except Exception as e:
+            # Don't let logging errors break the API
+            print(f"Error logging usage: {e}")
+
+    async def alog_usage(self, request, endpoint, model, **kwargs):
+        """Async counterpart of ``log_usage``"""
+        try:
+            if request.auth:
+                await arecord_usage(self.build_usage(request, endpoint, model, **kwargs))
+                self.charge_quota(request, **kwargs)
+        except Exception as e:
+            print(f"Error logging usage: {e}")
+
+    def charge_quota(self, request, tokens_input=0, tokens_output=0, **kwargs):
+        if settings.QUOTA_ENABLED:
+            daily_quota.add_tokens(request.auth, tokens_input + tokens_output)
+
+    def stream_response(self, request, data, result, start_time, use_async):
+        """Return a chat completion as a text/event-stream of chunks"""
+        stream_options = data.get("stream_options") or {}
+        chunks = list(
+            iter_chat_completion_chunks(
+                result.data,
+                include_usage=bool(stream_options.get("include_usage")),
+            )
+        )
+
+        def on_finish(sent, finished):
+            # Charge completion tokens for the part of the stream that was sent
+            completion_tokens = result.tokens_output * sent // len(chunks)
+            self.log_usage(
+                request=request,
+                endpoint=self.endpoint,
+                model=result.model,
+                tokens_input=result.tokens_input,
+                tokens_output=result.tokens_output if finished else completion_tokens,
+                status_code=200,
+                error_message="" if finished else "Client disconnected",
+                response_time_ms=int((time.time() - start_time) * 1000),
+            )
+
+        first_delay = settings.STREAM_TIME_TO_FIRST_TOKEN_MS / 1000
+        delay = settings.STREAM_INTER_TOKEN_DELAY_MS / 1000
+        if use_async:
+            events = astream_events(chunks, first_delay, delay, on_finish)
+        else:
+            events = stream_events(chunks, first_delay, delay, on_finish)
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from dashboard.models import VectorEntry, VectorStore, VectorStoreFile
+from .vector_search.ingest import delete_entries
+from .vector_search.ivf import store_indexes
+from .vector_search.segments import store_segments
+
+
+# VectorEntry has no receivers so that deleting entries, directly or by
+# cascade, stays one DELETE; the write paths in vector_search/ingest.py
+# bump the store version once per change instead.
+@receiver(pre_delete, sender=VectorStoreFile)
+def delete_vector_store_file_entries(sender, instance, **kwargs):
+    """Delete a file's chunks as one change before the cascade reaches them"""
+    delete_entries(
+        instance.vector_store_id, VectorEntry.objects.filter(file_id=instance.pk)
+    )
+
+
+@receiver(post_delete, sender=VectorStoreFile)
+def release_vector_store_file_stats(sender, instance, **kwargs):
+    """Remove a deleted file from its store's file counts"""
+    VectorStore.adjust_file_stats(instance.vector_store_id, **{instance.status: -1})
+
+
+@receiver(post_delete, sender=VectorStore)
+def drop_vector_store_search_data(sender, instance, **kwargs):
+    store_segments.invalidate(instance.pk, delete_files=True)
+    store_indexes.invalidate(instance.pk, delete_file=True)
@@ -0,0 +1,94 @@
+"""
+Server-sent event streaming for chat completions.
+
+Chunks are built by ``iter_chat_completion_chunks`` and framed as SSE
+events by either a sync generator (WSGI) or an async generator (ASGI).
+Under WSGI the sync workers ``time.sleep`` between chunks, so each stream
+holds a whole worker for its full duration; deployments that stream should
+serve ``openai_mock_server.asgi``, where ``asyncio.sleep`` frees the event
+loop between chunks.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from asgiref.sync import sync_to_async
+
+TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+
+def split_tokens(text):
+    """Split text into word-sized pieces that concatenate back to ``text``"""
+    return TOKEN_RE.findall(text)
+
+
+def iter_chat_completion_chunks(response_data, include_usage=False):
+    """Yield ``chat.completion.chunk`` dicts equivalent to a chat completion"""
+    base = {
+        "id": response_data["id"],
+        "object": "chat.completion.chunk",
+        "created": response_data["created"],
+        "model": response_data["model"],
+    }
+    extra = {"usage": None} if include_usage else {}
+
+    def chunk(delta, finish_reason=None):
+        return {
+            **base,
+            "choices": [
+                {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            ],
+            **extra,
+        }
+
+    message = response_data["choices"][0]["message"]
+    yield chunk({"role": message["role"], "content": ""})
+    for token in split_tokens(message["content"]):
+        yield chunk({"content": token})
+    yield chunk({}, finish_reason=response_data["choices"][0]["finish_reason"])
+
+    if include_usage:
+        yield {**base, "choices": [], "usage": response_data["usage"]}
+
+
+def format_event(data):
+    if isinstance(data, str):
+        return f"data: {data}\n\n"
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def stream_events(chunks, first_delay, delay, on_finish=None):
+    """
+    Sync SSE generator. ``on_finish(sent, finished)`` is called once with the
+    number of chunks sent, also when the client disconnects early.
+    """
+    sent = 0
+    finished = False
+    try:
+        for chunk in chunks:
+            time.sleep(first_delay if sent == 0 else delay)
+            yield format_event(chunk)
+            sent += 1
+        yield format_event("[DONE]")
+        finished = True
+    finally:
+        if on_finish:
+            on_finish(sent, finished)
+
+
+async def astream_events(chunks, first_delay, delay, on_finish=None):
+    """Async counterpart of ``stream_events`` for the ASGI handler"""
+    sent = 0
+    finished = False
+    try:
+        for chunk in chunks:
+            await asyncio.sleep(first_delay if sent == 0 else delay)
+            yield format_event(chunk)
+            sent += 1
+        yield format_event("[DONE]")
+        finished = True
+    finally:
+        if on_finish:
+            await sync_to_async(on_finish)(sent, finished)
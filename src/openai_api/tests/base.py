@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from dashboard.models import StoredFile, VectorEntry, VectorStore, VectorStoreFile
+from ..embeddings import normalize_rows
+from ..vector_search.ingest import write_chunk
+from ..vector_search.ivf import store_indexes
+from ..vector_search.segments import store_segments
+
+
+class VectorStoreTestCase(TestCase):
+    """Gives each test an empty store and its own ``VECTOR_INDEX_DIR``"""
+
+    dimensions = 8
+
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, ignore_errors=True)
+        settings_override = override_settings(VECTOR_INDEX_DIR=self.index_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.rng = np.random.default_rng(0)
+        self.user = User.objects.create(username="owner")
+        self.store = self.create_store()
+
+    def create_store(self, **options):
+        store = VectorStore.objects.create(user=self.user, name="store", **options)
+        self.addCleanup(store_segments.invalidate, store.pk)
+        self.addCleanup(store_indexes.invalidate, store.pk)
+        return store
+
+    def random_vectors(self, count):
+        return self.rng.standard_normal((count, self.dimensions)).astype(np.float32)
+
+    def brute_force(self, entries, query, k):
+        """``(entry ids, scores)`` of the best ``k`` of ``entries`` by exact scoring"""
+        entries = list(entries)
+        if not entries:
+            return [], np.zeros(0, dtype=np.float32)
+        vectors = normalize_rows(np.stack([entry.vector for entry in entries]))
+        scores = vectors @ query
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [entries[i].pk for i in best], scores[best]
+
+    def add_entries(self, store, vectors, metadata=None, file=None):
+        """Insert one entry per row of ``vectors`` and return them"""
+        entries = []
+        for number, vector in enumerate(vectors):
+            entry = VectorEntry(
+                vector_store=store,
+                file=file,
+                document_name=f"doc-{number}",
+                metadata=metadata[number] if metadata else None,
+            )
+            entry.vector = vector
+            entries.append(entry)
+        write_chunk(store, entries, list(vectors))
+        store.refresh_from_db()
+        return entries
+
+    def attach_file(self, store, chunks):
+        """Attach a stored file whose ``chunks`` entries are already written"""
+        stored_file = StoredFile.objects.create(user=self.user, name="notes.txt")
+        vector_store_file = VectorStoreFile.objects.create(
+            vector_store=store, file=stored_file, status="completed"
+        )
+        VectorStore.adjust_file_stats(store.pk, completed=1)
+        self.add_entries(store, self.random_vectors(chunks), file=vector_store_file)
+        return stored_file
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+from api_keys.models import APIKey, APIKeyUsage
+from .. import async_views
+from ..handlers import handle_embeddings
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, QUOTA_ENABLED=False)
+class AsyncEmbeddingsViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="owner")
+        self.key = APIKey.objects.create(user=user, name="test")
+        self.view = async_views.EmbeddingsView.as_view()
+
+    def request(self, body, path="/v1/embeddings", key=True):
+        headers = {"Authorization": f"Bearer {self.key.key}"} if key else {}
+        return AsyncRequestFactory().post(
+            path,
+            data=body if isinstance(body, str) else json.dumps(body),
+            content_type="application/json",
+            headers=headers,
+        )
+
+    async def test_embeddings_are_returned_and_logged(self):
+        response = await self.view(
+            self.request({"model": "text-embedding-3-small", "input": ["a", "b"]})
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual([item["index"] for item in data["data"]], [0, 1])
+        self.assertEqual(
+            await APIKeyUsage.objects.filter(api_key=self.key).acount(), 1
+        )
+
+    async def test_handler_does_not_block_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        handler_threads = []
+        ticks = []
+
+        def slow_handler(data):
+            handler_threads.append(threading.get_ident())
+            time.sleep(0.2)
+            return handle_embeddings(data)
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        with mock.patch.object(async_views, "handle_embeddings", slow_handler):
+            response = await self.view(
+                self.request({"model": "text-embedding-3-small", "input": "a"})
+            )
+        ticker.cancel()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(handler_threads, [loop_thread])
+        # The loop kept running other tasks while the handler slept
+        self.assertGreater(len(ticks), 5)
+
+    async def test_errors_are_returned_as_json(self):
+        response = await self.view(self.request({"input": "a"}, key=False))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+
+        response = await self.view(self.request("{not json"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.content)["error"]["type"], "invalid_request_error"
+        )
+
+        self.key.can_embeddings = False
+        await self.key.asave()
+        response = await self.view(self.request({"input": "a"}))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_rate_limited_requests_get_retry_headers(self):
+        self.key.requests_per_minute = 1
+        await self.key.asave()
+        with self.settings(RATE_LIMIT_ENABLED=True):
+            first = await self.view(self.request({"input": "a"}))
+            second = await self.view(self.request({"input": "a"}))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["x-ratelimit-limit-requests"], "1")
+        self.assertEqual(first["x-ratelimit-remaining-requests"], "0")
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(second["retry-after"], "60")
+
+    @override_settings(STREAM_TIME_TO_FIRST_TOKEN_MS=0, STREAM_INTER_TOKEN_DELAY_MS=0)
+    async def test_chat_completions_stream_asynchronously(self):
+        response = await async_views.ChatCompletionsView.as_view()(
+            self.request(
+                {"messages": [{"role": "user", "content": "Hi"}], "stream": True},
+                path="/v1/chat/completions",
+            )
+        )
+        self.assertTrue(response.is_async)
+        body = "".join([chunk.decode() async for chunk in response.streaming_content])
+        events = body.split("\n\n")
+        self.assertEqual(events[-2:], ["data: [DONE]", ""])
+        chunks = [json.loads(event.removeprefix("data: ")) for event in events[:-2]]
+        self.assertEqual(chunks[-1]["choices"][0]["finish_reason"], "stop")
+        self.assertEqual(
+            await APIKeyUsage.objects.filter(
+                api_key=self.key, endpoint="chat_completions"
+            ).acount(),
+            1,
+        )
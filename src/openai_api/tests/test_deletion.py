@@ -0,0 +1,151 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api_keys.models import APIKey
+from dashboard.models import (
+    StoredFile,
+    VectorEntry,
+    VectorEntryDeletion,
+    VectorStore,
+    VectorStoreFile,
+)
+from ..vector_search import deletion
+from ..vector_search.deletion import store_deleter
+from ..vector_search.segments import store_dir, store_segments
+from .base import VectorStoreTestCase
+
+
+class EntryDeletionTests(VectorStoreTestCase):
+    def delete_queries(self, stored_file):
+        with CaptureQueriesContext(connection) as queries:
+            stored_file.delete()
+        return len(queries)
+
+    def test_file_deletion_queries_do_not_grow_with_chunks(self):
+        small = self.attach_file(self.store, 2)
+        large = self.attach_file(self.create_store(), 500)
+        self.assertEqual(self.delete_queries(small), self.delete_queries(large))
+        self.assertFalse(VectorEntry.objects.exists())
+
+    def test_file_deletion_bumps_the_version_once(self):
+        stored_file = self.attach_file(self.store, 50)
+        version = self.store.version
+        stored_file.delete()
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.version, version + 1)
+
+    def test_search_data_drops_deleted_file_chunks(self):
+        self.add_entries(self.store, self.random_vectors(5))
+        stored_file = self.attach_file(self.store, 7)
+        self.assertEqual(len(store_segments.get(self.store)), 12)
+        stored_file.delete()
+        self.store.refresh_from_db()
+        self.assertEqual(len(store_segments.get(self.store)), 5)
+
+
+@mock.patch.object(deletion, "BATCH_PAUSE", 0)
+class PurgeTests(VectorStoreTestCase):
+    def purge_queries(self, store):
+        with CaptureQueriesContext(connection) as queries:
+            deleted = deletion.purge_store(store.pk)
+        return deleted, len(queries)
+
+    def test_purge_queries_grow_with_batches_not_rows(self):
+        few = self.create_store()
+        self.add_entries(few, self.random_vectors(3))
+        many = self.create_store()
+        self.add_entries(many, self.random_vectors(300))
+
+        with override_settings(VECTOR_DELETE_BATCH_SIZE=1):
+            few_result = self.purge_queries(few)
+        with override_settings(VECTOR_DELETE_BATCH_SIZE=100):
+            many_result = self.purge_queries(many)
+
+        # Three batches each
+        self.assertEqual(few_result[0], 3)
+        self.assertEqual(many_result[0], 300)
+        self.assertEqual(few_result[1], many_result[1])
+
+    def test_purge_removes_store_and_files(self):
+        self.attach_file(self.store, 20)
+        self.add_entries(self.store, self.random_vectors(10))
+        deletion.purge_store(self.store.pk)
+        self.assertFalse(VectorStore.objects.filter(pk=self.store.pk).exists())
+        self.assertFalse(VectorStoreFile.objects.exists())
+        self.assertFalse(VectorEntry.objects.exists())
+
+    def test_purge_does_not_record_deletions(self):
+        self.add_entries(self.store, self.random_vectors(10))
+        deletion.purge_store(self.store.pk)
+        self.assertFalse(VectorEntryDeletion.objects.exists())
+
+    def test_command_finishes_interrupted_deletions(self):
+        kept = self.create_store()
+        self.add_entries(kept, self.random_vectors(5))
+        self.add_entries(self.store, self.random_vectors(5))
+        VectorStore.objects.filter(pk=self.store.pk).update(deleting=True)
+        call_command("purge_vector_stores", stdout=mock.Mock())
+        self.assertEqual(
+            list(VectorStore.objects.values_list("pk", flat=True)), [kept.pk]
+        )
+        self.assertEqual(VectorEntry.objects.count(), 5)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class StoreDeleterTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_entries(self.store, self.random_vectors(10))
+        store_segments.get(self.store)
+        stored_file = StoredFile.objects.create(user=self.user, name="draft.txt")
+        self.in_progress = VectorStoreFile.objects.create(
+            vector_store=self.store, file=stored_file
+        )
+        VectorStore.adjust_file_stats(self.store.pk, in_progress=1)
+        key = APIKey.objects.create(user=self.user, name="test")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {key.key}"}
+
+    def test_delete_hides_the_store_and_queues_the_purge(self):
+        with mock.patch.object(store_deleter, "submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(
+                    f"/v1/vector_stores/vs_{self.store.pk}", **self.headers
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["deleted"])
+        submit.assert_called_once_with(self.store.pk)
+
+        # Hidden until the purge has run, with its entries still there
+        self.store.refresh_from_db()
+        self.assertTrue(self.store.deleting)
+        self.assertEqual(VectorEntry.objects.count(), 10)
+        response = self.client.get(
+            f"/v1/vector_stores/vs_{self.store.pk}", **self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/v1/vector_stores", **self.headers)
+        self.assertEqual(response.json()["data"], [])
+
+    def test_delete_cancels_in_progress_files(self):
+        with mock.patch.object(store_deleter, "submit"):
+            store_deleter.delete(self.store)
+        self.in_progress.refresh_from_db()
+        self.assertEqual(self.in_progress.status, "cancelled")
+        self.store.refresh_from_db()
+        self.assertEqual(
+            (self.store.files_in_progress, self.store.files_cancelled), (0, 1)
+        )
+
+    @mock.patch.object(deletion, "BATCH_PAUSE", 0)
+    def test_purge_removes_the_search_files(self):
+        self.assertTrue(store_dir(self.store.pk).exists())
+        with mock.patch.object(store_deleter, "submit", deletion.purge_store):
+            with self.captureOnCommitCallbacks(execute=True):
+                store_deleter.delete(self.store)
+        self.assertFalse(VectorStore.objects.exists())
+        self.assertFalse(VectorEntry.objects.exists())
+        self.assertFalse(store_dir(self.store.pk).exists())
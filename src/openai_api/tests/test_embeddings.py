@@ -0,0 +1,133 @@
+import base64
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from ..embeddings import (
+    EmbeddingCache,
+    embedding_cache,
+    encode_base64,
+    random_embeddings,
+)
+from ..exceptions import InvalidRequestError
+from ..handlers import handle_embeddings
+
+
+def embeddings(**data):
+    return [item["embedding"] for item in handle_embeddings(data).data["data"]]
+
+
+class EmbeddingShapeTests(TestCase):
+    def test_one_unit_row_per_input(self):
+        for data, rows, dimensions in [
+            ({"input": "hello"}, 1, 1536),
+            ({"input": ["a", "b", "c"]}, 3, 1536),
+            ({"input": [1, 2, 3]}, 1, 1536),
+            ({"input": [[1, 2], [3]]}, 2, 1536),
+            ({"input": "a", "model": "text-embedding-3-large"}, 1, 3072),
+            (
+                {"input": ["a", "b"], "model": "text-embedding-3-small", "dimensions": 7},
+                2,
+                7,
+            ),
+        ]:
+            with self.subTest(data=data):
+                result = handle_embeddings(data)
+                self.assertEqual(
+                    [item["index"] for item in result.data["data"]], list(range(rows))
+                )
+                matrix = np.array(embeddings(**data))
+                self.assertEqual(matrix.shape, (rows, dimensions))
+                np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1, rtol=1e-5)
+
+    def test_random_matrix(self):
+        matrix = random_embeddings(4, 16, np.random.default_rng(0))
+        self.assertEqual((matrix.shape, matrix.dtype), ((4, 16), np.float32))
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1, rtol=1e-6)
+
+    def test_invalid_requests_are_rejected(self):
+        for data in [
+            {"input": ""},
+            {"input": ["a", ""]},
+            {"input": ["a", 1.5]},
+            {"input": "a", "dimensions": 8},
+            {"input": "a", "model": "text-embedding-3-small", "dimensions": 0},
+            {"input": "a", "model": "text-embedding-3-small", "dimensions": 1537},
+        ]:
+            with self.subTest(data=data), self.assertRaises(InvalidRequestError):
+                handle_embeddings(data)
+
+
+@override_settings(EMBEDDING_MODE="deterministic")
+class DeterministicEmbeddingTests(TestCase):
+    def setUp(self):
+        embedding_cache.clear()
+        self.addCleanup(embedding_cache.clear)
+
+    def test_same_text_same_vector_and_shared_words_are_closer(self):
+        first, again, related, unrelated = np.array(
+            embeddings(
+                input=[
+                    "the quick brown fox",
+                    "the quick brown fox",
+                    "a quick brown fox jumps",
+                    "stock market report",
+                ]
+            )
+        )
+        np.testing.assert_array_equal(first, again)
+        self.assertGreater(first @ related, first @ unrelated + 0.3)
+
+    def test_vectors_depend_on_model_and_dimensions(self):
+        small = embeddings(input="fox", model="text-embedding-3-small")[0]
+        ada = embeddings(input="fox", model="text-embedding-ada-002")[0]
+        short = embeddings(input="fox", model="text-embedding-3-small", dimensions=64)
+        self.assertNotEqual(small, ada)
+        self.assertEqual(len(short[0]), 64)
+
+    def test_repeated_inputs_are_served_from_the_cache(self):
+        embeddings(input=["one", "two"])
+        hits = embedding_cache.hits
+        embeddings(input=["two", "one", "three"])
+        self.assertEqual(embedding_cache.hits - hits, 2)
+
+    def test_cache_is_bounded_by_bytes(self):
+        cache = EmbeddingCache()
+        vector = np.zeros(100, dtype=np.float32)
+        size = vector.nbytes + cache.ENTRY_OVERHEAD
+        with self.settings(EMBEDDING_CACHE_MAX_BYTES=3 * size):
+            for key in range(3):
+                cache.set(key, vector.copy())
+            cache.get(0)
+            cache.set(3, vector.copy())
+        # The least recently used entry was evicted
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(0))
+        self.assertEqual(cache.bytes, 3 * size)
+
+
+@override_settings(EMBEDDING_MODE="deterministic")
+class Base64EmbeddingTests(TestCase):
+    def decode(self, encoded):
+        return np.frombuffer(base64.b64decode(encoded), dtype="<f4")
+
+    def test_base64_decodes_to_the_float_embedding(self):
+        data = {"input": ["alpha", "beta gamma"], "model": "text-embedding-3-small"}
+        floats = embeddings(**data)
+        encoded = embeddings(encoding_format="base64", **data)
+        for vector, text in zip(floats, encoded):
+            self.assertIsInstance(text, str)
+            np.testing.assert_array_equal(
+                self.decode(text), np.array(vector, dtype=np.float32)
+            )
+
+    def test_rows_are_encoded_little_endian(self):
+        matrix = np.arange(6, dtype=">f8").reshape(2, 3)
+        self.assertEqual(
+            [self.decode(text).tolist() for text in encode_base64(matrix)],
+            matrix.tolist(),
+        )
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(InvalidRequestError):
+            handle_embeddings({"input": "a", "encoding_format": "hex"})
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api_keys.models import APIKey
+from dashboard.models import StoredFile, VectorEntry, VectorStore, VectorStoreFile
+from ..vector_search.files import FileProcessor, file_processor, process_file
+from .base import VectorStoreTestCase
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class AttachFileTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        key = APIKey.objects.create(user=self.user, name="test")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {key.key}"}
+        self.stored_file = StoredFile.objects.create(user=self.user, name="notes.txt")
+
+    def attach(self):
+        response = self.client.post(
+            f"/v1/vector_stores/vs_{self.store.pk}/files",
+            {"file_id": f"file-{self.stored_file.pk}"},
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_attaching_an_attached_file_returns_the_existing_row(self):
+        with mock.patch.object(file_processor, "enqueue") as enqueue:
+            first = self.attach()
+            # A concurrent attach finds the row only when its insert fails
+            second = self.attach()
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(enqueue.call_count, 1)
+        self.assertEqual(VectorStoreFile.objects.count(), 1)
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.files_in_progress, 1)
+
+
+class StaleFileTests(VectorStoreTestCase):
+    def create_file(self, status="in_progress", age=0):
+        vector_store_file = VectorStoreFile.objects.create(
+            vector_store=self.store,
+            file=StoredFile.objects.create(user=self.user, name="notes.txt"),
+            status=status,
+        )
+        VectorStoreFile.objects.filter(pk=vector_store_file.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=age)
+        )
+        return vector_store_file
+
+    @override_settings(VECTOR_STORE_FILE_STALE_SECONDS=60)
+    def test_stale_in_progress_files_are_requeued_once(self):
+        stale = self.create_file(age=120)
+        self.create_file(age=10)
+        self.create_file(status="completed", age=120)
+        # Chunks written before the worker died
+        self.add_entries(self.store, self.random_vectors(3), file=stale)
+
+        with mock.patch.object(file_processor, "submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                file_processor.requeue_stale(self.store.pk)
+                file_processor.requeue_stale(self.store.pk)
+        submit.assert_called_once_with(stale.pk)
+        self.assertFalse(VectorEntry.objects.filter(file=stale).exists())
+
+    @override_settings(VECTOR_STORE_FILE_STALE_SECONDS=60)
+    def test_heartbeat_keeps_queued_files_fresh(self):
+        vector_store_file = self.create_file(age=120)
+        processor = FileProcessor()
+        processor._pending.add(vector_store_file.pk)
+        processor.touch()
+        with mock.patch.object(file_processor, "submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                file_processor.requeue_stale(self.store.pk)
+        self.assertFalse(submit.called)
+
+    def test_files_no_longer_in_progress_are_skipped(self):
+        vector_store_file = self.create_file(status="cancelled")
+        with mock.patch(
+            "openai_api.vector_search.files.write_chunk"
+        ) as write_chunk, mock.patch.object(VectorStore, "adjust_file_stats") as stats:
+            process_file(vector_store_file.pk)
+        self.assertFalse(write_chunk.called)
+        self.assertFalse(stats.called)
@@ -0,0 +1,145 @@
+import numpy as np
+
+from dashboard.models import VectorEntry
+from ..embeddings import normalize_rows
+from ..exceptions import InvalidRequestError
+from ..vector_search.filters import (
+    AttributeIndex,
+    filterable_attributes,
+    validate_filters,
+)
+from ..vector_search.ingest import delete_entries
+from ..vector_search.search import embed_query, search_store
+from ..vector_search.segments import store_segments
+from .base import VectorStoreTestCase
+
+FILTERS = [
+    ({"type": "eq", "key": "lang", "value": "en"}, lambda m: m.get("lang") == "en"),
+    ({"type": "ne", "key": "lang", "value": "en"}, lambda m: m.get("lang") != "en"),
+    ({"type": "gt", "key": "year", "value": 2020}, lambda m: m.get("year", 0) > 2020),
+    (
+        {"type": "lte", "key": "year", "value": 2019},
+        lambda m: 0 < m.get("year", 0) <= 2019,
+    ),
+    (
+        {"type": "in", "key": "lang", "value": ["de", "fr"]},
+        lambda m: m.get("lang") in ("de", "fr"),
+    ),
+    (
+        {"type": "nin", "key": "lang", "value": ["de", "fr"]},
+        lambda m: m.get("lang") not in ("de", "fr"),
+    ),
+    ({"type": "eq", "key": "draft", "value": True}, lambda m: m.get("draft") is True),
+    (
+        {
+            "type": "or",
+            "filters": [
+                {"type": "eq", "key": "lang", "value": "de"},
+                {
+                    "type": "and",
+                    "filters": [
+                        {"type": "gte", "key": "year", "value": 2021},
+                        {"type": "eq", "key": "draft", "value": False},
+                    ],
+                },
+            ],
+        },
+        lambda m: m.get("lang") == "de"
+        or (m.get("year", 0) >= 2021 and m.get("draft") is False),
+    ),
+]
+
+
+def sample_metadata(number):
+    """Mixed attributes, with some keys missing and a chunk text to ignore"""
+    metadata = {"text": f"lang en year {number}"}
+    if number % 5:
+        metadata["lang"] = ["en", "de", "fr", "es"][number % 4]
+    if number % 7:
+        metadata["year"] = 2015 + number % 10
+    if number % 3:
+        metadata["draft"] = bool(number % 2)
+    return metadata
+
+
+class AttributeIndexTests(VectorStoreTestCase):
+    def test_evaluate_matches_predicates(self):
+        metadata = [sample_metadata(number) for number in range(120)]
+        index = AttributeIndex([filterable_attributes(m) for m in metadata])
+        for filters, predicate in FILTERS:
+            with self.subTest(filters=filters):
+                validate_filters(filters)
+                self.assertEqual(
+                    np.flatnonzero(index.evaluate(filters)).tolist(),
+                    [row for row, m in enumerate(metadata) if predicate(m)],
+                )
+
+    def test_only_scalar_attributes_other_than_text_are_filterable(self):
+        self.assertEqual(
+            filterable_attributes({"text": "en", "tags": ["a"], "n": 1, "x": None}),
+            {"n": 1},
+        )
+
+    def test_invalid_filters_are_rejected(self):
+        for filters in [
+            {"type": "eq", "key": "lang"},
+            {"type": "gt", "key": "year", "value": "2020"},
+            {"type": "in", "key": "lang", "value": "en"},
+            {"type": "and", "filters": []},
+            {"type": "like", "key": "lang", "value": "en"},
+        ]:
+            with self.subTest(filters=filters), self.assertRaises(InvalidRequestError):
+                validate_filters(filters)
+
+
+class FilteredSearchTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = self.create_store(index_type="ivf")
+        self.add_entries(
+            self.store,
+            self.random_vectors(150),
+            [sample_metadata(number) for number in range(150)],
+        )
+        store_segments.get(self.store)
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        delete_entries(self.store.pk, entries.filter(pk__in=entries.values("pk")[:20]))
+        self.store.refresh_from_db()
+
+    def matching_entries(self, predicate):
+        return [
+            entry
+            for entry in VectorEntry.objects.filter(vector_store=self.store)
+            if predicate(entry.metadata)
+        ]
+
+    def test_segment_search_matches_brute_force_over_matching_entries(self):
+        segment_set = store_segments.get(self.store)
+        queries = normalize_rows(self.random_vectors(3))
+        for filters, predicate in FILTERS:
+            entries = self.matching_entries(predicate)
+            for query in queries:
+                with self.subTest(filters=filters):
+                    ids, scores = segment_set.search(query, 10, filters=filters)
+                    expected_ids, expected_scores = self.brute_force(entries, query, 10)
+                    self.assertEqual(ids, expected_ids)
+                    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_store_search_returns_only_matching_entries(self):
+        filters, predicate = FILTERS[-1]
+        results = search_store(
+            self.store, "alpha", max_num_results=20, score_threshold=-1, filters=filters
+        )
+        query = embed_query("alpha", self.dimensions)
+        expected_ids, _ = self.brute_force(self.matching_entries(predicate), query, 20)
+        names = dict(
+            VectorEntry.objects.filter(pk__in=expected_ids).values_list(
+                "pk", "document_name"
+            )
+        )
+        self.assertEqual(
+            [result["filename"] for result in results],
+            [names[pk] for pk in expected_ids],
+        )
+        for result in results:
+            self.assertTrue(predicate(result["attributes"]))
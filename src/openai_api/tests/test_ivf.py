@@ -0,0 +1,98 @@
+import os
+from unittest import mock
+
+import numpy as np
+
+from dashboard.models import VectorEntry, VectorEntryDeletion
+from ..embeddings import normalize_rows
+from ..vector_search import ivf
+from ..vector_search.ingest import delete_entries
+from ..vector_search.ivf import index_path, store_indexes
+from .base import VectorStoreTestCase
+
+
+class IVFIndexTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = self.create_store(index_type="ivf")
+        self.add_entries(self.store, self.random_vectors(300))
+        store_indexes.get(self.store)
+
+    def assertSearchMatchesBruteForce(self, nprobe=None):
+        self.store.refresh_from_db()
+        index = store_indexes.get(self.store)
+        for query in normalize_rows(self.random_vectors(5)):
+            ids, scores = index.search(query, 10, nprobe)
+            expected_ids, expected_scores = self.brute_force(
+                VectorEntry.objects.filter(vector_store=self.store), query, 10
+            )
+            self.assertEqual(ids, expected_ids)
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def saved_file(self):
+        stat = os.stat(index_path(self.store.pk))
+        return stat.st_ino, stat.st_mtime_ns
+
+    def test_exact_search_matches_brute_force(self):
+        self.assertSearchMatchesBruteForce()
+        self.assertSearchMatchesBruteForce(nprobe=store_indexes.get(self.store).nlist)
+
+    def test_search_covers_delta_and_deletions(self):
+        self.add_entries(self.store, self.random_vectors(20))
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        delete_entries(self.store.pk, entries.filter(pk__in=entries.values("pk")[:30]))
+        self.assertEqual(store_indexes.get(self.store).delta_size, 20)
+        self.assertSearchMatchesBruteForce()
+
+    def test_appends_do_not_rewrite_the_saved_index(self):
+        saved = self.saved_file()
+        for _ in range(3):
+            self.add_entries(self.store, self.random_vectors(5))
+        self.assertEqual(self.saved_file(), saved)
+        self.assertEqual(store_indexes.get(self.store).delta_size, 15)
+
+    @mock.patch.object(ivf, "MIN_DELTA_ROWS", 0)
+    def test_large_delta_is_merged_and_saved(self):
+        saved = self.saved_file()
+        self.add_entries(self.store, self.random_vectors(100))
+        index = store_indexes.get(self.store)
+        self.assertEqual(index.delta_size, 0)
+        self.assertEqual(len(index), 400)
+        self.assertNotEqual(self.saved_file(), saved)
+        self.assertSearchMatchesBruteForce()
+
+    def test_other_process_catches_up_from_the_database(self):
+        added = self.add_entries(self.store, self.random_vectors(10))
+        # Delete a row of the saved part, not one of the new ones
+        entries = VectorEntry.objects.filter(vector_store=self.store).exclude(
+            pk__in=[entry.pk for entry in added]
+        )
+        delete_entries(self.store.pk, entries.filter(pk=entries.first().pk))
+        # A process that only has the saved trained part
+        store_indexes.invalidate(self.store.pk)
+        self.store.refresh_from_db()
+        index = store_indexes.get(self.store)
+        self.assertEqual(index.delta_size, 10)
+        self.assertEqual(len(index), 309)
+        self.assertSearchMatchesBruteForce()
+
+    def test_saved_index_holds_back_pruning_until_it_applied_the_records(self):
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        delete_entries(self.store.pk, entries.filter(pk__in=entries.values("pk")[:5]))
+        self.store.refresh_from_db()
+        ivf.prune_deletions(self.store)
+        self.assertEqual(VectorEntryDeletion.objects.count(), 1)
+
+    def test_index_saved_before_a_prune_is_rebuilt(self):
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        delete_entries(self.store.pk, entries.filter(pk__in=entries.values("pk")[:30]))
+        # While the store is flat its saved index is ignored and not updated
+        self.store.index_type = "flat"
+        self.store.refresh_from_db(fields=["version"])
+        ivf.prune_deletions(self.store)
+        self.assertFalse(VectorEntryDeletion.objects.exists())
+
+        self.store.index_type = "ivf"
+        store_indexes.invalidate(self.store.pk)
+        self.assertEqual(len(store_indexes.get(self.store)), 270)
+        self.assertSearchMatchesBruteForce()
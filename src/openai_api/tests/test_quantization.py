@@ -0,0 +1,88 @@
+from unittest import mock
+
+import numpy as np
+from django.test import override_settings
+
+from dashboard.models import VectorEntry
+from ..embeddings import normalize_rows
+from ..vector_search import segments, search
+from ..vector_search.ingest import delete_entries
+from ..vector_search.quantization import dequantize, fit_params, quantize
+from ..vector_search.segments import store_segments
+from .base import VectorStoreTestCase
+
+
+class QuantizationTests(VectorStoreTestCase):
+    def test_codes_round_trip_within_half_a_step(self):
+        vectors = normalize_rows(self.random_vectors(200))
+        params = fit_params(vectors.min(axis=0), vectors.max(axis=0))
+        codes = quantize(vectors, params)
+        self.assertEqual(codes.dtype, np.int8)
+        error = np.abs(dequantize(codes, params) - vectors)
+        self.assertTrue((error <= params[1] / 2 + 1e-6).all())
+
+    def test_constant_dimension_is_kept(self):
+        vectors = np.ones((4, 3), dtype=np.float32)
+        params = fit_params(vectors.min(axis=0), vectors.max(axis=0))
+        np.testing.assert_allclose(
+            dequantize(quantize(vectors, params), params), vectors
+        )
+
+
+class QuantizedSearchTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = self.create_store(quantization="int8")
+        # Two segments with deleted rows in the first
+        self.add_entries(self.store, self.random_vectors(300))
+        store_segments.get(self.store)
+        self.add_entries(self.store, self.random_vectors(100))
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        delete_entries(self.store.pk, entries.filter(pk__in=entries.values("pk")[:40]))
+        self.store.refresh_from_db()
+
+    def test_rescored_search_matches_brute_force(self):
+        segment_set = store_segments.get(self.store)
+        self.assertEqual(len(segment_set.segments), 2)
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        for query in normalize_rows(self.random_vectors(5)):
+            ids, scores = segment_set.search(query, 10, candidates=40)
+            expected_ids, expected_scores = self.brute_force(entries, query, 10)
+            self.assertEqual(ids, expected_ids)
+            # Rescored against the float32 rows, not the int8 approximations
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    def test_candidates_are_picked_from_the_codes(self):
+        segment_set = store_segments.get(self.store)
+        query = normalize_rows(self.random_vectors(1))[0]
+        with mock.patch.object(
+            segments, "approximate_scores", wraps=segments.approximate_scores
+        ) as approximate:
+            segment_set.search(query, 10)
+            self.assertFalse(approximate.called)
+            segment_set.search(query, 10, candidates=40)
+            self.assertTrue(approximate.called)
+
+    @override_settings(VECTOR_RESCORE_FACTOR=4)
+    def test_store_search_rescores_int8_stores(self):
+        with mock.patch.object(
+            store_segments.get(self.store), "search", return_value=([], [])
+        ) as segment_search:
+            search.exact_candidates(self.store, "alpha", 10)
+        self.assertEqual(segment_search.call_args.args[2], 40)
+
+    def test_switching_to_int8_needs_no_rebuild(self):
+        store = self.create_store()
+        self.add_entries(store, self.random_vectors(50))
+        segment_set = store_segments.get(store)
+        # Written with codes although the store does not use them yet
+        self.assertTrue(all(s.codes is not None for s in segment_set.segments))
+
+        store.quantization = "int8"
+        store.save()
+        with mock.patch.object(
+            segments, "approximate_scores", wraps=segments.approximate_scores
+        ) as approximate:
+            search.exact_candidates(store, "alpha", 5)
+        self.assertTrue(approximate.called)
+        self.assertIs(store_segments.get(store), segment_set)
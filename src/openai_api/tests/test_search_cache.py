@@ -0,0 +1,56 @@
+from django.test import override_settings
+
+from api_keys.models import APIKey
+from ..vector_search.cache import search_cache
+from .base import VectorStoreTestCase
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, VECTOR_INDEX_MIN_ENTRIES=10)
+class SearchCacheTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        search_cache.clear()
+        self.addCleanup(search_cache.clear)
+        self.add_entries(self.store, self.random_vectors(50))
+        key = APIKey.objects.create(user=self.user, name="test")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {key.key}"}
+
+    def search(self):
+        response = self.client.post(
+            f"/v1/vector_stores/vs_{self.store.pk}/search",
+            {"query": "alpha"},
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response["X-Search-Cache"]
+
+    def update_index(self, **options):
+        response = self.client.post(
+            f"/v1/vector_stores/vs_{self.store.pk}",
+            {"index": options},
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_repeated_search_is_a_hit(self):
+        self.assertEqual(self.search(), "miss")
+        self.assertEqual(self.search(), "hit")
+
+    def test_entry_writes_miss(self):
+        self.search()
+        self.add_entries(self.store, self.random_vectors(1))
+        self.assertEqual(self.search(), "miss")
+
+    def test_index_settings_changes_miss(self):
+        self.search()
+        for options in [
+            {"type": "ivf"},
+            {"nprobe": 2},
+            {"quantization": "int8"},
+        ]:
+            with self.subTest(options=options):
+                self.update_index(**options)
+                self.assertEqual(self.search(), "miss")
+                self.assertEqual(self.search(), "hit")
@@ -0,0 +1,137 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from dashboard.models import VectorEntry, VectorEntryDeletion, VectorStore
+from ..embeddings import normalize_rows
+from ..vector_search import segments
+from ..vector_search.ingest import delete_entries
+from ..vector_search.segments import SegmentRegistry, read_manifest, store_segments
+from .base import VectorStoreTestCase
+
+
+def live_vectors(segment_set):
+    """Entry id -> normalized vector of every live row"""
+    rows = {}
+    for ids, vectors in segment_set.live_chunks():
+        for entry_id, vector in zip(ids, vectors):
+            rows[uuid.UUID(bytes=entry_id.ljust(16, b"\0"))] = np.array(vector)
+    return rows
+
+
+class SegmentSyncTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.entries = self.add_entries(self.store, self.random_vectors(20))
+        store_segments.get(self.store)
+
+    def assertSegmentsMatchEntries(self):
+        self.store.refresh_from_db()
+        rows = live_vectors(store_segments.get(self.store))
+        entries = VectorEntry.objects.filter(vector_store=self.store)
+        self.assertEqual(set(rows), {entry.pk for entry in entries})
+        for entry in entries:
+            expected = normalize_rows(entry.vector[None].copy())[0]
+            np.testing.assert_allclose(rows[entry.pk], expected, rtol=1e-6)
+
+    def write_without_append(self, count):
+        """Entries written by a process whose append did not happen"""
+        with mock.patch.object(SegmentRegistry, "append", return_value=False):
+            return self.add_entries(self.store, self.random_vectors(count))
+
+    def test_appended_rows_are_searchable_without_sync(self):
+        self.add_entries(self.store, self.random_vectors(5))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertSegmentsMatchEntries()
+        self.assertFalse(
+            any("dashboard_vectorentrydeletion" in q["sql"] for q in queries)
+        )
+
+    def test_sync_after_insert(self):
+        self.write_without_append(7)
+        self.assertSegmentsMatchEntries()
+
+    def test_sync_after_update(self):
+        entry = self.entries[3]
+        entry.vector = self.random_vectors(1)[0]
+        entry.version = VectorStore.bump_version(self.store.pk)
+        entry.save()
+        self.assertSegmentsMatchEntries()
+
+    def test_sync_after_delete(self):
+        delete_entries(
+            self.store.pk,
+            VectorEntry.objects.filter(pk__in=[entry.pk for entry in self.entries[:5]]),
+        )
+        self.write_without_append(3)
+        self.assertSegmentsMatchEntries()
+        self.assertEqual(len(store_segments.get(self.store)), 18)
+
+    def test_sync_reads_late_committed_rows(self):
+        # A row whose transaction started before the last sync but committed
+        # after it has an older updated_at than the synced data
+        (late,) = self.write_without_append(1)
+        VectorEntry.objects.filter(pk=late.pk).update(
+            updated_at=late.updated_at - timedelta(hours=1)
+        )
+        self.assertSegmentsMatchEntries()
+
+    def test_first_sync_writes_one_segment_per_chunk(self):
+        store = self.create_store()
+        self.add_entries(store, self.random_vectors(45))
+        with mock.patch.object(segments, "segment_rows", return_value=10):
+            self.assertEqual(len(store_segments.get(store)), 45)
+        manifest = read_manifest(segments.store_dir(store.pk))
+        self.assertEqual(
+            [segment["rows"] for segment in manifest["segments"]], [10, 10, 10, 10, 5]
+        )
+
+    @override_settings(VECTOR_SEGMENT_MAX_COUNT=4)
+    def test_appends_keep_the_segment_count_bounded(self):
+        directory = segments.store_dir(self.store.pk)
+        for number in range(60):
+            self.add_entries(self.store, self.random_vectors(1))
+            if number == 30:
+                # An update shadows the older row, a delete tombstones one
+                entry = self.entries[0]
+                entry.vector = self.random_vectors(1)[0]
+                entry.version = VectorStore.bump_version(self.store.pk)
+                entry.save()
+                delete_entries(
+                    self.store.pk, VectorEntry.objects.filter(pk=self.entries[1].pk)
+                )
+                self.store.refresh_from_db()
+                store_segments.get(self.store)
+            manifest = read_manifest(directory)
+            self.assertLessEqual(len(manifest["segments"]), 4)
+
+        self.assertLessEqual(len(list(directory.iterdir())), 4 * 6 + 3)
+        self.assertSegmentsMatchEntries()
+        self.assertEqual(len(store_segments.get(self.store)), 79)
+
+    def test_sync_prunes_applied_deletions(self):
+        delete_entries(
+            self.store.pk, VectorEntry.objects.filter(pk=self.entries[0].pk)
+        )
+        self.assertEqual(VectorEntryDeletion.objects.count(), 1)
+        self.assertSegmentsMatchEntries()
+        self.assertFalse(VectorEntryDeletion.objects.exists())
+        self.assertEqual(self.store.deletions_pruned, self.store.version)
+
+    def test_segments_older_than_a_prune_are_rebuilt(self):
+        delete_entries(
+            self.store.pk, VectorEntry.objects.filter(pk=self.entries[0].pk)
+        )
+        # Another consumer applied and pruned the records these segments need
+        self.store.refresh_from_db()
+        VectorEntryDeletion.objects.all().delete()
+        VectorStore.objects.filter(pk=self.store.pk).update(
+            deletions_pruned=self.store.version
+        )
+        self.assertSegmentsMatchEntries()
+        self.assertEqual(len(store_segments.get(self.store)), 19)
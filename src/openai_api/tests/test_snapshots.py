@@ -0,0 +1,155 @@
+import io
+
+import numpy as np
+from django.test import override_settings
+
+from api_keys.models import APIKey
+from dashboard.models import VectorEntry, VectorStore
+from ..embeddings import normalize_rows
+from ..exceptions import InvalidRequestError
+from ..vector_search.ingest import delete_entries
+from ..vector_search.ivf import store_indexes
+from ..vector_search.segments import store_segments
+from ..vector_search.snapshots import export_snapshot, restore_snapshot
+from .base import VectorStoreTestCase
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class SnapshotTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = self.create_store(index_type="ivf", quantization="int8")
+        metadata = [
+            {"topic": "even" if i % 2 else "odd", "text": f"note {i} alpha"}
+            if i % 3
+            else None
+            for i in range(60)
+        ]
+        entries = self.add_entries(self.store, self.random_vectors(60), metadata)
+        delete_entries(
+            self.store.pk, VectorEntry.objects.filter(pk__in=[e.pk for e in entries[:6]])
+        )
+        self.store.refresh_from_db()
+        self.key = APIKey.objects.create(user=self.user, name="test")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {self.key.key}"}
+
+    def snapshot_bytes(self):
+        response = self.client.get(
+            f"/v1/vector_stores/vs_{self.store.pk}/snapshot", **self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def restore(self, data):
+        return self.client.post(
+            "/v1/vector_stores/snapshots?name=copy",
+            data=data,
+            content_type="application/octet-stream",
+            **self.headers,
+        )
+
+    def corrupted(self, **members):
+        """A snapshot of the store with some members replaced"""
+        with np.load(io.BytesIO(self.snapshot_bytes())) as snapshot:
+            arrays = dict(snapshot)
+        for name, value in members.items():
+            arrays[name.replace("__", ".")] = value
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def search_results(self, store, query):
+        store.refresh_from_db()
+        exact = store_segments.get(store).search(query, 10)
+        approximate = store_indexes.get(store).search(query, 10)
+        names = dict(
+            VectorEntry.objects.filter(vector_store=store).values_list(
+                "pk", "document_name"
+            )
+        )
+        return [
+            ([names[pk] for pk in ids], np.round(scores, 5).tolist())
+            for ids, scores in (exact, approximate)
+        ]
+
+    def test_round_trip(self):
+        response = self.restore(self.snapshot_bytes())
+        self.assertEqual(response.status_code, 200, response.content)
+        copy = VectorStore.objects.get(pk=response.json()["id"].removeprefix("vs_"))
+        self.assertEqual(copy.name, "copy")
+        self.assertEqual((copy.index_type, copy.quantization), ("ivf", "int8"))
+        self.assertEqual(copy.usage_bytes, self.store.usage_bytes)
+
+        rows = lambda store: sorted(
+            VectorEntry.objects.filter(vector_store=store).values_list(
+                "document_name", "embedding", "metadata"
+            ),
+            key=lambda row: row[0],
+        )
+        self.assertEqual(
+            [(name, bytes(embedding), metadata) for name, embedding, metadata in rows(copy)],
+            [
+                (name, bytes(embedding), metadata)
+                for name, embedding, metadata in rows(self.store)
+            ],
+        )
+        for query in normalize_rows(self.random_vectors(3)):
+            self.assertEqual(
+                self.search_results(copy, query), self.search_results(self.store, query)
+            )
+
+    def test_export_to_path_and_file_match(self):
+        path = f"{self.index_dir}/store.npz"
+        export_snapshot(self.store, path)
+        with open(path, "rb") as f, np.load(f) as from_path:
+            from_path = {name: from_path[name] for name in from_path.files}
+        buffer = io.BytesIO(b"stale bytes from an earlier attempt")
+        header = export_snapshot(self.store, buffer)
+        buffer.seek(0)
+        with np.load(buffer) as from_file:
+            self.assertEqual(sorted(from_file.files), sorted(from_path))
+            for name in from_path:
+                if name != "header":
+                    np.testing.assert_array_equal(from_file[name], from_path[name])
+        self.assertEqual((header["entries"], header["segment_rows"]), (54, 54))
+
+    def assertRejected(self, data):
+        stores = VectorStore.objects.count()
+        response = self.restore(data)
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json()["error"]["type"], "invalid_request_error")
+        self.assertEqual(VectorStore.objects.count(), stores)
+
+    def test_rejects_garbage(self):
+        self.assertRejected(b"not a snapshot")
+
+    def test_rejects_malformed_content(self):
+        content = b"".join([b'["doc", null]\n'] * 53 + [b"{not json\n"])
+        self.assertRejected(self.corrupted(content=np.frombuffer(content, np.uint8)))
+
+    def test_rejects_content_of_the_wrong_shape(self):
+        content = b"".join([b'["doc", null]\n'] * 53 + [b'["doc"]\n'])
+        self.assertRejected(self.corrupted(content=np.frombuffer(content, np.uint8)))
+
+    def test_rejects_segment_meta_line_count(self):
+        meta = b"{}\n" * 53
+        self.assertRejected(self.corrupted(segment__meta=np.frombuffer(meta, np.uint8)))
+
+    def test_rejects_segment_text_index(self):
+        self.assertRejected(
+            self.corrupted(segment__terms=np.frombuffer(b"PK\x03\x04junk", np.uint8))
+        )
+
+    def test_rejects_unknown_ids_in_search_data(self):
+        with np.load(io.BytesIO(self.snapshot_bytes())) as snapshot:
+            ids = snapshot["ivf.ids"].copy()
+        ids[0] = b"\x01" * 16
+        self.assertRejected(self.corrupted(ivf__ids=ids))
+
+    def test_restore_function_raises_invalid_request(self):
+        path = f"{self.index_dir}/bad.npz"
+        content = np.frombuffer(b"[\n" * 54, np.uint8)
+        with open(path, "wb") as f:
+            f.write(self.corrupted(content=content))
+        with self.assertRaises(InvalidRequestError):
+            restore_snapshot(path, self.user)
@@ -0,0 +1,143 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from api_keys.models import APIKey, APIKeyUsage
+from ..streaming import astream_events, iter_chat_completion_chunks, split_tokens
+
+
+def parse_events(body):
+    """The ``data:`` payloads of an SSE body, checking its framing"""
+    events = body.split("\n\n")
+    assert events[-1] == "", "the stream must end with a blank line"
+    payloads = []
+    for event in events[:-1]:
+        assert event.startswith("data: ") and "\n" not in event, event
+        payloads.append(event.removeprefix("data: "))
+    return payloads
+
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "Hello  there,\nworld!"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7},
+}
+
+
+class ChunkTests(TestCase):
+    def test_tokens_concatenate_back_to_the_text(self):
+        text = COMPLETION["choices"][0]["message"]["content"]
+        self.assertEqual("".join(split_tokens(text)), text)
+        self.assertEqual(split_tokens(" a  b"), [" a", "  b"])
+
+    def test_chunks_rebuild_the_completion(self):
+        chunks = list(iter_chat_completion_chunks(COMPLETION, include_usage=True))
+        for chunk in chunks:
+            self.assertEqual(
+                (chunk["id"], chunk["object"], chunk["created"], chunk["model"]),
+                ("chatcmpl-1", "chat.completion.chunk", 1700000000, "gpt-4"),
+            )
+        *choices, usage = chunks
+        self.assertEqual(
+            choices[0]["choices"][0]["delta"], {"role": "assistant", "content": ""}
+        )
+        self.assertEqual(
+            "".join(c["choices"][0]["delta"].get("content", "") for c in choices),
+            COMPLETION["choices"][0]["message"]["content"],
+        )
+        self.assertEqual(
+            [c["choices"][0]["finish_reason"] for c in choices],
+            [None] * (len(choices) - 1) + ["stop"],
+        )
+        self.assertEqual(choices[-1]["choices"][0]["delta"], {})
+        # Usage is null on every chunk but the last, which has no choices
+        self.assertTrue(all(c["usage"] is None for c in choices))
+        self.assertEqual((usage["choices"], usage["usage"]), ([], COMPLETION["usage"]))
+
+    def test_usage_is_omitted_unless_requested(self):
+        chunks = list(iter_chat_completion_chunks(COMPLETION))
+        self.assertTrue(all("usage" not in chunk for chunk in chunks))
+        self.assertTrue(all(chunk["choices"] for chunk in chunks))
+
+    def test_async_events_match_and_report_progress(self):
+        chunks = list(iter_chat_completion_chunks(COMPLETION))
+        finished = []
+
+        async def consume():
+            return "".join(
+                [
+                    event
+                    async for event in astream_events(
+                        chunks, 0, 0, lambda *args: finished.append(args)
+                    )
+                ]
+            )
+
+        payloads = parse_events(async_to_sync(consume)())
+        self.assertEqual([json.loads(p) for p in payloads[:-1]], chunks)
+        self.assertEqual(payloads[-1], "[DONE]")
+        self.assertEqual(finished, [(len(chunks), True)])
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=False,
+    QUOTA_ENABLED=False,
+    USAGE_LOGGING_MODE="sync",
+    STREAM_TIME_TO_FIRST_TOKEN_MS=0,
+    STREAM_INTER_TOKEN_DELAY_MS=0,
+)
+class StreamingViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="owner")
+        self.key = APIKey.objects.create(user=user, name="test")
+
+    def stream(self, **options):
+        response = self.client.post(
+            "/v1/chat/completions",
+            {
+                "model": "gpt-4",
+                "messages": [{"role": "user", "content": "Hi"}],
+                "stream": True,
+                **options,
+            },
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.key.key}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        return response
+
+    def test_stream_is_framed_as_server_sent_events(self):
+        response = self.stream(stream_options={"include_usage": True})
+        payloads = parse_events(b"".join(response.streaming_content).decode())
+        self.assertEqual(payloads[-1], "[DONE]")
+        chunks = [json.loads(payload) for payload in payloads[:-1]]
+        self.assertEqual(len({chunk["id"] for chunk in chunks}), 1)
+        self.assertEqual(chunks[-2]["choices"][0]["finish_reason"], "stop")
+
+        usage = APIKeyUsage.objects.get(api_key=self.key)
+        self.assertEqual(usage.endpoint, "chat_completions")
+        self.assertEqual(usage.total_tokens, chunks[-1]["usage"]["total_tokens"])
+        self.assertEqual(usage.error_message, "")
+
+    def test_disconnect_is_logged(self):
+        response = self.stream()
+        events = iter(response.streaming_content)
+        next(events)
+        next(events)
+        response.close()
+
+        usage = APIKeyUsage.objects.get(api_key=self.key)
+        self.assertEqual(usage.error_message, "Client disconnected")
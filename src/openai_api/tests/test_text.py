@@ -0,0 +1,169 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+from dashboard.models import VectorEntry
+from ..vector_search.ingest import delete_entries
+from ..vector_search.search import search_store
+from ..vector_search.segments import store_segments
+from ..vector_search.text import (
+    B,
+    K1,
+    TextIndex,
+    bm25_scores,
+    bm25_weights,
+    entry_text,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from .base import VectorStoreTestCase
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta".split()
+
+
+def bm25_brute_force(texts, query):
+    """BM25 score of every text containing a term of ``query``, by the formula"""
+    documents = [Counter(tokenize(text)) for text in texts]
+    average_length = sum(sum(d.values()) for d in documents) / len(documents)
+    scores = {}
+    for row, document in enumerate(documents):
+        length = sum(document.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            if not document[term]:
+                continue
+            frequency = sum(1 for d in documents if d[term])
+            idf = math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+            norm = K1 * (1 - B + B * length / average_length)
+            score += idf * document[term] * (K1 + 1) / (document[term] + norm)
+        if score:
+            scores[row] = score
+    return scores
+
+
+class TextIndexTests(VectorStoreTestCase):
+    def random_texts(self, count):
+        return [
+            " ".join(self.rng.choice(WORDS, self.rng.integers(1, 12)))
+            for _ in range(count)
+        ]
+
+    def test_scores_match_the_bm25_formula(self):
+        texts = self.random_texts(80) + ["", "Alpha, ALPHA!"]
+        index = TextIndex.build(texts)
+        for query in ["alpha", "beta gamma", "theta theta zeta", "missing"]:
+            weights, average_length = bm25_weights([index], set(tokenize(query)))
+            rows, scores = bm25_scores(index, weights, average_length)
+            expected = bm25_brute_force(texts, query)
+            self.assertEqual(rows.tolist(), sorted(expected))
+            np.testing.assert_allclose(
+                scores, [expected[row] for row in sorted(expected)], rtol=1e-5
+            )
+
+    def test_statistics_are_summed_over_indexes(self):
+        texts = self.random_texts(60)
+        parts = [TextIndex.build(texts[:25]), TextIndex.build(texts[25:])]
+        weights, average_length = bm25_weights(parts, {"alpha", "eta"})
+        expected = bm25_brute_force(texts, "alpha eta")
+        scores = {}
+        for start, index in zip((0, 25), parts):
+            rows, part_scores = bm25_scores(index, weights, average_length)
+            scores.update(zip((rows + start).tolist(), part_scores))
+        self.assertEqual(sorted(scores), sorted(expected))
+        for row, score in expected.items():
+            self.assertAlmostEqual(scores[row], score, places=5)
+
+    def test_merge_equals_build_over_live_rows(self):
+        texts = self.random_texts(50)
+        parts = [TextIndex.build(texts[:30]), TextIndex.build(texts[30:])]
+        live = [self.rng.random(30) < 0.7, self.rng.random(20) < 0.7]
+        merged = TextIndex.merge(list(zip(parts, live)))
+        built = TextIndex.build(
+            [text for text, keep in zip(texts, np.concatenate(live)) if keep]
+        )
+        for name in ("terms", "offsets", "rows", "frequencies", "lengths"):
+            np.testing.assert_array_equal(getattr(merged, name), getattr(built, name))
+
+    def test_bytes_round_trip(self):
+        index = TextIndex.build(self.random_texts(20))
+        copy = TextIndex.from_bytes(index.to_bytes())
+        self.assertTrue(copy.is_valid(20))
+        self.assertFalse(copy.is_valid(19))
+        np.testing.assert_array_equal(copy.rows, index.rows)
+
+
+class RankFusionTests(VectorStoreTestCase):
+    def test_weighted_reciprocal_rank_fusion(self):
+        ids, scores = reciprocal_rank_fusion(
+            [(["a", "b", "c"], 1.0), (["c", "d"], 2.0)], 3, constant=1
+        )
+        self.assertEqual(ids, ["c", "d", "a"])
+        np.testing.assert_allclose(scores, [1 / 4 + 2 / 2, 2 / 3, 1 / 2])
+
+
+class TextSearchTests(VectorStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        texts = [
+            " ".join(self.rng.choice(WORDS[1:], 6)) + (" alpha" * (i % 3))
+            for i in range(60)
+        ]
+        self.entries = self.add_entries(
+            self.store, self.random_vectors(40), [{"text": t} for t in texts[:40]]
+        )
+        store_segments.get(self.store)
+        self.entries += self.add_entries(
+            self.store, self.random_vectors(20), [{"text": t} for t in texts[40:]]
+        )
+
+    def texts(self):
+        return {
+            entry.pk: entry_text(entry.document_name, entry.metadata)
+            for entry in VectorEntry.objects.filter(vector_store=self.store)
+        }
+
+    def test_search_across_segments_matches_brute_force(self):
+        self.assertEqual(len(store_segments.get(self.store).segments), 2)
+        texts = self.texts()
+        pks = list(texts)
+        expected = bm25_brute_force([texts[pk] for pk in pks], "alpha zeta")
+
+        ids, scores = store_segments.get(self.store).text_search("alpha zeta", 100)
+        self.assertEqual(sorted(ids), sorted(pks[row] for row in expected))
+        self.assertEqual(scores.tolist(), sorted(scores.tolist(), reverse=True))
+        for pk, score in zip(ids, scores):
+            self.assertAlmostEqual(score, expected[pks.index(pk)], places=5)
+
+    def test_deleted_entries_are_not_returned(self):
+        deleted = [
+            entry.pk for entry in self.entries if "alpha" in entry.metadata["text"]
+        ]
+        delete_entries(self.store.pk, VectorEntry.objects.filter(pk__in=deleted[:10]))
+        self.store.refresh_from_db()
+        ids, _ = store_segments.get(self.store).text_search("alpha", 60)
+        self.assertEqual(len(ids), len(deleted) - 10)
+        self.assertFalse(set(ids) & set(deleted[:10]))
+
+    def test_hybrid_search_ranks_keyword_matches(self):
+        results = search_store(
+            self.store,
+            "alpha",
+            max_num_results=5,
+            hybrid={"embedding_weight": 0, "text_weight": 1},
+        )
+        self.assertEqual(len(results), 5)
+        for result in results:
+            self.assertIn("alpha", result["content"][0]["text"])
+
+        fused = search_store(
+            self.store,
+            "alpha",
+            max_num_results=60,
+            score_threshold=-1,
+            hybrid={"embedding_weight": 1, "text_weight": 1},
+        )
+        # Every entry is in the vector ranking
+        self.assertEqual(len(fused), 60)
+        scores = [result["score"] for result in fused]
+        self.assertEqual(scores, sorted(scores, reverse=True))
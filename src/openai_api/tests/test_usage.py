@@ -0,0 +1,57 @@
+import json
+
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.urls import reverse
+
+from dashboard.models import VectorEntry
+from ..vector_search.ingest import delete_entries, ingest_lines
+from .base import VectorStoreTestCase
+
+
+class UsageBytesTests(VectorStoreTestCase):
+    def assertUsageMatchesEntries(self, store):
+        store.refresh_from_db()
+        size = VectorEntry.objects.filter(vector_store=store).aggregate(
+            size=Sum(Length("embedding"))
+        )["size"]
+        self.assertEqual(store.usage_bytes, size or 0)
+
+    def test_written_entries(self):
+        self.add_entries(self.store, self.random_vectors(10))
+        self.assertEqual(self.store.usage_bytes, 10 * self.dimensions * 4)
+        self.assertUsageMatchesEntries(self.store)
+
+    def test_ndjson_ingest(self):
+        lines = [
+            json.dumps({"document_name": f"doc-{i}", "embedding": [0.5] * 4})
+            for i in range(7)
+        ]
+        lines.append("not json")
+        result = ingest_lines(self.store, lines, chunk_size=3)
+        self.assertEqual(result.created, 7)
+        self.assertUsageMatchesEntries(self.store)
+
+    def test_dashboard_form(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("add_vector_entry", args=[self.store.pk]),
+            {"document_name": "manual", "embedding": "[0.1, 0.2, 0.3]"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(VectorEntry.objects.filter(vector_store=self.store).count(), 1)
+        self.assertUsageMatchesEntries(self.store)
+
+    def test_deletes_subtract(self):
+        entries = self.add_entries(self.store, self.random_vectors(10))
+        delete_entries(
+            self.store.pk,
+            VectorEntry.objects.filter(pk__in=[entry.pk for entry in entries[:4]]),
+        )
+        self.assertUsageMatchesEntries(self.store)
+
+        stored_file = self.attach_file(self.store, 5)
+        self.assertUsageMatchesEntries(self.store)
+        stored_file.delete()
+        self.assertUsageMatchesEntries(self.store)
+        self.assertEqual(self.store.usage_bytes, 6 * self.dimensions * 4)
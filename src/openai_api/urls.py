@@ -1,26 +1,30 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Native async handlers for the OpenAI endpoints when running under ASGI
+api_views = async_views if settings.OPENAI_API_ASYNC else views
 
 urlpatterns = [
     # Chat completions endpoint
     path(
-        "chat/completions", views.ChatCompletionsView.as_view(), name="chat_completions"
+        "chat/completions", api_views.ChatCompletionsView.as_view(), name="chat_completions"
     ),
     # Embeddings endpoint
-    path("embeddings", views.EmbeddingsView.as_view(), name="embeddings"),
+    path("embeddings", api_views.EmbeddingsView.as_view(), name="embeddings"),
     # Moderations endpoint
-    path("moderations", views.ModerationsView.as_view(), name="moderations"),
+    path("moderations", api_views.ModerationsView.as_view(), name="moderations"),
     # Images generation endpoint
     path(
         "images/generations",
-        views.ImagesGenerationsView.as_view(),
+        api_views.ImagesGenerationsView.as_view(),
         name="images_generations",
     ),
     # Models listing endpoint
-    path("models", views.ModelsView.as_view(), name="models"),
+    path("models", api_views.ModelsView.as_view(), name="models"),
     # Model details endpoint
     path(
-        "models/<str:model_id>", views.ModelDetailsView.as_view(), name="model_details"
+        "models/<str:model_id>", api_views.ModelDetailsView.as_view(), name="model_details"
     ),
     # Vector stores endpoints
     path(
@@ -28,6 +32,16 @@ urlpatterns = [
         views.VectorStoreListCreateView.as_view(),
         name="vector_stores_list_create",
     ),  # GET, POST
+    path(
+        "vector_stores/search",
+        views.VectorStoreMultiSearchView.as_view(),
+        name="vector_store_multi_search",
+    ),  # POST
+    path(
+        "vector_stores/snapshots",
+        views.VectorStoreSnapshotRestoreView.as_view(),
+        name="vector_store_snapshot_restore",
+    ),  # POST
     path(
         "vector_stores/<str:vector_store_id>",
         views.VectorStoreRetrieveUpdateDeleteView.as_view(),
@@ -38,4 +52,44 @@ urlpatterns = [
         views.VectorStoreSearchView.as_view(),
         name="vector_store_search",
     ),  # POST
+    path(
+        "vector_stores/<str:vector_store_id>/entries",
+        views.VectorStoreEntriesView.as_view(),
+        name="vector_store_entries",
+    ),  # POST (NDJSON)
+    path(
+        "vector_stores/<str:vector_store_id>/snapshot",
+        views.VectorStoreSnapshotView.as_view(),
+        name="vector_store_snapshot",
+    ),  # GET
+    path(
+        "vector_stores/<str:vector_store_id>/files",
+        views.VectorStoreFilesView.as_view(),
+        name="vector_store_files",
+    ),  # GET, POST
+    path(
+        "vector_stores/<str:vector_store_id>/files/<str:file_id>",
+        views.VectorStoreFileDetailView.as_view(),
+        name="vector_store_file_detail",
+    ),  # GET, DELETE
+    path(
+        "vector_stores/<str:vector_store_id>/file_batches",
+        views.VectorStoreFileBatchCreateView.as_view(),
+        name="vector_store_file_batches",
+    ),  # POST
+    path(
+        "vector_stores/<str:vector_store_id>/file_batches/<str:batch_id>",
+        views.VectorStoreFileBatchDetailView.as_view(),
+        name="vector_store_file_batch_detail",
+    ),  # GET
+    path(
+        "vector_stores/<str:vector_store_id>/file_batches/<str:batch_id>/cancel",
+        views.VectorStoreFileBatchCancelView.as_view(),
+        name="vector_store_file_batch_cancel",
+    ),  # POST
+    path(
+        "vector_stores/<str:vector_store_id>/file_batches/<str:batch_id>/files",
+        views.VectorStoreFileBatchFilesView.as_view(),
+        name="vector_store_file_batch_files",
+    ),  # GET
 ]
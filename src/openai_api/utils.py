@@ -1,6 +1,7 @@
 import uuid
 import time
 import random
+from .embeddings import count_tokens, embed_batch, encode_base64, normalize_input
 
 
 def generate_request_id():
@@ -54,23 +55,28 @@ def generate_chat_completion_response(messages, model="gpt-3.5-turbo", max_token
     }
 
 
-def generate_embedding_response(input_text, model="text-embedding-ada-002"):
-    """Generate a mock embedding response"""
+def generate_embedding_response(
+    input_text, model="text-embedding-ada-002", dimensions=None, encoding_format="float"
+):
+    """Generate a mock embedding response with one embedding per input"""
 
-    # Generate mock embedding (random vector)
-    embedding_size = 1536  # OpenAI's ada-002 embedding size
-    embedding = [random.uniform(-1, 1) for _ in range(embedding_size)]
+    items = normalize_input(input_text)
+    embeddings = embed_batch(items, model, dimensions)
 
     # Calculate tokens
-    tokens = (
-        len(input_text.split())
-        if isinstance(input_text, str)
-        else sum(len(text.split()) for text in input_text)
-    )
+    tokens = count_tokens(items)
+
+    if encoding_format == "base64":
+        encoded = encode_base64(embeddings)
+    else:
+        encoded = embeddings.tolist()
 
     return {
         "object": "list",
-        "data": [{"object": "embedding", "index": 0, "embedding": embedding}],
+        "data": [
+            {"object": "embedding", "index": index, "embedding": embedding}
+            for index, embedding in enumerate(encoded)
+        ],
         "model": model,
         "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
     }
@@ -158,6 +164,18 @@ def get_available_models():
             "created": 1671217299,
             "owned_by": "openai",
         },
+        {
+            "id": "text-embedding-3-small",
+            "object": "model",
+            "created": 1705948997,
+            "owned_by": "system",
+        },
+        {
+            "id": "text-embedding-3-large",
+            "object": "model",
+            "created": 1705953180,
+            "owned_by": "system",
+        },
         {
             "id": "dall-e-3",
             "object": "model",
@@ -0,0 +1,79 @@
+"""
+Per-process LRU of vector store search results.
+
+Results are keyed on the store id, ``VectorStore.version`` and the store's
+search settings (index type, nprobe and quantization) together with a
+hash of the query, the filters, the result count and the ranking options.
+Every entry write or delete bumps the version, and changing the settings
+changes the key, so a changed store simply stops matching its old keys:
+stale results are never served and nothing has to be invalidated. Old
+keys age out of the LRU.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def search_key(store, query, filters, k, options):
+    """Cache key of one search; ``options`` are the ranking options used"""
+    digest = hashlib.blake2b(
+        json.dumps([query, filters, options], sort_keys=True).encode(),
+        digest_size=16,
+    ).digest()
+    index = (store.index_type, store.index_nprobe, store.quantization)
+    return (store.pk, store.version, index, digest, k)
+
+
+class SearchCache:
+    """LRU of search results bounded by ``VECTOR_SEARCH_CACHE_SIZE`` entries"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def set(self, key, results):
+        max_size = settings.VECTOR_SEARCH_CACHE_SIZE
+        if max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+            "max_entries": settings.VECTOR_SEARCH_CACHE_SIZE,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+search_cache = SearchCache()
@@ -0,0 +1,83 @@
+"""
+Background deletion of vector stores.
+
+``store.delete()`` cascades through every entry of the store in one
+transaction, holding the database write lock for as long as that takes.
+Instead a deleted store is only marked ``deleting``, which hides it from
+the API and the dashboard, and its in-progress files are cancelled. A
+worker then removes the entries ``VECTOR_DELETE_BATCH_SIZE`` at a time,
+each batch in its own short transaction so other writes get the lock in
+between, and finally deletes the (now small) store row; its
+``post_delete`` signal removes the segment and index files.
+
+Deletions interrupted by a restart are finished by the
+``purge_vector_stores`` management command.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from core.background import WorkerPool
+from dashboard.models import VectorEntry, VectorStore
+from .files import cancel_files
+from .ingest import delete_entries
+from .ivf import store_indexes
+from .segments import store_segments
+
+# Seconds between batches, so that writers waiting on the lock get it
+BATCH_PAUSE = 0.01
+
+
+def purge_store(store_pk):
+    """Delete the entries of store ``store_pk`` in batches, then the store"""
+    entries = VectorEntry.objects.filter(vector_store_id=store_pk)
+    deleted = 0
+    while True:
+        pks = list(
+            entries.values_list("pk", flat=True)[: settings.VECTOR_DELETE_BATCH_SIZE]
+        )
+        if not pks:
+            break
+        # Nothing searches a deleted store, so its deletes are not recorded
+        deleted += delete_entries(
+            store_pk, VectorEntry.objects.filter(pk__in=pks), record=False
+        )
+        time.sleep(BATCH_PAUSE)
+
+    # Cascades to the files and batches, and to any entries a file worker
+    # wrote before it noticed the cancellation
+    VectorStore.objects.filter(pk=store_pk).delete()
+    return deleted
+
+
+class StoreDeleter:
+    """Runs ``purge_store`` on a single background thread"""
+
+    def __init__(self):
+        self._pool = None
+        self._setup_lock = threading.Lock()
+
+    def submit(self, store_pk):
+        if self._pool is None:
+            with self._setup_lock:
+                if self._pool is None:
+                    # One store at a time keeps the write load bounded
+                    self._pool = WorkerPool("vector-store-deletion", 1)
+        return self._pool.submit(purge_store, store_pk)
+
+    def delete(self, store):
+        """Hide ``store`` and queue its deletion"""
+        with transaction.atomic():
+            VectorStore.objects.filter(pk=store.pk).update(deleting=True)
+            cancel_files(store.pk, store.files.all())
+            transaction.on_commit(lambda: self.submit(store.pk))
+        store.deleting = True
+        # Free this process's copy of the search data right away
+        store_segments.invalidate(store.pk)
+        store_indexes.invalidate(store.pk)
+
+
+store_deleter = StoreDeleter()
@@ -0,0 +1,70 @@
+"""
+Search several vector stores with one query.
+
+Each store is searched on a thread pool of ``VECTOR_SEARCH_WORKERS``
+threads (the NumPy scoring releases the GIL), so a request takes about as
+long as its slowest store rather than the sum of all of them. Every store
+returns its own best ``max_num_results`` in score order, and the pages are
+merged with a heap into one global top-k.
+"""
+
+import heapq
+import threading
+from itertools import islice
+
+from django.conf import settings
+
+from core.background import WorkerPool
+from .search import cached_search
+
+
+def search_one(store, query, options):
+    """``cached_search`` returning its exception instead of raising it"""
+    try:
+        return cached_search(store, query, **options)
+    except Exception as e:
+        return e
+
+
+class FederatedSearch:
+    def __init__(self):
+        self._pool = None
+        self._setup_lock = threading.Lock()
+
+    def pool(self):
+        if self._pool is None:
+            with self._setup_lock:
+                if self._pool is None:
+                    self._pool = WorkerPool(
+                        "vector-search", settings.VECTOR_SEARCH_WORKERS
+                    )
+        return self._pool
+
+    def search(self, stores, query, max_num_results=10, **options):
+        """
+        Return ``(results, cache hits)`` of searching ``stores`` in parallel.
+        Results carry the ``vector_store_id`` they came from.
+        """
+        options["max_num_results"] = max_num_results
+        if len(stores) == 1:
+            outcomes = [search_one(stores[0], query, options)]
+        else:
+            futures = [
+                self.pool().submit(search_one, store, query, options)
+                for store in stores
+            ]
+            outcomes = [future.result() for future in futures]
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+
+        pages = [
+            [{**result, "vector_store_id": f"vs_{store.pk}"} for result in results]
+            for store, (results, _) in zip(stores, outcomes)
+        ]
+        merged = heapq.merge(*pages, key=lambda result: -result["score"])
+        hits = sum(hit for _, hit in outcomes)
+        return list(islice(merged, max_num_results)), hits
+
+
+federated_search = FederatedSearch()
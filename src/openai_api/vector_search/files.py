@@ -0,0 +1,300 @@
+"""
+Background ingestion of stored files into vector stores.
+
+Attaching a file queues it on a thread pool and returns immediately. A
+worker streams the file, splits it into windows of ``max_chunk_size_tokens``
+whitespace tokens overlapping by ``chunk_overlap_tokens``, embeds the chunks
+in batches and bulk-inserts them. The ``VectorStoreFile`` status moves from
+``in_progress`` to ``completed`` or ``failed`` (or is ``cancelled`` by the
+client), and the batch it belongs to completes with its last file.
+
+Files queued or processing in a process have their ``updated_at`` refreshed
+by a heartbeat. A file left ``in_progress`` by a process that died stops
+getting refreshed, and once it is older than
+``VECTOR_STORE_FILE_STALE_SECONDS`` it is requeued the next time its store
+is read.
+"""
+
+import codecs
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.background import PeriodicWorker, WorkerPool
+from dashboard.models import (
+    VectorEntry,
+    VectorStore,
+    VectorStoreFile,
+    VectorStoreFileBatch,
+    pack_embedding,
+)
+from ..embeddings import embed_batch, native_dimensions
+from ..exceptions import InvalidRequestError
+from .ingest import delete_entries, write_chunk
+from .ivf import common_dimensions
+
+DEFAULT_MAX_CHUNK_TOKENS = 800
+DEFAULT_CHUNK_OVERLAP_TOKENS = 400
+READ_SIZE = 64 * 1024
+EMBED_BATCH_SIZE = 64
+
+
+def parse_chunking_strategy(strategy):
+    """
+    Validate a ``chunking_strategy`` request parameter and return it in its
+    ``static`` form.
+    """
+    if strategy is None or strategy == {"type": "auto"}:
+        return {
+            "type": "static",
+            "static": {
+                "max_chunk_size_tokens": DEFAULT_MAX_CHUNK_TOKENS,
+                "chunk_overlap_tokens": DEFAULT_CHUNK_OVERLAP_TOKENS,
+            },
+        }
+    if not isinstance(strategy, dict) or strategy.get("type") != "static":
+        raise InvalidRequestError(
+            "chunking_strategy.type must be 'auto' or 'static'",
+            param="chunking_strategy",
+        )
+
+    static = strategy.get("static") or {}
+    max_tokens = static.get("max_chunk_size_tokens", DEFAULT_MAX_CHUNK_TOKENS)
+    overlap = static.get("chunk_overlap_tokens", DEFAULT_CHUNK_OVERLAP_TOKENS)
+    if not isinstance(max_tokens, int) or not 100 <= max_tokens <= 4096:
+        raise InvalidRequestError(
+            "max_chunk_size_tokens must be an integer between 100 and 4096",
+            param="chunking_strategy.static.max_chunk_size_tokens",
+        )
+    if not isinstance(overlap, int) or not 0 <= overlap <= max_tokens // 2:
+        raise InvalidRequestError(
+            "chunk_overlap_tokens must be a non-negative integer no larger "
+            "than half of max_chunk_size_tokens",
+            param="chunking_strategy.static.chunk_overlap_tokens",
+        )
+    return {
+        "type": "static",
+        "static": {"max_chunk_size_tokens": max_tokens, "chunk_overlap_tokens": overlap},
+    }
+
+
+def iter_words(stream):
+    """Yield the whitespace-separated words of a binary stream, read lazily"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
+    while True:
+        data = stream.read(READ_SIZE)
+        text = partial + decoder.decode(data, final=not data)
+        words = text.split()
+        # The last word may continue in the next block
+        partial = words.pop() if words and data and not text[-1].isspace() else ""
+        yield from words
+        if not data:
+            if partial:
+                yield partial
+            return
+
+
+def iter_chunks(words, max_tokens, overlap):
+    """Group words into windows of ``max_tokens`` overlapping by ``overlap``"""
+    window = []
+    fresh = 0
+    for word in words:
+        window.append(word)
+        fresh += 1
+        if len(window) == max_tokens:
+            yield " ".join(window)
+            window = window[len(window) - overlap :] if overlap else []
+            fresh = 0
+    if fresh:
+        yield " ".join(window)
+
+
+def delete_file_entries(vector_store_file):
+    """Remove a file's chunks with one DELETE and one store version bump"""
+    return delete_entries(
+        vector_store_file.vector_store_id,
+        VectorEntry.objects.filter(file=vector_store_file),
+    )
+
+
+def cancel_files(store_pk, files):
+    """Mark the in-progress files among ``files`` (of one store) cancelled"""
+    with transaction.atomic():
+        cancelled = files.filter(status="in_progress").update(status="cancelled")
+        VectorStore.adjust_file_stats(
+            store_pk, in_progress=-cancelled, cancelled=cancelled
+        )
+
+
+def is_in_progress(vector_store_file):
+    return VectorStoreFile.objects.filter(
+        pk=vector_store_file.pk, status="in_progress"
+    ).exists()
+
+
+def finish_file(vector_store_file, status, usage_bytes=0, last_error=""):
+    with transaction.atomic():
+        finished = VectorStoreFile.objects.filter(
+            pk=vector_store_file.pk, status="in_progress"
+        ).update(status=status, usage_bytes=usage_bytes, last_error=last_error)
+        if finished:
+            VectorStore.adjust_file_stats(
+                vector_store_file.vector_store_id, in_progress=-1, **{status: 1}
+            )
+
+    batch_id = vector_store_file.batch_id
+    if batch_id is not None:
+        files = VectorStoreFile.objects.filter(batch_id=batch_id)
+        if not files.filter(status="in_progress").exists():
+            batch_status = (
+                "failed" if not files.exclude(status="failed").exists() else "completed"
+            )
+            VectorStoreFileBatch.objects.filter(
+                pk=batch_id, status="in_progress"
+            ).update(status=batch_status)
+
+
+def process_file(vector_store_file_id):
+    """Chunk, embed and store one attached file"""
+    vector_store_file = VectorStoreFile.objects.select_related(
+        "vector_store", "file"
+    ).get(pk=vector_store_file_id)
+    if vector_store_file.status != "in_progress":
+        # Cancelled while queued, or already finished by another worker
+        return
+    store = vector_store_file.vector_store
+    static = vector_store_file.chunking_strategy["static"]
+    model = settings.VECTOR_STORE_EMBEDDING_MODEL
+    dimensions = common_dimensions(
+        VectorEntry.objects.filter(vector_store=store)
+    ) or native_dimensions(model)
+    attributes = vector_store_file.attributes or {}
+
+    entries, vectors, texts = [], [], []
+    usage_bytes = 0
+
+    def embed_pending():
+        matrix = embed_batch(texts, model, dimensions, mode="deterministic")
+        for text, vector in zip(texts, matrix):
+            embedding, size = pack_embedding(vector)
+            entries.append(
+                VectorEntry(
+                    vector_store=store,
+                    file=vector_store_file,
+                    document_name=vector_store_file.file.name[:255],
+                    embedding=embedding,
+                    dimensions=size,
+                    metadata={**attributes, "text": text},
+                )
+            )
+            vectors.append(vector)
+        texts.clear()
+
+    def write_pending():
+        if entries:
+            write_chunk(store, list(entries), list(vectors))
+            entries.clear()
+            vectors.clear()
+
+    try:
+        with vector_store_file.file.file.open("rb") as stream:
+            words = iter_words(stream)
+            for text in iter_chunks(
+                words, static["max_chunk_size_tokens"], static["chunk_overlap_tokens"]
+            ):
+                texts.append(text)
+                usage_bytes += len(text.encode())
+                if len(texts) >= EMBED_BATCH_SIZE:
+                    embed_pending()
+                if len(entries) >= settings.VECTOR_INGEST_CHUNK_SIZE:
+                    if not is_in_progress(vector_store_file):
+                        break
+                    write_pending()
+            else:
+                embed_pending()
+                write_pending()
+    except Exception as e:
+        delete_file_entries(vector_store_file)
+        finish_file(vector_store_file, "failed", last_error=str(e))
+        raise
+
+    if is_in_progress(vector_store_file):
+        finish_file(vector_store_file, "completed", usage_bytes=usage_bytes)
+    else:
+        # Cancelled or removed while processing
+        delete_file_entries(vector_store_file)
+
+
+class FileProcessor:
+    """Runs ``process_file`` on a pool of ``VECTOR_STORE_FILE_WORKERS`` threads"""
+
+    def __init__(self):
+        self._pool = None
+        self._heartbeat = None
+        self._pending = set()
+        self._setup_lock = threading.Lock()
+
+    def submit(self, vector_store_file_id):
+        with self._setup_lock:
+            if self._pool is None:
+                self._pool = WorkerPool(
+                    "vector-store-files", settings.VECTOR_STORE_FILE_WORKERS
+                )
+                self._heartbeat = PeriodicWorker(
+                    "vector-store-file-heartbeat",
+                    self.touch,
+                    settings.VECTOR_STORE_FILE_STALE_SECONDS / 4,
+                )
+            self._pending.add(vector_store_file_id)
+        self._heartbeat.start()
+        return self._pool.submit(self._process, vector_store_file_id)
+
+    def enqueue(self, vector_store_file_id):
+        """Submit once the current transaction (if any) has committed"""
+        transaction.on_commit(lambda: self.submit(vector_store_file_id))
+
+    def _process(self, vector_store_file_id):
+        try:
+            process_file(vector_store_file_id)
+        finally:
+            with self._setup_lock:
+                self._pending.discard(vector_store_file_id)
+
+    def touch(self):
+        """Mark the files queued or processing in this process as alive"""
+        with self._setup_lock:
+            pending = list(self._pending)
+        if pending:
+            VectorStoreFile.objects.filter(
+                pk__in=pending, status="in_progress"
+            ).update(updated_at=timezone.now())
+
+    def requeue_stale(self, store_pk):
+        """
+        Queue again the store's ``in_progress`` files that no process has
+        touched for ``VECTOR_STORE_FILE_STALE_SECONDS``, dropping the chunks
+        their dead worker had written.
+        """
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.VECTOR_STORE_FILE_STALE_SECONDS
+        )
+        stale = VectorStoreFile.objects.filter(
+            vector_store_id=store_pk, status="in_progress", updated_at__lt=cutoff
+        )
+        for vector_store_file in stale:
+            # Only the reader whose update wins requeues the file
+            claimed = VectorStoreFile.objects.filter(
+                pk=vector_store_file.pk,
+                status="in_progress",
+                updated_at=vector_store_file.updated_at,
+            ).update(updated_at=timezone.now())
+            if claimed:
+                delete_file_entries(vector_store_file)
+                self.enqueue(vector_store_file.pk)
+
+
+file_processor = FileProcessor()
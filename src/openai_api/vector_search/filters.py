@@ -0,0 +1,161 @@
+"""
+OpenAI-style attribute filters for vector store search.
+
+A filter is either a comparison, ``{"type": "eq", "key": "lang", "value":
+"en"}`` with type eq, ne, gt, gte, lt, lte, in or nin, or a compound
+``{"type": "and" | "or", "filters": [...]}``. Filters are evaluated against
+an ``AttributeIndex``: an inverted index from attribute values to row
+numbers, plus value-sorted rows per numeric attribute for range
+comparisons. Evaluation returns a row mask, so rows are filtered before any
+vector is scored.
+
+Attributes are the string, number and boolean values of an entry's
+``metadata``, except the chunk ``text``.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from ..exceptions import InvalidRequestError
+
+COMPARISONS = {"eq", "ne", "gt", "gte", "lt", "lte", "in", "nin"}
+RANGES = {"gt", "gte", "lt", "lte"}
+COMPOUNDS = {"and", "or"}
+MAX_DEPTH = 8
+
+
+def value_token(value):
+    """Hashable form of a filterable attribute value, or None"""
+    if isinstance(value, bool):
+        return ("b", value)
+    if isinstance(value, (int, float)):
+        return ("n", float(value))
+    if isinstance(value, str):
+        return ("s", value)
+    return None
+
+
+def filterable_attributes(metadata):
+    """The attributes of an entry's metadata that filters can match"""
+    return {
+        key: value
+        for key, value in (metadata or {}).items()
+        if key != "text" and value_token(value) is not None
+    }
+
+
+def validate_filters(filters, param="filters", depth=0):
+    if not isinstance(filters, dict):
+        raise InvalidRequestError("Each filter must be an object", param=param)
+    if depth > MAX_DEPTH:
+        raise InvalidRequestError("Filters are nested too deeply", param=param)
+
+    filter_type = filters.get("type")
+    if filter_type in COMPOUNDS:
+        children = filters.get("filters")
+        if not isinstance(children, list) or not children:
+            raise InvalidRequestError(
+                f"'{filter_type}' filters need a non-empty filters list", param=param
+            )
+        for index, child in enumerate(children):
+            validate_filters(child, f"{param}.filters[{index}]", depth + 1)
+        return
+
+    if filter_type not in COMPARISONS:
+        raise InvalidRequestError(
+            f"Unknown filter type '{filter_type}'", param=f"{param}.type"
+        )
+    if not isinstance(filters.get("key"), str):
+        raise InvalidRequestError("Filter key must be a string", param=f"{param}.key")
+
+    value = filters.get("value")
+    if filter_type in ("in", "nin"):
+        valid = isinstance(value, list) and all(
+            value_token(item) is not None for item in value
+        )
+        expected = "a list of strings, numbers or booleans"
+    elif filter_type in RANGES:
+        valid = value_token(value) is not None and value_token(value)[0] == "n"
+        expected = "a number"
+    else:
+        valid = value_token(value) is not None
+        expected = "a string, number or boolean"
+    if not valid:
+        raise InvalidRequestError(
+            f"Value of a '{filter_type}' filter must be {expected}",
+            param=f"{param}.value",
+        )
+
+
+class AttributeIndex:
+    """Inverted index over the attributes of a fixed list of rows"""
+
+    def __init__(self, attributes):
+        self.rows = len(attributes)
+        postings = defaultdict(list)
+        numbers = defaultdict(lambda: ([], []))
+        for row, row_attributes in enumerate(attributes):
+            for key, value in (row_attributes or {}).items():
+                token = value_token(value)
+                if token is None:
+                    continue
+                postings[(key, token)].append(row)
+                if token[0] == "n":
+                    numbers[key][0].append(token[1])
+                    numbers[key][1].append(row)
+
+        self.postings = {
+            term: np.asarray(rows, dtype=np.int64) for term, rows in postings.items()
+        }
+        # Per numeric key: values in ascending order and their rows
+        self.numbers = {}
+        for key, (values, rows) in numbers.items():
+            order = np.argsort(values, kind="stable")
+            self.numbers[key] = (
+                np.asarray(values)[order],
+                np.asarray(rows, dtype=np.int64)[order],
+            )
+
+    def mask(self, rows):
+        result = np.zeros(self.rows, dtype=bool)
+        result[rows] = True
+        return result
+
+    def matching(self, key, values):
+        rows = [
+            self.postings.get((key, value_token(value)), np.zeros(0, np.int64))
+            for value in values
+        ]
+        return self.mask(np.concatenate(rows) if rows else np.zeros(0, np.int64))
+
+    def range(self, key, filter_type, value):
+        values, rows = self.numbers.get(key, (np.zeros(0), np.zeros(0, np.int64)))
+        if filter_type == "gt":
+            rows = rows[np.searchsorted(values, value, side="right") :]
+        elif filter_type == "gte":
+            rows = rows[np.searchsorted(values, value, side="left") :]
+        elif filter_type == "lt":
+            rows = rows[: np.searchsorted(values, value, side="left")]
+        else:
+            rows = rows[: np.searchsorted(values, value, side="right")]
+        return self.mask(rows)
+
+    def evaluate(self, filters):
+        """Boolean mask of the rows matching a validated filter"""
+        filter_type = filters["type"]
+        if filter_type in COMPOUNDS:
+            masks = [self.evaluate(child) for child in filters["filters"]]
+            combine = np.logical_and if filter_type == "and" else np.logical_or
+            return combine.reduce(masks)
+
+        key, value = filters["key"], filters["value"]
+        if filter_type in RANGES:
+            return self.range(key, filter_type, value)
+        if filter_type == "eq":
+            return self.matching(key, [value])
+        if filter_type == "ne":
+            return ~self.matching(key, [value])
+        if filter_type == "in":
+            return self.matching(key, value)
+        return ~self.matching(key, value)
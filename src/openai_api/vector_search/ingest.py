@@ -0,0 +1,179 @@
+"""
+Streaming bulk ingestion of vector entries from NDJSON.
+
+Each line is a JSON object with ``document_name``, ``embedding`` (a list
+of floats) and optional ``metadata``. Lines are parsed one at a time and
+written with ``bulk_create`` in chunks of ``VECTOR_INGEST_CHUNK_SIZE``,
+each in its own transaction, so memory use does not depend on the input
+size. Every committed chunk is appended to the store's segments (and its
+IVF index when loaded) directly instead of waiting for the next search
+to resync.
+
+``write_chunk`` and ``delete_entries`` are the write paths for entries
+from anywhere: each bumps the store version once, however many rows
+change, and keeps the store's ``usage_bytes`` equal to the size of its
+embeddings.
+"""
+
+import json
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Length
+
+from dashboard.models import (
+    VectorEntry,
+    VectorEntryDeletion,
+    VectorStore,
+    pack_embedding,
+)
+from .ivf import common_dimensions, store_indexes
+from .segments import store_segments
+
+MAX_REPORTED_ERRORS = 100
+
+
+class IngestResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "message": message})
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def parse_line(line, dimensions):
+    """Return ``(document_name, vector, metadata)`` or raise ``ValueError``"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError("Invalid JSON")
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+
+    document_name = record.get("document_name")
+    if not isinstance(document_name, str) or not document_name:
+        raise ValueError("document_name must be a non-empty string")
+    if len(document_name) > 255:
+        raise ValueError("document_name must be at most 255 characters")
+
+    embedding = record.get("embedding")
+    if not isinstance(embedding, list) or not embedding:
+        raise ValueError("embedding must be a non-empty list of numbers")
+    try:
+        vector = np.asarray(embedding, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("embedding must be a non-empty list of numbers")
+    if vector.ndim != 1 or not np.isfinite(vector).all():
+        raise ValueError("embedding must be a non-empty list of numbers")
+    if dimensions and len(vector) != dimensions:
+        raise ValueError(
+            f"embedding has {len(vector)} dimensions, the vector store uses {dimensions}"
+        )
+
+    metadata = record.get("metadata")
+    if metadata is not None and not isinstance(metadata, dict):
+        raise ValueError("metadata must be an object")
+    return document_name, vector, metadata
+
+
+def write_chunk(store, entries, vectors):
+    """Insert a chunk in one transaction and append it to the search data"""
+    usage_bytes = sum(len(entry.embedding) for entry in entries)
+    with transaction.atomic():
+        version = VectorStore.bump_version(store.pk, usage_bytes)
+        for entry in entries:
+            entry.version = version
+        VectorEntry.objects.bulk_create(entries)
+
+    ids = [entry.pk.bytes for entry in entries]
+    matrix = np.stack(vectors)
+    content = [(entry.document_name, entry.metadata) for entry in entries]
+    store_segments.append(store.pk, version, ids, matrix.copy(), content)
+    if store.index_type == "ivf":
+        store_indexes.append(store.pk, version, ids, matrix)
+
+
+def delete_entries(store_pk, entries, record=True):
+    """
+    Delete the ``entries`` queryset (all in store ``store_pk``) with one
+    DELETE and one version bump, recording the deleted ids for search data
+    to catch up on unless ``record`` is false. Returns the number of rows
+    deleted.
+    """
+    with transaction.atomic():
+        version = VectorStore.bump_version(store_pk)
+        # Read once the store row is held, so no write slips in between
+        rows = list(entries.values_list("pk", Length("embedding")))
+        if not rows:
+            return 0
+        if record:
+            VectorEntryDeletion.objects.create(
+                vector_store_id=store_pk,
+                version=version,
+                entry_ids=b"".join(pk.bytes for pk, _ in rows),
+            )
+        deleted, _ = entries.delete()
+        VectorStore.objects.filter(pk=store_pk).update(
+            usage_bytes=F("usage_bytes") - sum(size or 0 for _, size in rows)
+        )
+    return deleted
+
+
+def ingest_lines(store, lines, chunk_size=None):
+    """
+    Ingest NDJSON ``lines`` (str or bytes) into ``store``. Invalid lines are
+    skipped and reported; valid ones are committed chunk by chunk.
+    """
+    chunk_size = chunk_size or settings.VECTOR_INGEST_CHUNK_SIZE
+    result = IngestResult()
+
+    # Bring the search data up to date so chunks can be appended to it
+    store_segments.get(store)
+    if store.index_type == "ivf":
+        store_indexes.get(store)
+    dimensions = common_dimensions(VectorEntry.objects.filter(vector_store=store))
+
+    entries, vectors = [], []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.strip():
+            continue
+        try:
+            document_name, vector, metadata = parse_line(line, dimensions)
+        except ValueError as e:
+            result.add_error(line_number, str(e))
+            continue
+
+        dimensions = dimensions or len(vector)
+        embedding, size = pack_embedding(vector)
+        entries.append(
+            VectorEntry(
+                vector_store=store,
+                document_name=document_name,
+                embedding=embedding,
+                dimensions=size,
+                metadata=metadata,
+            )
+        )
+        vectors.append(vector)
+        if len(entries) >= chunk_size:
+            write_chunk(store, entries, vectors)
+            result.created += len(entries)
+            entries, vectors = [], []
+
+    if entries:
+        write_chunk(store, entries, vectors)
+        result.created += len(entries)
+
+    store_segments.compact(store, only_if_needed=True)
+    return result
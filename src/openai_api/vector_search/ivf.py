@@ -0,0 +1,538 @@
+"""
+IVF-flat approximate nearest-neighbour index for large vector stores.
+
+Vectors are clustered around ``nlist`` centroids with spherical k-means and
+kept in one inverted list per centroid. A query scores the centroids and
+only scans the ``nprobe`` closest lists, trading recall for latency;
+probing every list is an exact search.
+
+The trained part of the index is saved as ``<store id>.ivf.npz`` under
+``VECTOR_INDEX_DIR`` and memory-mapped by every process. Entries written
+since are assigned to their nearest centroid and kept in a per-process
+delta that searches probe alongside the inverted lists, and entries
+recorded as deleted are masked out, so an insert costs only its own rows.
+Once the delta reaches a quarter of the trained rows it is merged into a
+new file, and the index is retrained from scratch once enough of it is
+stale.
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from dashboard.models import VectorEntry, VectorEntryDeletion, VectorStore
+from ..embeddings import normalize_rows
+from .mapped import map_npz
+
+FORMAT_VERSION = 3
+KMEANS_ITERATIONS = 10
+# Training sample size per centroid
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK_SIZE = 65536
+# Retrain once this share of rows is deleted or the index has grown this much
+MAX_DEAD_FRACTION = 0.25
+MAX_GROWTH = 4
+# Merge the delta into the trained part once it has this share of its rows
+MAX_DELTA_FRACTION = 0.25
+MIN_DELTA_ROWS = 4096
+FETCH_CHUNK_SIZE = 2000
+
+
+def default_nlist(count):
+    return int(min(4096, max(1, np.sqrt(count))))
+
+
+def assign(vectors, centroids):
+    """Index of the closest centroid for each row, computed in chunks"""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start : start + ASSIGN_CHUNK_SIZE]
+        labels[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors, nlist, rng=None):
+    """Spherical k-means on a sample of ``vectors``"""
+    rng = rng or np.random.default_rng(0)
+    nlist = min(nlist, len(vectors))
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = ~sums.any(axis=1)
+        # Reseed empty clusters with random sample points
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def index_path(store_pk):
+    return Path(settings.VECTOR_INDEX_DIR) / f"{store_pk}.ivf.npz"
+
+
+class IVFIndex:
+    """
+    The trained part of an index (centroids and the rows assigned to them)
+    plus a delta of the rows added since. The trained part is only written
+    to disk when the index is built, merged or retrained; in between, each
+    process keeps its delta and deletion mask in memory and searches the
+    delta alongside the inverted lists.
+    """
+
+    def __init__(self, centroids, vectors, ids, labels, version, order=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        # Entry UUIDs as 16-byte strings, row-aligned with vectors
+        self.ids = ids
+        self.labels = labels
+        self.alive = np.ones(len(ids), dtype=bool)
+        self.version = version
+        self.trained_size = len(ids)
+        # Row numbers sorting ids, to find rows by id without a full scan
+        self._order = order
+        self._lists = None
+
+        self.delta_size = 0
+        self.delta_vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.delta_ids = np.zeros(0, dtype="S16")
+        self.delta_labels = np.zeros(0, dtype=np.int32)
+        self.delta_alive = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return int(self.alive.sum()) + int(self.delta_alive[: self.delta_size].sum())
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @property
+    def dimensions(self):
+        return self.vectors.shape[1]
+
+    @property
+    def order(self):
+        if self._order is None:
+            self._order = np.argsort(self.ids, kind="stable")
+        return self._order
+
+    @classmethod
+    def train(cls, vectors, ids, version=0, nlist=None):
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if len(vectors):
+            centroids = train_centroids(vectors, nlist or default_nlist(len(vectors)))
+        else:
+            centroids = np.zeros((1, vectors.shape[1]), np.float32)
+        return cls(
+            centroids,
+            vectors,
+            np.asarray(ids, dtype="S16"),
+            assign(vectors, centroids),
+            version,
+        )
+
+    def lists(self):
+        """Row numbers of each inverted list of the trained part"""
+        if self._lists is None:
+            order = np.argsort(self.labels, kind="stable")
+            bounds = np.searchsorted(self.labels[order], np.arange(self.nlist + 1))
+            self._lists = [
+                order[bounds[i] : bounds[i + 1]] for i in range(self.nlist)
+            ]
+        return self._lists
+
+    def trained_rows(self, ids):
+        """Row numbers of the trained part holding any of ``ids``"""
+        if not len(ids) or not len(self.ids):
+            return np.zeros(0, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids, sorter=self.order)
+        positions = np.minimum(positions, len(self.ids) - 1)
+        rows = self.order[positions]
+        return rows[self.ids[rows] == ids]
+
+    def remove(self, ids):
+        ids = np.asarray(ids, dtype="S16")
+        if not len(ids):
+            return
+        self.alive[self.trained_rows(ids)] = False
+        if self.delta_size:
+            self.delta_alive[: self.delta_size] &= ~np.isin(
+                self.delta_ids[: self.delta_size], ids
+            )
+
+    def _reserve(self, count):
+        """Grow the delta arrays geometrically so appends stay cheap"""
+        needed = self.delta_size + count
+        if needed <= len(self.delta_ids):
+            return
+        capacity = max(needed, 2 * len(self.delta_ids), 1024)
+        used = self.delta_size
+        vectors = np.empty((capacity, self.dimensions), dtype=np.float32)
+        vectors[:used] = self.delta_vectors[:used]
+        ids = np.empty(capacity, dtype="S16")
+        ids[:used] = self.delta_ids[:used]
+        labels = np.empty(capacity, dtype=np.int32)
+        labels[:used] = self.delta_labels[:used]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:used] = self.delta_alive[:used]
+        self.delta_vectors, self.delta_ids = vectors, ids
+        self.delta_labels, self.delta_alive = labels, alive
+
+    def add(self, vectors, ids):
+        """Append rows to the delta, replacing live rows with the same ids"""
+        if not len(ids):
+            return
+        ids = np.asarray(ids, dtype="S16")
+        self.remove(ids)
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self._reserve(len(ids))
+        start, end = self.delta_size, self.delta_size + len(ids)
+        self.delta_vectors[start:end] = vectors
+        self.delta_ids[start:end] = ids
+        self.delta_labels[start:end] = assign(vectors, self.centroids)
+        self.delta_alive[start:end] = True
+        self.delta_size = end
+
+    def live(self):
+        """``(vectors, ids, labels)`` of every live row, trained part first"""
+        delta_alive = self.delta_alive[: self.delta_size]
+        return (
+            np.concatenate(
+                [self.vectors[self.alive], self.delta_vectors[: self.delta_size][delta_alive]]
+            ),
+            np.concatenate(
+                [self.ids[self.alive], self.delta_ids[: self.delta_size][delta_alive]]
+            ),
+            np.concatenate(
+                [self.labels[self.alive], self.delta_labels[: self.delta_size][delta_alive]]
+            ),
+        )
+
+    def needs_retraining(self):
+        live = len(self)
+        total = len(self.alive) + self.delta_size
+        return live > MAX_GROWTH * max(self.trained_size, 1) or (
+            total - live > MAX_DEAD_FRACTION * total
+        )
+
+    def needs_merge(self):
+        return self.delta_size > MAX_DELTA_FRACTION * max(len(self.ids), MIN_DELTA_ROWS)
+
+    def retrained(self):
+        vectors, ids, _ = self.live()
+        return IVFIndex.train(vectors, ids, self.version)
+
+    def merged(self):
+        """The live rows as a new trained part, keeping the centroids"""
+        vectors, ids, labels = self.live()
+        index = IVFIndex(self.centroids, vectors, ids, labels, self.version)
+        index.trained_size = self.trained_size
+        return index
+
+    def maintained(self):
+        """This index, or a retrained or merged copy once it has drifted"""
+        if self.needs_retraining():
+            return self.retrained()
+        if self.needs_merge():
+            return self.merged()
+        return self
+
+    def search(self, query, k, nprobe=None):
+        """
+        Return ``(entry ids, scores)`` of the best ``k`` live rows, scanning
+        the ``nprobe`` closest lists or every list when ``nprobe`` is None.
+        """
+        delta_rows = np.flatnonzero(self.delta_alive[: self.delta_size])
+        if nprobe is None or nprobe >= self.nlist:
+            rows = np.flatnonzero(self.alive)
+        else:
+            probed = np.argpartition(-(self.centroids @ query), nprobe)[:nprobe]
+            lists = self.lists()
+            rows = np.concatenate([lists[label] for label in probed])
+            rows = rows[self.alive[rows]]
+            delta_rows = delta_rows[np.isin(self.delta_labels[delta_rows], probed)]
+
+        scores = np.concatenate(
+            [self.vectors[rows] @ query, self.delta_vectors[delta_rows] @ query]
+        )
+        ids = np.concatenate([self.ids[rows], self.delta_ids[delta_rows]])
+        if k < len(scores):
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [uuid.UUID(bytes=ids[i].ljust(16, b"\0")) for i in best], scores[best]
+
+    def save(self, path):
+        """Write the trained part; the delta and deletions are not saved"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write a temporary file and rename it so readers never see half an index
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    format=FORMAT_VERSION,
+                    centroids=self.centroids,
+                    vectors=self.vectors,
+                    ids=self.ids,
+                    labels=self.labels,
+                    order=self.order,
+                    version=self.version,
+                    trained_size=self.trained_size,
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a saved index. Its arrays stay memory-mapped read-only, shared
+        with every process using the same file; only the deletion mask and
+        the delta are per process.
+        """
+        data = map_npz(path)
+        if int(data["format"]) != FORMAT_VERSION:
+            return None
+        index = cls(
+            data["centroids"],
+            data["vectors"],
+            data["ids"],
+            data["labels"],
+            int(data["version"]),
+            order=data["order"],
+        )
+        index.trained_size = int(data["trained_size"])
+        return index
+
+    @staticmethod
+    def stored_version(path):
+        """Version of the index saved at ``path``, without loading its vectors"""
+        try:
+            with np.load(path) as data:
+                if int(data["format"]) != FORMAT_VERSION:
+                    return None
+                return int(data["version"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def iter_rows(queryset, dimensions, chunk_rows=FETCH_CHUNK_SIZE, with_content=False):
+    """
+    Stream ``(ids, vectors)`` for the entries in ``queryset`` whose
+    embeddings have ``dimensions`` values, up to ``chunk_rows`` rows at a
+    time. With ``with_content``, their ``(document_name, metadata)`` pairs
+    are yielded as a third item.
+    """
+    fields = ["pk", "embedding", "dimensions"]
+    if with_content:
+        fields += ["document_name", "metadata"]
+    ids, blobs, content = [], [], []
+
+    def chunk():
+        matrix = np.frombuffer(b"".join(blobs), dtype="<f4")
+        matrix = matrix.reshape(len(ids), dimensions).astype(np.float32)
+        if with_content:
+            return ids, matrix, content
+        return ids, matrix
+
+    rows = queryset.values_list(*fields).iterator(
+        chunk_size=min(chunk_rows, FETCH_CHUNK_SIZE)
+    )
+    for row in rows:
+        if row[2] != dimensions:
+            continue
+        ids.append(row[0].bytes)
+        blobs.append(row[1])
+        if with_content:
+            content.append((row[3], row[4]))
+        if len(ids) == chunk_rows:
+            yield chunk()
+            ids, blobs, content = [], [], []
+    if ids:
+        yield chunk()
+
+
+def fetch_rows(queryset, dimensions):
+    """``(ids, vectors)`` of every entry ``iter_rows`` yields, in one array"""
+    ids, chunks = [], []
+    for chunk_ids, vectors in iter_rows(queryset, dimensions):
+        ids += chunk_ids
+        chunks.append(vectors)
+    if not chunks:
+        return ids, np.zeros((0, dimensions), dtype=np.float32)
+    return ids, np.concatenate(chunks)
+
+
+def deleted_ids(store, after, until):
+    """
+    Ids of the entries deleted from ``store`` by versions in (after, until],
+    or None when some of those records have been pruned and the caller has
+    to rebuild from the entries instead
+    """
+    records = list(
+        VectorEntryDeletion.objects.filter(
+            vector_store=store, version__gt=after, version__lte=until
+        ).values_list("entry_ids", flat=True)
+    )
+    # Read after the records, so a prune that removed any of them is seen
+    pruned = VectorStore.objects.values_list("deletions_pruned", flat=True).get(
+        pk=store.pk
+    )
+    if after < pruned:
+        return None
+    return np.frombuffer(b"".join(records), dtype="S16")
+
+
+def prune_deletions(store):
+    """
+    Remove the deletion records that all of the store's saved search data
+    has applied: its segments and, for IVF stores, its index file. Data
+    built later reads the entries as of its own version, so it never needs
+    older records.
+    """
+    from .segments import read_manifest, store_dir
+
+    versions = [store.version]
+    manifest = read_manifest(store_dir(store.pk))
+    if manifest is not None:
+        versions.append(manifest["version"])
+    if store.index_type == "ivf":
+        stored = IVFIndex.stored_version(index_path(store.pk))
+        if stored is not None:
+            versions.append(stored)
+    floor = min(versions)
+    if floor <= store.deletions_pruned:
+        return
+    with transaction.atomic():
+        VectorStore.objects.filter(pk=store.pk, deletions_pruned__lt=floor).update(
+            deletions_pruned=floor
+        )
+        VectorEntryDeletion.objects.filter(
+            vector_store_id=store.pk, version__lte=floor
+        ).delete()
+    store.deletions_pruned = floor
+
+
+def common_dimensions(queryset):
+    """Most frequent embedding size among the entries in ``queryset``"""
+    return (
+        queryset.filter(dimensions__gt=0)
+        .values("dimensions")
+        .annotate(count=Count("pk"))
+        .order_by("-count")
+        .values_list("dimensions", flat=True)
+        .first()
+    ) or 0
+
+
+def sync_index(index, store):
+    """
+    Bring ``index`` up to ``store.version``: drop entries deleted since its
+    version, add entries written since to its delta, and merge or retrain
+    it when that has grown too large. Returns the index, or a new one to
+    save when it was rebuilt.
+    """
+    version = store.version
+    entries = VectorEntry.objects.filter(vector_store=store, version__lte=version)
+
+    deleted = None
+    if index is not None and index.dimensions:
+        deleted = deleted_ids(store, index.version, version)
+    if deleted is None:
+        ids, vectors = fetch_rows(entries, common_dimensions(entries))
+        return IVFIndex.train(vectors, ids, version)
+
+    index.remove(deleted)
+    ids, vectors = fetch_rows(
+        entries.filter(version__gt=index.version), index.dimensions
+    )
+    index.add(vectors, ids)
+    index.version = version
+    return index.maintained()
+
+
+class IndexRegistry:
+    """
+    Per-process cache of IVF indexes. A worker that finds its copy stale
+    first looks for a newer trained part saved by another process, then
+    catches up on the changes since from the database.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._sync_locks = {}
+
+    def _sync_lock(self, store_pk):
+        with self._lock:
+            return self._sync_locks.setdefault(store_pk, threading.Lock())
+
+    def get(self, store):
+        index = self._indexes.get(store.pk)
+        if index is not None and index.version == store.version:
+            return index
+
+        with self._sync_lock(store.pk):
+            index = self._indexes.get(store.pk)
+            if index is not None and index.version == store.version:
+                return index
+
+            path = index_path(store.pk)
+            stored = IVFIndex.stored_version(path)
+            if stored is not None and stored > (index.version if index else -1):
+                index = IVFIndex.load(path)
+            if index is None or index.version != store.version:
+                synced = sync_index(index, store)
+                if synced is not index:
+                    synced.save(path)
+                    prune_deletions(store)
+                index = synced
+            self._indexes[store.pk] = index
+            return index
+
+    def append(self, store_pk, version, ids, vectors):
+        """
+        Add rows just inserted by the change that produced ``version`` to
+        this process's copy of the index, if it was current right before.
+        The delta is merged (and saved) once it has grown large enough.
+        """
+        with self._sync_lock(store_pk):
+            index = self._indexes.get(store_pk)
+            if index is None or index.version != version - 1:
+                return False
+            if index.dimensions and index.dimensions != vectors.shape[1]:
+                return False
+            if index.dimensions:
+                index.add(vectors, ids)
+                index.version = version
+                rebuilt = index.maintained()
+            else:
+                # First rows of an empty store
+                rebuilt = IVFIndex.train(vectors, ids, version)
+            if rebuilt is not index:
+                rebuilt.save(index_path(store_pk))
+                self._indexes[store_pk] = rebuilt
+        return True
+
+    def invalidate(self, store_pk, delete_file=False):
+        with self._lock:
+            self._indexes.pop(store_pk, None)
+        if delete_file:
+            index_path(store_pk).unlink(missing_ok=True)
+
+
+store_indexes = IndexRegistry()
@@ -0,0 +1,56 @@
+"""
+Read-only memory mapping of the arrays in an uncompressed ``.npz`` file.
+
+``numpy.load`` ignores ``mmap_mode`` for archives and copies every array
+into the process heap. The archives written by ``numpy.savez`` store their
+members uncompressed, so each member's data can be mapped in place
+instead: every worker then shares one copy through the OS page cache, and
+a worker that opens a newer file generation keeps using the old one until
+it lets go of it (replaced files stay alive while mapped).
+"""
+
+import struct
+import zipfile
+
+import numpy as np
+
+# Fixed part of a zip local file header, before the name and extra field
+LOCAL_HEADER_SIZE = 30
+
+
+def member_offset(f, info):
+    f.seek(info.header_offset + LOCAL_HEADER_SIZE - 4)
+    name_length, extra_length = struct.unpack("<HH", f.read(4))
+    return info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+
+def map_npz(path):
+    """
+    Return a dict of the arrays in the ``.npz`` at ``path``, memory-mapped
+    where possible and loaded otherwise (compressed members, scalars and
+    object arrays).
+    """
+    arrays = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f) as archive:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")]
+            if info.compress_type == zipfile.ZIP_STORED:
+                f.seek(member_offset(f, info))
+                if np.lib.format.read_magic(f) == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(f)
+                else:
+                    header = np.lib.format.read_array_header_2_0(f)
+                shape, fortran_order, dtype = header
+                if shape and all(shape) and not dtype.hasobject:
+                    arrays[name] = np.memmap(
+                        path,
+                        dtype=dtype,
+                        mode="r",
+                        offset=f.tell(),
+                        shape=shape,
+                        order="F" if fortran_order else "C",
+                    )
+                    continue
+            with archive.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
@@ -0,0 +1,78 @@
+"""
+Load vector stores' search data before gunicorn forks its workers.
+
+``gunicorn.conf.py`` runs ``preload_stores`` in the master process when
+``VECTOR_PRELOAD_STORES`` is set. Every listed store is synced, its
+segment files are read into the page cache, and its attribute indexes,
+BM25 indexes and IVF index are loaded. Forked workers inherit all of it:
+memory-mapped files stay shared through the page cache, and heap arrays
+are shared copy-on-write because nothing writes to them (``gc.freeze``
+keeps the collector from touching the objects' headers).
+
+A worker whose store changes later moves on to the new generation on its
+next search like any other process; the preloaded generation is released
+once no worker uses it.
+"""
+
+import gc
+import uuid
+
+from django.conf import settings
+from django.db import connections
+
+from dashboard.models import VectorStore
+from .ivf import store_indexes
+from .segments import store_segments
+
+
+def preload_targets(spec):
+    """Stores named by a ``VECTOR_PRELOAD_STORES`` value"""
+    stores = VectorStore.objects.filter(deleting=False)
+    if spec.strip() == "*":
+        return stores
+    ids = []
+    for name in spec.split(","):
+        name = name.strip().removeprefix("vs_")
+        try:
+            ids.append(uuid.UUID(name))
+        except ValueError:
+            if name:
+                print(f"Not preloading unknown vector store {name!r}")
+    return stores.filter(pk__in=ids)
+
+
+def preload_store(store):
+    segments = store_segments.get(store)
+    for segment in segments.segments:
+        segment.attribute_index()
+        segment.text_index()
+    # Read every page once so the files are cached before workers need them
+    for segment, start, end, _ in segments.chunks():
+        segment.vectors[start:end].max(initial=0)
+        if segment.codes is not None:
+            segment.codes[start:end].max(initial=0)
+
+    if store.index_type == "ivf":
+        index = store_indexes.get(store)
+        index.lists()
+        index.vectors.max(initial=0)
+    return len(segments)
+
+
+def preload_stores(spec=None):
+    """
+    Load the stores named by ``spec`` (default ``VECTOR_PRELOAD_STORES``):
+    comma-separated store ids, or ``*`` for every store.
+    """
+    spec = settings.VECTOR_PRELOAD_STORES if spec is None else spec
+    stores = rows = 0
+    for store in preload_targets(spec).iterator():
+        rows += preload_store(store)
+        stores += 1
+
+    # Connections must not be shared with the forked workers
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded {stores} vector stores ({rows} entries)")
+    return stores
@@ -0,0 +1,38 @@
+"""
+Scalar int8 quantization of embedding rows.
+
+Each dimension is mapped linearly from its ``[min, max]`` range onto the
+256 int8 codes, so a row takes a quarter of its float32 size. Scores
+against quantized rows are approximate; callers rescore the best
+candidates with the full-precision vectors.
+"""
+
+import numpy as np
+
+CODE_OFFSET = 128
+
+
+def fit_params(minimum, maximum):
+    """Return the ``(2, dimensions)`` float32 array of per-dimension offsets and scales"""
+    scale = (maximum - minimum) / 255
+    scale[scale == 0] = 1
+    return np.stack([minimum, scale]).astype(np.float32)
+
+
+def quantize(vectors, params):
+    offset, scale = params
+    codes = np.rint((vectors - offset) / scale) - CODE_OFFSET
+    return np.clip(codes, -128, 127).astype(np.int8)
+
+
+def dequantize(codes, params):
+    offset, scale = params
+    return offset + scale * (codes.astype(np.float32) + CODE_OFFSET)
+
+
+def approximate_scores(codes, params, query):
+    """Dot products of ``query`` with the rows encoded by ``codes``"""
+    offset, scale = params
+    scaled_query = query * scale
+    constant = float(query @ offset) + CODE_OFFSET * float(scaled_query.sum())
+    return codes.astype(np.float32) @ scaled_query + constant
@@ -0,0 +1,167 @@
+import numpy as np
+from django.conf import settings
+
+from dashboard.models import VectorEntry
+from ..embeddings import embed_batch
+from .cache import search_cache, search_key
+from .ivf import store_indexes
+from .segments import store_segments
+from .text import reciprocal_rank_fusion
+
+# Results taken from each ranking before fusing them
+FUSION_DEPTH = 100
+
+
+def embed_query(query, dimensions):
+    """
+    Embed a search query (a string or a list of strings) with the
+    deterministic embedder used for vector store chunks.
+    """
+    queries = [query] if isinstance(query, str) else list(query)
+    vectors = embed_batch(
+        queries,
+        settings.VECTOR_STORE_EMBEDDING_MODEL,
+        dimensions,
+        mode="deterministic",
+    )
+    vector = vectors.mean(axis=0)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def exact_candidates(store, query, k, filters=None):
+    segments = store_segments.get(store)
+    if not len(segments):
+        return [], []
+    candidates = None
+    if store.quantization == "int8":
+        candidates = k * settings.VECTOR_RESCORE_FACTOR
+    return segments.search(
+        embed_query(query, segments.dimensions), k, candidates, filters
+    )
+
+
+def text_candidates(store, query, k, filters=None):
+    segments = store_segments.get(store)
+    if not len(segments):
+        return [], []
+    text = query if isinstance(query, str) else " ".join(query)
+    return segments.text_search(text, k, filters)
+
+
+def vector_candidates(store, query, k, nprobe=None, exact=False, filters=None):
+    if filters is not None:
+        return exact_candidates(store, query, k, filters)
+    if store.index_type == "ivf":
+        return ivf_candidates(store, query, k, nprobe, exact)
+    return exact_candidates(store, query, k)
+
+
+def ivf_candidates(store, query, k, nprobe=None, exact=False):
+    index = store_indexes.get(store)
+    if not len(index) or not index.dimensions:
+        return [], []
+    if exact or len(index) < settings.VECTOR_INDEX_MIN_ENTRIES:
+        nprobe = None
+    else:
+        nprobe = nprobe or store.index_nprobe
+    return index.search(embed_query(query, index.dimensions), k, nprobe)
+
+
+def search_store(
+    store,
+    query,
+    max_num_results=10,
+    score_threshold=0.0,
+    nprobe=None,
+    exact=False,
+    filters=None,
+    hybrid=None,
+):
+    """
+    Rank a store's entries by cosine similarity to ``query``. IVF stores
+    are searched approximately unless ``exact`` is set; ``nprobe``
+    overrides the store's ``index_nprobe`` for this query.
+
+    ``filters`` restricts the search to entries with matching attributes.
+    Filtered searches always scan the segments, whose attribute indexes
+    select the rows to score: probing IVF lists first could leave fewer
+    than ``max_num_results`` matches.
+
+    With ``hybrid`` (``{"embedding_weight", "text_weight"}``), the vector
+    ranking is fused with a BM25 keyword ranking by weighted reciprocal
+    rank fusion and scores are the fused scores.
+    """
+    if hybrid is None:
+        ids, scores = vector_candidates(
+            store, query, max_num_results, nprobe, exact, filters
+        )
+    else:
+        depth = max(max_num_results, FUSION_DEPTH)
+        rankings = []
+        if hybrid["embedding_weight"]:
+            ids, _ = vector_candidates(store, query, depth, nprobe, exact, filters)
+            rankings.append((ids, hybrid["embedding_weight"]))
+        if hybrid["text_weight"]:
+            ids, _ = text_candidates(store, query, depth, filters)
+            rankings.append((ids, hybrid["text_weight"]))
+        ids, scores = reciprocal_rank_fusion(rankings, max_num_results)
+
+    hits = [(pk, float(score)) for pk, score in zip(ids, scores)]
+    hits = [(pk, score) for pk, score in hits if score >= score_threshold]
+    entries = (
+        VectorEntry.objects.defer("embedding")
+        .select_related("file")
+        .in_bulk([pk for pk, _ in hits])
+    )
+
+    results = []
+    for pk, score in hits:
+        entry = entries.get(pk)
+        if entry is None:
+            continue
+        metadata = dict(entry.metadata or {})
+        text = metadata.pop("text", "")
+        results.append(
+            {
+                "file_id": (
+                    f"file-{entry.file.file_id}" if entry.file_id else str(entry.pk)
+                ),
+                "filename": entry.document_name,
+                "score": score,
+                "attributes": metadata,
+                "content": [{"type": "text", "text": text}],
+            }
+        )
+    return results
+
+
+def cached_search(
+    store,
+    query,
+    max_num_results=10,
+    score_threshold=0.0,
+    nprobe=None,
+    exact=False,
+    filters=None,
+    hybrid=None,
+):
+    """
+    ``search_store`` through ``search_cache``. Returns ``(results, hit)``,
+    where ``hit`` tells whether the results came from the cache.
+    """
+    key = search_key(
+        store,
+        query,
+        filters,
+        max_num_results,
+        [score_threshold, nprobe, exact, hybrid],
+    )
+    results = search_cache.get(key)
+    if results is not None:
+        return results, True
+    results = search_store(
+        store, query, max_num_results, score_threshold, nprobe, exact, filters, hybrid
+    )
+    search_cache.set(key, results)
+    return results, False
@@ -0,0 +1,657 @@
+"""
+Memory-mapped, append-only embedding segments for exact vector store search.
+
+Each store keeps its normalized float32 vectors under
+``VECTOR_INDEX_DIR/<store id>/`` as a list of immutable segments
+(``<n>.vec`` rows plus ``<n>.ids`` entry ids), a tombstone file of deleted
+ids and a ``manifest.json`` naming the live files. Workers open segments
+with ``numpy.memmap``, so every process shares one copy through the OS
+page cache and a store can be larger than RAM: search streams through it
+in chunks.
+
+Every segment also carries int8 codes of its rows (``<n>.q8`` and the
+per-dimension ``<n>.qp`` parameters). Stores with ``quantization="int8"``
+pick candidates from those, reading a quarter of the bytes, and rescore
+only the candidates against the float32 rows. The codes are written for
+every store, whatever its setting: switching a store to int8 then takes
+effect on its next search without rebuilding its segments, the
+``vector_store_quantization_report`` command can measure recall for
+stores that have not switched, and snapshots keep the same format. For
+other stores they cost a quarter more disk and are never paged in.
+
+A ``<n>.meta`` sidecar holds the filterable attributes of each row, one
+JSON object per line. Searches with ``filters`` evaluate them against an
+inverted index built once per segment and score only the matching rows.
+``<n>.terms`` is the segment's BM25 index for keyword search (see
+``text.py``).
+
+Syncing a store to a new ``VectorStore.version`` writes the entries
+stamped with a later version as new segments and appends the ids recorded
+as deleted since to the tombstones; a row is live unless its id is
+tombstoned or appears again in a later segment. Compaction merges
+everything into one segment without the dead rows. Inserts are appended
+as new segments, and once there are more than VECTOR_SEGMENT_MAX_COUNT
+the newest ones are merged. Once a sync has applied deletion records they
+are pruned, and segments older than a prune are rebuilt from the entries.
+Writers serialize on a ``fcntl`` lock file, and the manifest is replaced
+atomically so readers never see a partial state.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from dashboard.models import VectorEntry
+from ..embeddings import normalize_rows
+from .filters import AttributeIndex, filterable_attributes
+from .ivf import common_dimensions, deleted_ids, iter_rows, prune_deletions
+from .quantization import approximate_scores, fit_params, quantize
+from .text import TextIndex, bm25_scores, bm25_weights, entry_text, tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FORMAT_VERSION = 4
+# Vector bytes scored per step, bounding memory use for stores of any size
+SCAN_CHUNK_BYTES = 32 * 1024 * 1024
+# Vector bytes per segment written by a sync
+SYNC_SEGMENT_BYTES = 128 * 1024 * 1024
+# Compact once this share of rows is dead
+MAX_DEAD_FRACTION = 0.25
+
+
+def store_dir(store_pk):
+    return Path(settings.VECTOR_INDEX_DIR) / str(store_pk)
+
+
+def write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def store_lock(directory):
+    """Exclusive lock on a store's segment directory, across processes"""
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(str(directory), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / "lock", "a+b") as f:
+            fcntl.lockf(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(f.fileno(), fcntl.LOCK_UN)
+
+
+def read_manifest(directory):
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == FORMAT_VERSION else None
+
+
+def manifest_stamp(directory):
+    """Identifies the current manifest file, which is replaced on every write"""
+    try:
+        stat = os.stat(directory / "manifest.json")
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def write_manifest(directory, manifest):
+    write_atomic(directory / "manifest.json", json.dumps(manifest).encode())
+
+
+def empty_manifest():
+    return {
+        "format": FORMAT_VERSION,
+        "version": -1,
+        "dimensions": 0,
+        "segments": [],
+        "next_segment": 1,
+        "tombstones": None,
+        "tombstone_count": 0,
+    }
+
+
+SEGMENT_SUFFIXES = (".vec", ".ids", ".q8", ".qp", ".meta", ".terms")
+
+
+class Segment:
+    def __init__(self, directory, name, rows, dimensions, quantized=False):
+        self.directory = directory
+        self.name = name
+        self.rows = rows
+        self._attribute_index = None
+        self._text_index = None
+        self.codes = self.params = None
+        if rows and quantized:
+            self.codes = np.memmap(
+                directory / f"{name}.q8",
+                dtype=np.int8,
+                mode="r",
+                shape=(rows, dimensions),
+            )
+            self.params = np.fromfile(directory / f"{name}.qp", dtype="<f4").reshape(
+                2, dimensions
+            )
+        if rows:
+            self.ids = np.memmap(directory / f"{name}.ids", dtype="S16", mode="r")
+            self.vectors = np.memmap(
+                directory / f"{name}.vec",
+                dtype="<f4",
+                mode="r",
+                shape=(rows, dimensions),
+            )
+        else:
+            self.ids = np.zeros(0, dtype="S16")
+            self.vectors = np.zeros((0, dimensions), dtype="<f4")
+        self.dead = np.zeros(rows, dtype=bool)
+
+    def attributes(self):
+        """Filterable attributes of every row, in row order"""
+        if not self.rows:
+            return []
+        with open(self.directory / f"{self.name}.meta", "rb") as f:
+            return [json.loads(line) for line in f]
+
+    def attribute_index(self):
+        if self._attribute_index is None:
+            self._attribute_index = AttributeIndex(self.attributes())
+        return self._attribute_index
+
+    def text_index(self):
+        if self._text_index is None:
+            if self.rows:
+                self._text_index = TextIndex.load(self.directory / f"{self.name}.terms")
+            else:
+                self._text_index = TextIndex.build([])
+        return self._text_index
+
+
+class SegmentSet:
+    """
+    The memory-mapped segments of one store as of one manifest. Attribute
+    and text indexes already loaded for segments of ``previous`` are reused.
+    """
+
+    def __init__(self, directory, manifest, previous=None):
+        self.directory = directory
+        self.version = manifest["version"]
+        self.dimensions = manifest["dimensions"]
+        # manifest_stamp of the manifest, set by SegmentRegistry
+        self.stamp = None
+        self.segments = [
+            Segment(
+                directory,
+                segment["name"],
+                segment["rows"],
+                self.dimensions,
+                segment.get("quantized", False),
+            )
+            for segment in manifest["segments"]
+        ]
+        if previous is not None:
+            built = {segment.name: segment for segment in previous.segments}
+            for segment in self.segments:
+                if segment.name in built:
+                    segment._attribute_index = built[segment.name]._attribute_index
+                    segment._text_index = built[segment.name]._text_index
+
+        tombstones = np.zeros(0, dtype="S16")
+        if manifest["tombstone_count"]:
+            tombstones = np.fromfile(
+                directory / manifest["tombstones"],
+                dtype="S16",
+                count=manifest["tombstone_count"],
+            )
+        # Newer segments shadow older rows with the same id
+        shadowing = tombstones
+        for segment in reversed(self.segments):
+            if len(shadowing):
+                segment.dead = np.isin(segment.ids, shadowing)
+            shadowing = np.concatenate([shadowing, segment.ids])
+
+    def __len__(self):
+        return sum(segment.rows - int(segment.dead.sum()) for segment in self.segments)
+
+    @property
+    def total_rows(self):
+        return sum(segment.rows for segment in self.segments)
+
+    def chunks(self):
+        """Yield ``(segment, start, end, live mask)`` over every row"""
+        for segment in self.segments:
+            yield from self._segment_chunks(segment)
+
+    @property
+    def step(self):
+        return max(1024, SCAN_CHUNK_BYTES // max(self.dimensions * 4, 1))
+
+    def _segment_chunks(self, segment):
+        for start in range(0, segment.rows, self.step):
+            end = min(start + self.step, segment.rows)
+            yield segment, start, end, ~segment.dead[start:end]
+
+    def live_chunks(self):
+        """Yield ``(ids, vectors)`` of the live rows, one chunk at a time"""
+        for segment, start, end, live in self.chunks():
+            yield segment.ids[start:end][live], segment.vectors[start:end][live]
+
+    @property
+    def nbytes(self):
+        """Size of the float32 vectors and of their int8 codes"""
+        floats = sum(segment.vectors.nbytes for segment in self.segments)
+        codes = sum(
+            segment.codes.nbytes + segment.params.nbytes
+            for segment in self.segments
+            if segment.codes is not None
+        )
+        return floats, codes
+
+    def scores(self, segment, rows, query, quantized):
+        """Scores of ``rows``, a slice or an array of row numbers"""
+        if quantized and segment.codes is not None:
+            return approximate_scores(segment.codes[rows], segment.params, query)
+        return segment.vectors[rows] @ query
+
+    def scored_rows(self, segment, query, quantized, filters=None):
+        """Yield ``(row numbers, scores)`` of the live rows matching ``filters``"""
+        if filters is None:
+            for _, start, end, live in self._segment_chunks(segment):
+                scores = self.scores(segment, slice(start, end), query, quantized)
+                yield np.arange(start, end)[live], scores[live]
+            return
+
+        # Only the matching rows are read and scored
+        matching = segment.attribute_index().evaluate(filters) & ~segment.dead
+        matching = np.flatnonzero(matching)
+        for start in range(0, len(matching), self.step):
+            rows = matching[start : start + self.step]
+            yield rows, self.scores(segment, rows, query, quantized)
+
+    def search(self, query, k, candidates=None, filters=None):
+        """
+        Return ``(entry ids, scores)`` of the best ``k`` live rows matching
+        ``filters``. With ``candidates``, that many rows are first picked
+        using the int8 codes and then rescored against the float32 vectors.
+        """
+        quantized = bool(candidates)
+        keep_count = max(candidates or k, k)
+        best = np.zeros(0, dtype=np.float32)
+        best_segments = np.zeros(0, dtype=np.int32)
+        best_rows = np.zeros(0, dtype=np.int64)
+
+        for number, segment in enumerate(self.segments):
+            for rows, scores in self.scored_rows(segment, query, quantized, filters):
+                best = np.concatenate([best, scores])
+                best_segments = np.concatenate(
+                    [best_segments, np.full(len(rows), number, dtype=np.int32)]
+                )
+                best_rows = np.concatenate([best_rows, rows])
+                if keep_count < len(best):
+                    keep = np.argpartition(-best, keep_count)[:keep_count]
+                    best, best_segments, best_rows = (
+                        best[keep],
+                        best_segments[keep],
+                        best_rows[keep],
+                    )
+
+        if quantized:
+            best = np.array(
+                [
+                    self.segments[number].vectors[row] @ query
+                    for number, row in zip(best_segments, best_rows)
+                ],
+                dtype=np.float32,
+            )
+        order = np.argsort(-best, kind="stable")[:k]
+        ids = [
+            uuid.UUID(bytes=self.segments[best_segments[i]].ids[best_rows[i]].ljust(16, b"\0"))
+            for i in order
+        ]
+        return ids, best[order]
+
+    def text_search(self, query, k, filters=None):
+        """
+        Return ``(entry ids, BM25 scores)`` of the best ``k`` live rows
+        matching ``filters`` that contain any term of ``query``.
+        """
+        indexes = [segment.text_index() for segment in self.segments]
+        weights, average_length = bm25_weights(indexes, set(tokenize(query)))
+        hits = []
+        for segment, index in zip(self.segments, indexes):
+            rows, scores = bm25_scores(index, weights, average_length)
+            live = ~segment.dead[rows]
+            if filters is not None:
+                live &= segment.attribute_index().evaluate(filters)[rows]
+            rows, scores = rows[live], scores[live]
+            if k < len(rows):
+                best = np.argpartition(-scores, k)[:k]
+                rows, scores = rows[best], scores[best]
+            hits.extend((score, segment, row) for score, row in zip(scores, rows))
+
+        hits.sort(key=lambda hit: -hit[0])
+        ids = [
+            uuid.UUID(bytes=segment.ids[row].ljust(16, b"\0"))
+            for _, segment, row in hits[:k]
+        ]
+        return ids, np.array([score for score, _, _ in hits[:k]], dtype=np.float32)
+
+
+def attribute_lines(attributes):
+    return b"".join(
+        json.dumps(row, separators=(",", ":")).encode() + b"\n" for row in attributes
+    )
+
+
+def write_segment(directory, manifest, ids, vectors, content):
+    """
+    Write ``vectors`` (normalized in place) as the manifest's next segment,
+    with the attributes and text index of the ``(document_name, metadata)``
+    ``content`` of each row. The int8 codes are written whatever the
+    store's quantization, so that it can be changed without a rebuild.
+    """
+    name = f"{manifest['next_segment']:06d}"
+    manifest["next_segment"] += 1
+    vectors = normalize_rows(vectors)
+    params = fit_params(vectors.min(axis=0), vectors.max(axis=0))
+    write_atomic(directory / f"{name}.vec", vectors.astype("<f4").tobytes())
+    write_atomic(directory / f"{name}.ids", np.asarray(ids, dtype="S16").tobytes())
+    write_atomic(directory / f"{name}.q8", quantize(vectors, params).tobytes())
+    write_atomic(directory / f"{name}.qp", params.astype("<f4").tobytes())
+    write_atomic(
+        directory / f"{name}.meta",
+        attribute_lines(filterable_attributes(metadata) for _, metadata in content),
+    )
+    write_atomic(
+        directory / f"{name}.terms",
+        TextIndex.build(entry_text(*row) for row in content).to_bytes(),
+    )
+    manifest["segments"].append({"name": name, "rows": len(ids), "quantized": True})
+
+
+def append_tombstones(directory, manifest, ids):
+    if manifest["tombstones"] is None:
+        manifest["tombstones"] = f"tombstones-{manifest['next_segment']:06d}.ids"
+    path = directory / manifest["tombstones"]
+    with open(path, "r+b" if path.exists() else "wb") as f:
+        # Overwrite anything past the count a failed sync may have left behind
+        f.seek(manifest["tombstone_count"] * 16)
+        f.write(np.asarray(ids, dtype="S16").tobytes())
+        f.truncate()
+    manifest["tombstone_count"] += len(ids)
+
+
+def remove_unused_files(directory, manifest):
+    keep = {"manifest.json", "lock", manifest["tombstones"]}
+    for segment in manifest["segments"]:
+        keep.update(segment["name"] + suffix for suffix in SEGMENT_SUFFIXES)
+    for path in directory.iterdir():
+        # Readers keep mapped files alive after they are unlinked
+        if path.name not in keep and not path.name.endswith(".tmp"):
+            path.unlink(missing_ok=True)
+
+
+def write_merged(segments, directory, name, members=None):
+    """
+    Write the live rows of ``members`` (by default all of ``segments``) to
+    ``directory`` as one segment called ``name``. Returns its row count.
+    """
+    members = segments.segments if members is None else members
+    # First pass for the quantization range, second to write the rows
+    dimensions = segments.dimensions
+    minimum = np.full(dimensions, np.inf, dtype=np.float32)
+    maximum = np.full(dimensions, -np.inf, dtype=np.float32)
+    for segment in members:
+        for _, start, end, live in segments._segment_chunks(segment):
+            chunk_vectors = segment.vectors[start:end][live]
+            if len(chunk_vectors):
+                minimum = np.minimum(minimum, chunk_vectors.min(axis=0))
+                maximum = np.maximum(maximum, chunk_vectors.max(axis=0))
+    finite = np.isfinite(minimum)
+    params = fit_params(
+        np.where(finite, minimum, 0), np.where(finite, maximum, 0)
+    )
+
+    rows = 0
+    files = {
+        suffix: tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False)
+        for suffix in (".vec", ".ids", ".q8", ".meta")
+    }
+    try:
+        for segment in members:
+            attributes = segment.attributes()
+            for _, start, end, live in segments._segment_chunks(segment):
+                chunk_ids = segment.ids[start:end][live]
+                chunk_vectors = segment.vectors[start:end][live]
+                files[".vec"].write(np.ascontiguousarray(chunk_vectors).tobytes())
+                files[".ids"].write(chunk_ids.tobytes())
+                files[".q8"].write(quantize(chunk_vectors, params).tobytes())
+                files[".meta"].write(
+                    attribute_lines(
+                        attributes[row] for row in np.flatnonzero(live) + start
+                    )
+                )
+                rows += len(chunk_ids)
+    finally:
+        for f in files.values():
+            f.close()
+    for suffix, f in files.items():
+        os.replace(f.name, directory / f"{name}{suffix}")
+    write_atomic(directory / f"{name}.qp", params.tobytes())
+    text_index = TextIndex.merge(
+        [(segment.text_index(), ~segment.dead) for segment in members]
+    )
+    write_atomic(directory / f"{name}.terms", text_index.to_bytes())
+    return rows
+
+
+def compact(directory, manifest):
+    """Merge all segments into one, dropping dead rows and tombstones"""
+    name = f"{manifest['next_segment']:06d}"
+    rows = write_merged(SegmentSet(directory, manifest), directory, name)
+
+    compacted = dict(
+        manifest,
+        segments=[{"name": name, "rows": rows, "quantized": True}],
+        next_segment=manifest["next_segment"] + 1,
+        tombstones=None,
+        tombstone_count=0,
+    )
+    write_manifest(directory, compacted)
+    remove_unused_files(directory, compacted)
+    return compacted
+
+
+def merge_tail(directory, manifest):
+    """
+    Merge the newest segments into one, leaving at most
+    VECTOR_SEGMENT_MAX_COUNT. Older segments no larger than the rows merged
+    so far are taken in too, so segments grow geometrically and a row
+    written by many small appends is only rewritten a few times.
+    """
+    described = manifest["segments"]
+    count = max(2, len(described) - settings.VECTOR_SEGMENT_MAX_COUNT + 1)
+    rows = sum(segment["rows"] for segment in described[-count:])
+    while count < len(described) and described[-count - 1]["rows"] <= rows:
+        count += 1
+        rows += described[-count]["rows"]
+
+    # Nothing shadows the newest rows, so the merge only drops tombstoned
+    # and shadowed ones and the tombstones stay valid for older segments
+    segments = SegmentSet(directory, manifest)
+    name = f"{manifest['next_segment']:06d}"
+    rows = write_merged(segments, directory, name, segments.segments[-count:])
+    merged = dict(
+        manifest,
+        segments=described[:-count]
+        + [{"name": name, "rows": rows, "quantized": True}],
+        next_segment=manifest["next_segment"] + 1,
+    )
+    write_manifest(directory, merged)
+    remove_unused_files(directory, merged)
+    return merged
+
+
+def needs_compaction(manifest, segments):
+    return len(manifest["segments"]) > settings.VECTOR_SEGMENT_MAX_COUNT or (
+        segments.total_rows
+        and segments.total_rows - len(segments)
+        > MAX_DEAD_FRACTION * segments.total_rows
+    )
+
+
+def segment_rows(dimensions):
+    """Rows per segment written by a sync, bounding its memory use"""
+    return max(1024, SYNC_SEGMENT_BYTES // max(dimensions * 4, 1))
+
+
+def sync_segments(store, directory):
+    """
+    Bring the store's segments up to ``store.version``. Must be called with
+    the store lock held; returns the new manifest.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(directory) or empty_manifest()
+    version = store.version
+    # Versions are assigned in commit order on the store row, so every row
+    # written by a version up to ``version`` is visible by now
+    entries = VectorEntry.objects.filter(vector_store=store, version__lte=version)
+
+    deleted = None
+    if manifest["dimensions"]:
+        deleted = deleted_ids(store, manifest["version"], version)
+    if deleted is None:
+        # Nothing to catch up from, or the deletions since have been pruned
+        manifest = dict(empty_manifest(), next_segment=manifest["next_segment"])
+        manifest["dimensions"] = common_dimensions(entries)
+    else:
+        if len(deleted):
+            append_tombstones(directory, manifest, deleted)
+        entries = entries.filter(version__gt=manifest["version"])
+
+    # One segment per chunk, so a large store is never held in memory whole
+    dimensions = manifest["dimensions"]
+    if dimensions:
+        for ids, vectors, content in iter_rows(
+            entries, dimensions, segment_rows(dimensions), with_content=True
+        ):
+            write_segment(directory, manifest, ids, vectors, content)
+
+    manifest["version"] = version
+    write_manifest(directory, manifest)
+
+    if needs_compaction(manifest, SegmentSet(directory, manifest)):
+        manifest = compact(directory, manifest)
+    else:
+        remove_unused_files(directory, manifest)
+    prune_deletions(store)
+    return manifest
+
+
+class SegmentRegistry:
+    """Per-process cache of open segment sets, one per store"""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, store):
+        directory = store_dir(store.pk)
+        # Compaction replaces the manifest without a version change, and
+        # removes the files that attribute and text indexes load lazily
+        stamp = manifest_stamp(directory)
+        segments = self._sets.get(store.pk)
+        if (
+            segments is not None
+            and segments.version == store.version
+            and segments.stamp == stamp
+        ):
+            return segments
+
+        manifest = read_manifest(directory)
+        if manifest is None or manifest["version"] != store.version:
+            with store_lock(directory):
+                # Another worker may have synced while we waited
+                manifest = read_manifest(directory)
+                if manifest is None or manifest["version"] != store.version:
+                    manifest = sync_segments(store, directory)
+                stamp = manifest_stamp(directory)
+
+        segments = SegmentSet(directory, manifest, previous=segments)
+        segments.stamp = stamp
+        with self._lock:
+            self._sets[store.pk] = segments
+        return segments
+
+    def append(self, store_pk, version, ids, vectors, content):
+        """
+        Write rows just inserted by the change that produced ``version`` as
+        a new segment, if the segments were current right before it.
+        Otherwise the rows are picked up by the next sync.
+        """
+        directory = store_dir(store_pk)
+        with store_lock(directory):
+            manifest = read_manifest(directory)
+            if manifest is None or manifest["version"] != version - 1:
+                return False
+            if not manifest["segments"]:
+                manifest["dimensions"] = vectors.shape[1]
+            if manifest["dimensions"] != vectors.shape[1]:
+                return False
+            write_segment(directory, manifest, ids, vectors, content)
+            manifest["version"] = version
+            write_manifest(directory, manifest)
+            if len(manifest["segments"]) > settings.VECTOR_SEGMENT_MAX_COUNT:
+                merge_tail(directory, manifest)
+        return True
+
+    def compact(self, store, only_if_needed=False):
+        directory = store_dir(store.pk)
+        with store_lock(directory):
+            manifest = read_manifest(directory)
+            if manifest is None:
+                return
+            if not only_if_needed or needs_compaction(
+                manifest, SegmentSet(directory, manifest)
+            ):
+                compact(directory, manifest)
+
+    def invalidate(self, store_pk, delete_files=False):
+        with self._lock:
+            self._sets.pop(store_pk, None)
+        if delete_files:
+            directory = store_dir(store_pk)
+            if directory.is_dir():
+                for path in directory.iterdir():
+                    path.unlink(missing_ok=True)
+                directory.rmdir()
+
+
+store_segments = SegmentRegistry()
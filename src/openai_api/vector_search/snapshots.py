@@ -0,0 +1,388 @@
+"""
+Compact binary snapshots of vector stores.
+
+A snapshot is one uncompressed ``.npz`` archive holding:
+
+- ``header``: JSON with the format, the store's settings and row counts
+- ``ids``, ``dimensions``, ``embeddings`` and ``content``: every entry's
+  id, embedding size, raw float32 values (concatenated) and
+  ``[document_name, metadata]`` (one JSON array per line)
+- ``segment.<suffix>``: the store's live rows merged into one search
+  segment, byte for byte as ``segments.py`` writes it
+- ``ivf.*``: the live rows of the IVF index, for stores using one
+
+Restoring inserts the entries with prepared bulk INSERTs and writes the
+segment and index files as they are, so nothing is re-embedded,
+re-quantized, re-tokenized or re-clustered. Entries get new ids (the
+snapshot can be restored next to its source), which are mapped onto the
+segment and index rows. Entries keep their content but not the attached
+file they were chunked from.
+"""
+
+import json
+import os
+import tempfile
+import uuid
+import zipfile
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from dashboard.models import VectorEntry, VectorStore
+from ..exceptions import InvalidRequestError
+from .ivf import FETCH_CHUNK_SIZE, IVFIndex, index_path, store_indexes
+from .mapped import map_npz
+from .text import TextIndex
+from .segments import (
+    SEGMENT_SUFFIXES,
+    empty_manifest,
+    store_dir,
+    store_lock,
+    store_segments,
+    write_manifest,
+    write_merged,
+)
+
+SNAPSHOT_FORMAT = 1
+SEGMENT_NAME = "000001"
+# Exports retried when the store changes while they run
+EXPORT_ATTEMPTS = 3
+INSERT_CHUNK_SIZE = 5000
+STORE_SETTINGS = ("name", "description", "index_type", "index_nprobe", "quantization")
+
+
+def read_array(path, dtype):
+    """Memory-map a file written by the export (empty files cannot be mapped)"""
+    if not os.path.getsize(path):
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def write_entries(store, workdir):
+    """Stream the store's entries to files in ``workdir``; returns the count"""
+    dimensions = []
+    with open(workdir / "ids", "wb") as ids, open(
+        workdir / "embeddings", "wb"
+    ) as embeddings, open(workdir / "content", "wb") as content:
+        rows = VectorEntry.objects.filter(vector_store=store).values_list(
+            "pk", "embedding", "dimensions", "document_name", "metadata"
+        )
+        for pk, embedding, size, document_name, metadata in rows.iterator(
+            chunk_size=FETCH_CHUNK_SIZE
+        ):
+            ids.write(pk.bytes)
+            embeddings.write(embedding)
+            content.write(json.dumps([document_name, metadata]).encode() + b"\n")
+            dimensions.append(size)
+    np.array(dimensions, dtype="<u4").tofile(workdir / "dimensions")
+    return len(dimensions)
+
+
+def write_archive(store, workdir, target):
+    segments = store_segments.get(store)
+    segment_rows = write_merged(segments, workdir, SEGMENT_NAME)
+    count = write_entries(store, workdir)
+
+    arrays = {
+        "ids": read_array(workdir / "ids", "S16"),
+        "dimensions": read_array(workdir / "dimensions", "<u4"),
+        "embeddings": read_array(workdir / "embeddings", "<f4"),
+        "content": read_array(workdir / "content", np.uint8),
+    }
+    for suffix in SEGMENT_SUFFIXES:
+        arrays[f"segment{suffix}"] = read_array(
+            workdir / f"{SEGMENT_NAME}{suffix}", np.uint8
+        )
+
+    ivf = None
+    if store.index_type == "ivf":
+        index = store_indexes.get(store)
+        ivf = {"trained_size": index.trained_size}
+        arrays["ivf.centroids"] = index.centroids
+        arrays["ivf.vectors"], arrays["ivf.ids"], arrays["ivf.labels"] = index.live()
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "exported_at": datetime.now(dt_timezone.utc).isoformat(),
+        "vector_store_id": f"vs_{store.pk}",
+        "store": {field: getattr(store, field) for field in STORE_SETTINGS},
+        "entries": count,
+        "dimensions": segments.dimensions,
+        "segment_rows": segment_rows,
+        "ivf": ivf,
+    }
+    arrays["header"] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    # Uncompressed, so that restoring can memory-map the members
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            np.savez(f, **arrays)
+    else:
+        target.seek(0)
+        target.truncate()
+        np.savez(target, **arrays)
+    return header
+
+
+def export_snapshot(store, target):
+    """
+    Write a snapshot of ``store`` to ``target``, a path or a binary file
+    opened for writing, and return its header.
+    """
+    Path(settings.VECTOR_INDEX_DIR).mkdir(parents=True, exist_ok=True)
+    for _ in range(EXPORT_ATTEMPTS):
+        store.refresh_from_db()
+        # The entries and the search data must come from the same version
+        with tempfile.TemporaryDirectory(dir=settings.VECTOR_INDEX_DIR) as workdir:
+            header = write_archive(store, Path(workdir), target)
+        if VectorStore.objects.filter(pk=store.pk, version=store.version).exists():
+            return header
+    raise InvalidRequestError(
+        f"Vector store 'vs_{store.pk}' kept changing during the export; try again"
+    )
+
+
+def read_snapshot(path):
+    """Return ``(header, arrays)`` of the snapshot at ``path``"""
+    try:
+        arrays = map_npz(path)
+        header = json.loads(bytes(arrays["header"]))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise InvalidRequestError(f"Not a vector store snapshot: {e}")
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        raise InvalidRequestError("Unsupported vector store snapshot format")
+    return header, arrays
+
+
+def json_lines(data, count, valid):
+    """Whether ``data`` is ``count`` JSON lines whose values pass ``valid``"""
+    lines = bytes(data).split(b"\n")
+    if len(lines) != count + 1 or lines[-1]:
+        return False
+    try:
+        return all(valid(json.loads(line)) for line in lines[:-1])
+    except ValueError:
+        return False
+
+
+def valid_content(row):
+    return (
+        isinstance(row, list)
+        and len(row) == 2
+        and isinstance(row[0], str)
+        and len(row[0]) <= 255
+        and (row[1] is None or isinstance(row[1], dict))
+    )
+
+
+def valid_text_index(data, rows):
+    try:
+        return TextIndex.from_bytes(bytes(data)).is_valid(rows)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return False
+
+
+def check_snapshot(header, arrays):
+    """
+    Validate everything an uploaded snapshot restores (header, array sizes,
+    content and search data) before anything is written, and return the
+    settings of the store to create.
+    """
+    try:
+        options = {field: header["store"][field] for field in STORE_SETTINGS}
+        count, dimensions = int(header["entries"]), int(header["dimensions"])
+        segment_rows, ivf = int(header["segment_rows"]), header["ivf"]
+        ids, sizes = arrays["ids"], arrays["dimensions"]
+        consistent = (
+            ids.shape == sizes.shape == (count,)
+            and len(np.unique(ids)) == count
+            and arrays["embeddings"].size == int(np.sum(sizes, dtype=np.int64))
+            and json_lines(arrays["content"], count, valid_content)
+            and arrays["segment.ids"].size == segment_rows * 16
+            and arrays["segment.vec"].size == segment_rows * dimensions * 4
+            and arrays["segment.q8"].size == segment_rows * dimensions
+        )
+        if consistent and segment_rows:
+            consistent = (
+                arrays["segment.qp"].size == 2 * dimensions * 4
+                and json_lines(
+                    arrays["segment.meta"],
+                    segment_rows,
+                    lambda row: isinstance(row, dict),
+                )
+                and valid_text_index(arrays["segment.terms"], segment_rows)
+                and np.isin(arrays["segment.ids"].view("S16"), ids).all()
+            )
+        if consistent and ivf is not None:
+            rows = len(arrays["ivf.ids"])
+            labels = arrays["ivf.labels"]
+            nlist = len(arrays["ivf.centroids"])
+            consistent = (
+                arrays["ivf.vectors"].shape == (rows, dimensions)
+                and labels.shape == (rows,)
+                and labels.dtype.kind in "iu"
+                and arrays["ivf.centroids"].shape == (nlist, dimensions)
+                and nlist > 0
+                and (not rows or 0 <= labels.min() <= labels.max() < nlist)
+                and np.isin(arrays["ivf.ids"], ids).all()
+                and isinstance(ivf.get("trained_size"), int)
+            )
+    except (KeyError, TypeError, ValueError, AttributeError, IndexError):
+        consistent = False
+    if not consistent:
+        raise InvalidRequestError("The vector store snapshot is incomplete or corrupt")
+
+    if (
+        not isinstance(options["name"], str)
+        or not isinstance(options["description"], str)
+        or options["index_type"] not in dict(VectorStore.INDEX_CHOICES)
+        or options["quantization"] not in dict(VectorStore.QUANTIZATION_CHOICES)
+        or not isinstance(options["index_nprobe"], int)
+        or options["index_nprobe"] < 1
+    ):
+        raise InvalidRequestError("The vector store snapshot has invalid settings")
+    return options
+
+
+def random_ids(count):
+    """``count`` random version 4 UUIDs as 16-byte strings"""
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = raw[:, 6] & 0x0F | 0x40
+    raw[:, 8] = raw[:, 8] & 0x3F | 0x80
+    return raw.view("S16").ravel()
+
+
+def id_mapping(old_ids, new_ids):
+    """Function mapping arrays of ids in ``old_ids`` to the same rows of ``new_ids``"""
+    order = np.argsort(old_ids)
+    sorted_ids = old_ids[order]
+
+    def translate(ids):
+        if not len(ids):
+            return new_ids[:0]
+        positions = np.searchsorted(sorted_ids, ids)
+        positions = np.minimum(positions, max(len(sorted_ids) - 1, 0))
+        if not len(sorted_ids) or not (sorted_ids[positions] == ids).all():
+            raise InvalidRequestError("The snapshot's search data names unknown entries")
+        return new_ids[order[positions]]
+
+    return translate
+
+
+def insert_entries(store, ids, arrays, now):
+    """
+    Insert the snapshot's entries as ``ids``. The rows go through prepared
+    ``executemany`` INSERTs rather than ``bulk_create``, which spends most
+    of its time building model instances.
+    """
+    connection = connections[VectorEntry.objects.db]
+    fields = {field.attname: field for field in VectorEntry._meta.concrete_fields}
+    columns = [
+        "id",
+        "vector_store_id",
+        "file_id",
+        "document_name",
+        "embedding",
+        "dimensions",
+        "metadata",
+        "version",
+        "created_at",
+        "updated_at",
+    ]
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        connection.ops.quote_name(VectorEntry._meta.db_table),
+        ", ".join(connection.ops.quote_name(fields[name].column) for name in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    pk_field, metadata_field = fields["id"], fields["metadata"]
+    store_pk = fields["vector_store_id"].get_db_prep_save(store.pk, connection)
+    timestamp = fields["updated_at"].get_db_prep_save(now, connection)
+
+    sizes = np.asarray(arrays["dimensions"], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]) * 4
+    embeddings = arrays["embeddings"].view(np.uint8)
+    lines = bytes(arrays["content"]).splitlines()
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), INSERT_CHUNK_SIZE):
+            end = min(start + INSERT_CHUNK_SIZE, len(ids))
+            blob = embeddings[offsets[start] : offsets[end]].tobytes()
+            base = offsets[start]
+            rows = []
+            for row in range(start, end):
+                document_name, metadata = json.loads(lines[row])
+                rows.append(
+                    (
+                        pk_field.get_db_prep_save(
+                            uuid.UUID(bytes=ids[row].ljust(16, b"\0")), connection
+                        ),
+                        store_pk,
+                        None,
+                        document_name,
+                        blob[offsets[row] - base : offsets[row + 1] - base],
+                        int(sizes[row]),
+                        metadata_field.get_db_prep_save(metadata, connection),
+                        store.version,
+                        timestamp,
+                        timestamp,
+                    )
+                )
+            cursor.executemany(sql, rows)
+
+
+def write_search_data(store, header, arrays, translate):
+    """Install the snapshot's segment and IVF index for the restored store"""
+    directory = store_dir(store.pk)
+    with store_lock(directory):
+        manifest = dict(
+            empty_manifest(),
+            version=store.version,
+            dimensions=header["dimensions"],
+            next_segment=int(SEGMENT_NAME) + 1,
+        )
+        if header["segment_rows"]:
+            for suffix in SEGMENT_SUFFIXES:
+                member = arrays[f"segment{suffix}"]
+                if suffix == ".ids":
+                    member = translate(member.view("S16"))
+                member.tofile(directory / f"{SEGMENT_NAME}{suffix}")
+            manifest["segments"].append(
+                {"name": SEGMENT_NAME, "rows": header["segment_rows"], "quantized": True}
+            )
+        write_manifest(directory, manifest)
+
+    if header["ivf"] is not None:
+        index = IVFIndex(
+            arrays["ivf.centroids"],
+            arrays["ivf.vectors"],
+            translate(arrays["ivf.ids"]),
+            arrays["ivf.labels"],
+            store.version,
+        )
+        index.trained_size = header["ivf"]["trained_size"]
+        index.save(index_path(store.pk))
+
+
+def restore_snapshot(path, user, name=None):
+    """Create a vector store owned by ``user`` from the snapshot at ``path``"""
+    header, arrays = read_snapshot(path)
+    options = check_snapshot(header, arrays)
+    old_ids = arrays["ids"]
+    ids = random_ids(len(old_ids))
+    translate = id_mapping(old_ids, ids)
+    now = timezone.now()
+
+    with transaction.atomic():
+        store = VectorStore(user=user, **options)
+        store.name = (store.name if name is None else name)[:255]
+        store.save()
+        store.version = VectorStore.bump_version(
+            store.pk, arrays["embeddings"].nbytes
+        )
+        insert_entries(store, ids, arrays, now)
+
+    # A failure from here on only costs a resync on the first search
+    write_search_data(store, header, arrays, translate)
+    return store
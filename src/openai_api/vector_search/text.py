@@ -0,0 +1,214 @@
+"""
+BM25 keyword search over chunk text and document names.
+
+Every segment is written with an inverted index of its rows (``<n>.terms``):
+the sorted vocabulary, the rows and term frequencies of each term's
+postings and the token count of every row. Indexes are immutable like the
+segments themselves, so an insert only indexes the new rows. Collection
+statistics (row count, average length, document frequencies) are summed
+over the segments; as in Lucene, dead rows keep counting towards them
+until compaction merges the indexes without them.
+"""
+
+import io
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .mapped import map_npz
+
+TOKEN_PATTERN = re.compile(r"\w+")
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def entry_text(document_name, metadata):
+    """The text of an entry that keyword search matches"""
+    text = (metadata or {}).get("text")
+    return f"{document_name} {text}" if isinstance(text, str) else document_name
+
+
+class TextIndex:
+    """Inverted index over the rows of one segment"""
+
+    def __init__(self, terms, offsets, rows, frequencies, lengths):
+        # Postings of terms[i] are rows[offsets[i]:offsets[i + 1]]
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self.total_length = int(lengths.sum())
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @classmethod
+    def build(cls, texts):
+        postings = defaultdict(list)
+        lengths = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((row, frequency))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        pairs = np.array(
+            [pair for term in terms for pair in postings[term]], dtype=np.int64
+        ).reshape(-1, 2)
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            pairs[:, 0].astype(np.int32),
+            pairs[:, 1].astype(np.int32),
+            np.array(lengths, dtype=np.int32),
+        )
+
+    @classmethod
+    def merge(cls, parts):
+        """
+        Merge ``(index, live mask)`` parts into one index of their live rows,
+        numbered in order.
+        """
+        terms, rows, frequencies, lengths = [], [], [], []
+        start = 0
+        for index, live in parts:
+            renumbered = np.cumsum(live) - 1 + start
+            keep = live[index.rows]
+            terms.append(np.repeat(index.terms, np.diff(index.offsets))[keep])
+            rows.append(renumbered[index.rows[keep]])
+            frequencies.append(index.frequencies[keep])
+            lengths.append(index.lengths[live])
+            start += int(live.sum())
+
+        terms = np.concatenate(terms) if terms else np.zeros(0, dtype=str)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        order = np.lexsort((rows, terms))
+        terms, first = np.unique(terms[order], return_index=True)
+        return cls(
+            terms,
+            np.append(first, len(order)).astype(np.int64),
+            rows[order].astype(np.int32),
+            np.concatenate(frequencies)[order].astype(np.int32),
+            np.concatenate(lengths).astype(np.int32)
+            if lengths
+            else np.zeros(0, dtype=np.int32),
+        )
+
+    def postings(self, term):
+        """``(rows, term frequencies)`` of the rows containing ``term``"""
+        position = np.searchsorted(self.terms, term)
+        if position == len(self.terms) or self.terms[position] != term:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.rows[start:end], self.frequencies[start:end]
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            terms=self.terms,
+            offsets=self.offsets,
+            rows=self.rows,
+            frequencies=self.frequencies,
+            lengths=self.lengths,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(
+                arrays["terms"],
+                arrays["offsets"],
+                arrays["rows"],
+                arrays["frequencies"],
+                arrays["lengths"],
+            )
+
+    def is_valid(self, rows):
+        """Whether the arrays form an index over ``rows`` rows that search can use"""
+        offsets = self.offsets
+        return (
+            self.terms.dtype.kind == "U"
+            and all(
+                array.dtype.kind in "iu"
+                for array in (offsets, self.rows, self.frequencies, self.lengths)
+            )
+            and self.terms.ndim == 1
+            and bool((self.terms[:-1] < self.terms[1:]).all())
+            and offsets.shape == (len(self.terms) + 1,)
+            and offsets[0] == 0
+            and bool((np.diff(offsets) >= 0).all())
+            and self.rows.shape == self.frequencies.shape == (offsets[-1],)
+            and self.lengths.shape == (rows,)
+            and (not len(self.rows) or 0 <= self.rows.min() <= self.rows.max() < rows)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load an index with its arrays memory-mapped read-only"""
+        data = map_npz(path)
+        return cls(
+            data["terms"],
+            data["offsets"],
+            data["rows"],
+            data["frequencies"],
+            data["lengths"],
+        )
+
+
+def bm25_weights(indexes, terms):
+    """
+    BM25 ``idf`` of each query term and the average row length, from the
+    statistics of all ``indexes``.
+    """
+    count = sum(len(index) for index in indexes)
+    average_length = sum(index.total_length for index in indexes) / max(count, 1)
+    weights = {}
+    for term in terms:
+        frequency = sum(len(index.postings(term)[0]) for index in indexes)
+        if frequency:
+            weights[term] = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+    return weights, average_length
+
+
+def bm25_scores(index, weights, average_length):
+    """``(rows, scores)`` of the rows of ``index`` matching any query term"""
+    matched_rows, matched_scores = [], []
+    for term, idf in weights.items():
+        rows, frequencies = index.postings(term)
+        if not len(rows):
+            continue
+        norm = K1 * (1 - B + B * index.lengths[rows] / max(average_length, 1e-9))
+        matched_rows.append(rows)
+        matched_scores.append(idf * frequencies * (K1 + 1) / (frequencies + norm))
+    if not matched_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    rows, positions = np.unique(np.concatenate(matched_rows), return_inverse=True)
+    scores = np.bincount(positions, weights=np.concatenate(matched_scores))
+    return rows.astype(np.int64), scores.astype(np.float32)
+
+
+def reciprocal_rank_fusion(rankings, k, constant=60):
+    """
+    Fuse ``(ids, weight)`` rankings: each id scores ``weight / (constant +
+    rank)`` summed over the rankings it appears in. Returns the best ``k``
+    ``(ids, scores)``.
+    """
+    fused = defaultdict(float)
+    for ids, weight in rankings:
+        for rank, pk in enumerate(ids, start=1):
+            fused[pk] += weight / (constant + rank)
+    best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    return [pk for pk, _ in best], [score for _, score in best]
@@ -2,141 +2,82 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from api_keys.models import APIKeyUsage
 from api_keys.authentication import APIKeyAuthentication
-from .utils import (
-    generate_chat_completion_response,
-    generate_embedding_response,
-    generate_moderation_response,
-    generate_image_response,
-    get_available_models,
-    generate_request_id,
+from .exceptions import InvalidRequestError, NotFoundError, OpenAIError
+from .handlers import (
+    handle_chat_completion,
+    handle_embeddings,
+    handle_image_generation,
+    handle_moderations,
 )
-from django.http import JsonResponse, HttpResponseNotFound
-from django.views import View
-from dashboard.models import VectorStore
-import json
+from .mixins import OpenAIEndpointMixin
+from .utils import get_available_models
+from .vector_search.deletion import store_deleter
+from .vector_search.federated import federated_search
+from .vector_search.files import (
+    cancel_files,
+    file_processor,
+    parse_chunking_strategy,
+)
+from .vector_search.filters import validate_filters
+from .vector_search.ingest import ingest_lines
+from .vector_search.search import cached_search
+from .vector_search.snapshots import export_snapshot, restore_snapshot
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.http import FileResponse
+from dashboard.models import (
+    StoredFile,
+    VectorStore,
+    VectorStoreFile,
+    VectorStoreFileBatch,
+)
+import os
+import shutil
+import tempfile
 import time
+import uuid
 
 
-class BaseOpenAIView(APIView):
+class BaseOpenAIView(OpenAIEndpointMixin, APIView):
     """Base view for OpenAI API endpoints"""
 
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def log_usage(
-        self,
-        request,
-        endpoint,
-        model,
-        tokens_input=0,
-        tokens_output=0,
-        status_code=200,
-        error_message="",
-        response_time_ms=0,
-    ):
-        """Log API usage for tracking"""
-        try:
-            api_key = request.auth
-            if api_key:
-                APIKeyUsage.objects.create(
-                    api_key=api_key,
-                    endpoint=endpoint,
-                    model=model,
-                    tokens_input=tokens_input,
-                    tokens_output=tokens_output,
-                    total_tokens=tokens_input + tokens_output,
-                    user_agent=request.META.get("HTTP_USER_AGENT", ""),
-                    ip_address=self.get_client_ip(request),
-                    request_id=generate_request_id(),
-                    response_time_ms=response_time_ms,
-                    status_code=status_code,
-                    error_message=error_message,
-                )
-
-                # Update API key total usage
-                api_key.total_requests += 1
-                api_key.total_tokens += tokens_input + tokens_output
-                api_key.save(update_fields=["total_requests", "total_tokens"])
-        except Exception as e:
-            # Don't let logging errors break the API
-            print(f"Error logging usage: {e}")
-
-    def get_client_ip(self, request):
-        """Get client IP address"""
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(",")[0]
-        else:
-            ip = request.META.get("REMOTE_ADDR")
-        return ip
-
-    def validate_permissions(self, permission_field):
-        """Check if API key has required permissions"""
-        api_key = self.request.auth
-        if not getattr(api_key, permission_field, True):
-            return False
-        return True
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.check_access(request.auth)
 
+    def handle_exception(self, exc):
+        if isinstance(exc, OpenAIError):
+            return Response(exc.as_dict(), status=exc.status_code, headers=exc.headers)
+        return super().handle_exception(exc)
 
-class ChatCompletionsView(BaseOpenAIView):
-    """OpenAI Chat Completions API endpoint"""
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return self.add_rate_limit_headers(response)
 
-    def post(self, request):
+    def process(self, request, handler):
+        """Run a request handler, logging usage and turning failures into 500s"""
         start_time = time.time()
+        data = request.data
 
         try:
-            # Check permissions
-            if not self.validate_permissions("can_chat_completions"):
-                return Response(
-                    {
-                        "error": {
-                            "message": "API key does not have permission for chat completions"
-                        }
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            data = request.data
-            messages = data.get("messages", [])
-            model = data.get("model", "gpt-3.5-turbo")
-            max_tokens = data.get("max_tokens", 150)
-
-            if not messages:
-                return Response(
-                    {"error": {"message": "Messages are required"}},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Generate response
-            response_data = generate_chat_completion_response(
-                messages, model, max_tokens
-            )
-
-            # Calculate response time
-            response_time_ms = int((time.time() - start_time) * 1000)
-
-            # Log usage
-            usage = response_data.get("usage", {})
-            self.log_usage(
-                request=request,
-                endpoint="chat_completions",
-                model=model,
-                tokens_input=usage.get("prompt_tokens", 0),
-                tokens_output=usage.get("completion_tokens", 0),
-                status_code=200,
-                response_time_ms=response_time_ms,
-            )
-
-            return Response(response_data, status=status.HTTP_200_OK)
-
+            result = handler(data)
+            if self.supports_streaming and data.get("stream"):
+                use_async = isinstance(request._request, ASGIRequest)
+                return self.stream_response(request, data, result, start_time, use_async)
+        except OpenAIError:
+            raise
         except Exception as e:
             response_time_ms = int((time.time() - start_time) * 1000)
             self.log_usage(
                 request=request,
-                endpoint="chat_completions",
-                model=data.get("model", "gpt-3.5-turbo"),
+                endpoint=self.endpoint,
+                model=data.get("model", self.default_model),
                 status_code=500,
                 error_message=str(e),
                 response_time_ms=response_time_ms,
@@ -147,219 +88,83 @@ class ChatCompletionsView(BaseOpenAIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        # Calculate response time
+        response_time_ms = int((time.time() - start_time) * 1000)
+
+        # Log usage
+        self.log_usage(
+            request=request,
+            endpoint=self.endpoint,
+            model=result.model,
+            tokens_input=result.tokens_input,
+            tokens_output=result.tokens_output,
+            status_code=200,
+            response_time_ms=response_time_ms,
+        )
 
-class EmbeddingsView(BaseOpenAIView):
-    """OpenAI Embeddings API endpoint"""
-
-    def post(self, request):
-        start_time = time.time()
-
-        try:
-            # Check permissions
-            if not self.validate_permissions("can_embeddings"):
-                return Response(
-                    {
-                        "error": {
-                            "message": "API key does not have permission for embeddings"
-                        }
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
+        return Response(result.data, status=status.HTTP_200_OK)
 
-            data = request.data
-            input_text = data.get("input", "")
-            model = data.get("model", "text-embedding-ada-002")
 
-            if not input_text:
-                return Response(
-                    {"error": {"message": "Input is required"}},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+class ChatCompletionsView(BaseOpenAIView):
+    """OpenAI Chat Completions API endpoint"""
 
-            # Generate response
-            response_data = generate_embedding_response(input_text, model)
+    endpoint = "chat_completions"
+    permission_field = "can_chat_completions"
+    permission_label = "chat completions"
+    default_model = "gpt-3.5-turbo"
+    supports_streaming = True
 
-            # Calculate response time
-            response_time_ms = int((time.time() - start_time) * 1000)
+    def post(self, request):
+        return self.process(request, handle_chat_completion)
 
-            # Log usage
-            usage = response_data.get("usage", {})
-            self.log_usage(
-                request=request,
-                endpoint="embeddings",
-                model=model,
-                tokens_input=usage.get("prompt_tokens", 0),
-                tokens_output=0,
-                status_code=200,
-                response_time_ms=response_time_ms,
-            )
 
-            return Response(response_data, status=status.HTTP_200_OK)
+class EmbeddingsView(BaseOpenAIView):
+    """OpenAI Embeddings API endpoint"""
 
-        except Exception as e:
-            response_time_ms = int((time.time() - start_time) * 1000)
-            self.log_usage(
-                request=request,
-                endpoint="embeddings",
-                model=data.get("model", "text-embedding-ada-002"),
-                status_code=500,
-                error_message=str(e),
-                response_time_ms=response_time_ms,
-            )
+    endpoint = "embeddings"
+    permission_field = "can_embeddings"
+    permission_label = "embeddings"
+    default_model = "text-embedding-ada-002"
 
-            return Response(
-                {"error": {"message": "Internal server error"}},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+    def post(self, request):
+        return self.process(request, handle_embeddings)
 
 
 class ModerationsView(BaseOpenAIView):
     """OpenAI Moderations API endpoint"""
 
-    def post(self, request):
-        start_time = time.time()
-
-        try:
-            # Check permissions
-            if not self.validate_permissions("can_moderations"):
-                return Response(
-                    {
-                        "error": {
-                            "message": "API key does not have permission for moderations"
-                        }
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            data = request.data
-            input_text = data.get("input", "")
-
-            if not input_text:
-                return Response(
-                    {"error": {"message": "Input is required"}},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Generate response
-            response_data = generate_moderation_response(input_text)
-
-            # Calculate response time
-            response_time_ms = int((time.time() - start_time) * 1000)
-
-            # Log usage
-            self.log_usage(
-                request=request,
-                endpoint="moderations",
-                model="text-moderation-latest",
-                tokens_input=len(input_text.split())
-                if isinstance(input_text, str)
-                else 0,
-                tokens_output=0,
-                status_code=200,
-                response_time_ms=response_time_ms,
-            )
-
-            return Response(response_data, status=status.HTTP_200_OK)
+    endpoint = "moderations"
+    permission_field = "can_moderations"
+    permission_label = "moderations"
+    default_model = "text-moderation-latest"
 
-        except Exception as e:
-            response_time_ms = int((time.time() - start_time) * 1000)
-            self.log_usage(
-                request=request,
-                endpoint="moderations",
-                model="text-moderation-latest",
-                status_code=500,
-                error_message=str(e),
-                response_time_ms=response_time_ms,
-            )
-
-            return Response(
-                {"error": {"message": "Internal server error"}},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+    def post(self, request):
+        return self.process(request, handle_moderations)
 
 
 class ImagesGenerationsView(BaseOpenAIView):
     """OpenAI Images Generations API endpoint"""
 
-    def post(self, request):
-        start_time = time.time()
-
-        try:
-            # Check permissions
-            if not self.validate_permissions("can_images"):
-                return Response(
-                    {
-                        "error": {
-                            "message": "API key does not have permission for image generation"
-                        }
-                    },
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            data = request.data
-            prompt = data.get("prompt", "")
-            n = data.get("n", 1)
-            size = data.get("size", "1024x1024")
-
-            if not prompt:
-                return Response(
-                    {"error": {"message": "Prompt is required"}},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    endpoint = "images_generations"
+    permission_field = "can_images"
+    permission_label = "image generation"
+    default_model = "dall-e-3"
 
-            # Generate response
-            response_data = generate_image_response(prompt, n, size)
-
-            # Calculate response time
-            response_time_ms = int((time.time() - start_time) * 1000)
-
-            # Log usage
-            self.log_usage(
-                request=request,
-                endpoint="images_generations",
-                model="dall-e-3",
-                tokens_input=len(prompt.split()),
-                tokens_output=0,
-                status_code=200,
-                response_time_ms=response_time_ms,
-            )
-
-            return Response(response_data, status=status.HTTP_200_OK)
-
-        except Exception as e:
-            response_time_ms = int((time.time() - start_time) * 1000)
-            self.log_usage(
-                request=request,
-                endpoint="images_generations",
-                model="dall-e-3",
-                status_code=500,
-                error_message=str(e),
-                response_time_ms=response_time_ms,
-            )
-
-            return Response(
-                {"error": {"message": "Internal server error"}},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+    def post(self, request):
+        return self.process(request, handle_image_generation)
 
 
-class ModelsView(APIView):
+class ModelsView(BaseOpenAIView):
     """OpenAI Models API endpoint"""
 
-    authentication_classes = [APIKeyAuthentication]
-    permission_classes = [IsAuthenticated]
-
     def get(self, request):
         """List available models"""
         return Response(get_available_models(), status=status.HTTP_200_OK)
 
 
-class ModelDetailsView(APIView):
+class ModelDetailsView(BaseOpenAIView):
     """OpenAI Model Details API endpoint"""
 
-    authentication_classes = [APIKeyAuthentication]
-    permission_classes = [IsAuthenticated]
-
     def get(self, request, model_id):
         """Get details for a specific model"""
         models_data = get_available_models()
@@ -374,138 +179,588 @@ class ModelDetailsView(APIView):
         )
 
 
-class VectorStoreListCreateView(View):
-    def get(self, request):
-        stores = VectorStore.objects.all()
-        data = []
-        for store in stores:
-            data.append(
-                {
-                    "id": f"vs_{store.pk}",
-                    "object": "vector_store",
-                    "created_at": int(store.created_at.timestamp()),
-                    "name": store.name,
-                    "description": store.description,
-                    "bytes": 0,  # Placeholder
-                    "file_counts": {
-                        "in_progress": 0,
-                        "completed": 0,
-                        "failed": 0,
-                        "cancelled": 0,
-                        "total": 0,
-                    },
-                }
+def count_files(files):
+    """``file_counts`` of a ``VectorStoreFile`` queryset, in one query"""
+    statuses = [status for status, _ in VectorStoreFile.STATUS_CHOICES]
+    counts = files.aggregate(
+        total=Count("pk"),
+        **{status: Count("pk", filter=Q(status=status)) for status in statuses},
+    )
+    return {status: counts[status] for status in statuses + ["total"]}
+
+
+def serialize_vector_store(store):
+    return {
+        "id": f"vs_{store.pk}",
+        "object": "vector_store",
+        "created_at": int(store.created_at.timestamp()),
+        "name": store.name,
+        "description": store.description,
+        "bytes": store.usage_bytes,
+        "file_counts": store.file_counts,
+        "index": {
+            "type": store.index_type,
+            "nprobe": store.index_nprobe,
+            "quantization": store.quantization,
+        },
+    }
+
+
+def serialize_vector_store_file(vector_store_file):
+    return {
+        "id": f"file-{vector_store_file.file_id}",
+        "object": "vector_store.file",
+        "usage_bytes": vector_store_file.usage_bytes,
+        "created_at": int(vector_store_file.created_at.timestamp()),
+        "vector_store_id": f"vs_{vector_store_file.vector_store_id}",
+        "status": vector_store_file.status,
+        "last_error": (
+            {"code": "server_error", "message": vector_store_file.last_error}
+            if vector_store_file.last_error
+            else None
+        ),
+        "chunking_strategy": vector_store_file.chunking_strategy,
+        "attributes": vector_store_file.attributes or {},
+    }
+
+
+def serialize_file_batch(batch):
+    return {
+        "id": f"vsfb_{batch.pk}",
+        "object": "vector_store.files_batch",
+        "created_at": int(batch.created_at.timestamp()),
+        "vector_store_id": f"vs_{batch.vector_store_id}",
+        "status": batch.status,
+        "file_counts": count_files(batch.files.all()),
+    }
+
+
+class VectorStoreView(BaseOpenAIView):
+    """Base view for the vector store endpoints, scoped to the key's owner"""
+
+    def get_store(self, request, vector_store_id):
+        pk = vector_store_id.removeprefix("vs_")
+        try:
+            return VectorStore.objects.get(
+                pk=pk, user=request.auth.user, deleting=False
+            )
+        except (VectorStore.DoesNotExist, ValidationError, ValueError):
+            raise NotFoundError(
+                f"No vector store found with id '{vector_store_id}'.",
+                param="vector_store_id",
+            )
+
+    def apply_index_options(self, store, data):
+        """Set the store's search index from an optional ``index`` object"""
+        options = data.get("index")
+        if options is None:
+            return
+        if not isinstance(options, dict):
+            raise InvalidRequestError("index must be an object", param="index")
+
+        index_type = options.get("type", store.index_type)
+        nprobe = options.get("nprobe", store.index_nprobe)
+        quantization = options.get("quantization", store.quantization)
+        if index_type not in dict(VectorStore.INDEX_CHOICES):
+            raise InvalidRequestError(
+                "index.type must be 'flat' or 'ivf'", param="index.type"
             )
-        return JsonResponse({"object": "list", "data": data, "has_more": False})
+        if not isinstance(nprobe, int) or isinstance(nprobe, bool) or nprobe < 1:
+            raise InvalidRequestError(
+                "index.nprobe must be a positive integer", param="index.nprobe"
+            )
+        if quantization not in dict(VectorStore.QUANTIZATION_CHOICES):
+            raise InvalidRequestError(
+                "index.quantization must be 'none' or 'int8'",
+                param="index.quantization",
+            )
+        store.index_type = index_type
+        store.index_nprobe = nprobe
+        store.quantization = quantization
+
+
+class VectorStoreListCreateView(VectorStoreView):
+    def get(self, request):
+        stores = VectorStore.objects.filter(user=request.auth.user, deleting=False)
+        data = [serialize_vector_store(store) for store in stores]
+        return Response({"object": "list", "data": data, "has_more": False})
 
     def post(self, request):
-        body = json.loads(request.body.decode())
-        name = body.get("name", "Untitled")
-        description = body.get("description", "")
-        store = VectorStore.objects.create(
-            name=name, description=description, user=request.user
+        store = VectorStore(
+            name=request.data.get("name", "Untitled"),
+            description=request.data.get("description", ""),
+            user=request.auth.user,
         )
-        return JsonResponse(
-            {
-                "id": f"vs_{store.pk}",
-                "object": "vector_store",
-                "created_at": int(store.created_at.timestamp()),
-                "name": store.name,
-                "description": store.description,
-                "bytes": 0,
-                "file_counts": {
-                    "in_progress": 0,
-                    "completed": 0,
-                    "failed": 0,
-                    "cancelled": 0,
-                    "total": 0,
-                },
-            }
-        )
-
+        self.apply_index_options(store, request.data)
+        store.save()
+        return Response(serialize_vector_store(store))
 
-class VectorStoreRetrieveUpdateDeleteView(View):
-    def get_store(self, vector_store_id, user):
-        pk = vector_store_id.replace("vs_", "")
-        try:
-            return VectorStore.objects.get(pk=pk, user=user)
-        except VectorStore.DoesNotExist:
-            return None
 
+class VectorStoreRetrieveUpdateDeleteView(VectorStoreView):
     def get(self, request, vector_store_id):
-        store = self.get_store(vector_store_id, request.user)
-        if not store:
-            return HttpResponseNotFound()
-        return JsonResponse(
-            {
-                "id": f"vs_{store.pk}",
-                "object": "vector_store",
-                "created_at": int(store.created_at.timestamp()),
-                "name": store.name,
-                "description": store.description,
-                "bytes": 0,
-                "file_counts": {
-                    "in_progress": 0,
-                    "completed": 0,
-                    "failed": 0,
-                    "cancelled": 0,
-                    "total": 0,
-                },
-            }
-        )
+        store = self.get_store(request, vector_store_id)
+        file_processor.requeue_stale(store.pk)
+        return Response(serialize_vector_store(store))
 
     def post(self, request, vector_store_id):
-        store = self.get_store(vector_store_id, request.user)
-        if not store:
-            return HttpResponseNotFound()
-        body = json.loads(request.body.decode())
-        name = body.get("name")
-        description = body.get("description")
+        store = self.get_store(request, vector_store_id)
+        name = request.data.get("name")
+        description = request.data.get("description")
         if name is not None:
             store.name = name
         if description is not None:
             store.description = description
+        self.apply_index_options(store, request.data)
         store.save()
-        return JsonResponse(
-            {
-                "id": f"vs_{store.pk}",
-                "object": "vector_store",
-                "created_at": int(store.created_at.timestamp()),
-                "name": store.name,
-                "description": store.description,
-                "bytes": 0,
-                "file_counts": {
-                    "in_progress": 0,
-                    "completed": 0,
-                    "failed": 0,
-                    "cancelled": 0,
-                    "total": 0,
-                },
-            }
-        )
+        return Response(serialize_vector_store(store))
 
     def delete(self, request, vector_store_id):
-        store = self.get_store(vector_store_id, request.user)
-        if not store:
-            return HttpResponseNotFound()
-        store.delete()
-        return JsonResponse(
+        store = self.get_store(request, vector_store_id)
+        store_deleter.delete(store)
+        return Response(
             {"id": vector_store_id, "object": "vector_store.deleted", "deleted": True}
         )
 
 
-class VectorStoreSearchView(View):
-    def post(self, request, vector_store_id):
-        # Dummy implementation for search
-        body = json.loads(request.body.decode())
-        query = body.get("query", "")
-        # Return a dummy response
-        return JsonResponse(
+class VectorStoreSearchView(VectorStoreView):
+    """
+    Rank a vector store's entries by cosine similarity to the query,
+    optionally restricted by attribute ``filters``.
+    ``ranking_options.nprobe`` and ``ranking_options.exact`` tune the
+    recall/latency trade-off of stores with an IVF index.
+    ``ranking_options.hybrid_search`` fuses the ranking with BM25 keyword
+    search, weighted by its ``embedding_weight`` and ``text_weight``.
+    Results are cached per store version and index settings; the
+    ``X-Search-Cache`` header tells whether this response was a cache hit.
+    """
+
+    def parse_hybrid_search(self, hybrid):
+        if not isinstance(hybrid, dict):
+            raise InvalidRequestError(
+                "hybrid_search must be an object",
+                param="ranking_options.hybrid_search",
+            )
+        weights = {}
+        for name in ("embedding_weight", "text_weight"):
+            weight = hybrid.get(name, 1.0)
+            if (
+                not isinstance(weight, (int, float))
+                or isinstance(weight, bool)
+                or weight < 0
+            ):
+                raise InvalidRequestError(
+                    f"{name} must be a non-negative number",
+                    param=f"ranking_options.hybrid_search.{name}",
+                )
+            weights[name] = float(weight)
+        if not any(weights.values()):
+            raise InvalidRequestError(
+                "embedding_weight and text_weight cannot both be 0",
+                param="ranking_options.hybrid_search",
+            )
+        return weights
+
+    def parse_search(self, data):
+        """Validate a search request body; returns ``(query, options)``"""
+        query = data.get("query", "")
+        max_num_results = data.get("max_num_results", 10)
+        ranking_options = data.get("ranking_options") or {}
+        score_threshold = ranking_options.get("score_threshold", 0.0)
+        nprobe = ranking_options.get("nprobe")
+        exact = ranking_options.get("exact", False)
+        hybrid = ranking_options.get("hybrid_search")
+        filters = data.get("filters")
+
+        if not query or not isinstance(query, (str, list)):
+            raise InvalidRequestError(
+                "query must be a non-empty string or array of strings", param="query"
+            )
+        if isinstance(query, list) and not all(
+            isinstance(item, str) and item for item in query
+        ):
+            raise InvalidRequestError(
+                "query must be a non-empty string or array of strings", param="query"
+            )
+        if (
+            not isinstance(max_num_results, int)
+            or isinstance(max_num_results, bool)
+            or not 1 <= max_num_results <= 50
+        ):
+            raise InvalidRequestError(
+                "max_num_results must be an integer between 1 and 50",
+                param="max_num_results",
+            )
+        if not isinstance(score_threshold, (int, float)) or isinstance(
+            score_threshold, bool
+        ):
+            raise InvalidRequestError(
+                "score_threshold must be a number",
+                param="ranking_options.score_threshold",
+            )
+        if nprobe is not None and (
+            not isinstance(nprobe, int) or isinstance(nprobe, bool) or nprobe < 1
+        ):
+            raise InvalidRequestError(
+                "nprobe must be a positive integer", param="ranking_options.nprobe"
+            )
+        if not isinstance(exact, bool):
+            raise InvalidRequestError(
+                "exact must be a boolean", param="ranking_options.exact"
+            )
+        if hybrid is not None:
+            hybrid = self.parse_hybrid_search(hybrid)
+        if filters is not None:
+            validate_filters(filters)
+
+        return query, {
+            "max_num_results": max_num_results,
+            "score_threshold": score_threshold,
+            "nprobe": nprobe,
+            "exact": exact,
+            "filters": filters,
+            "hybrid": hybrid,
+        }
+
+    def search_response(self, query, results, cache_status):
+        response = Response(
             {
                 "object": "vector_store.search_results.page",
                 "search_query": query,
-                "data": [],
+                "data": results,
                 "has_more": False,
                 "next_page": None,
             }
         )
+        response["X-Search-Cache"] = cache_status
+        return response
+
+    def post(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        query, options = self.parse_search(request.data)
+        results, hit = cached_search(store, query, **options)
+        return self.search_response(query, results, "hit" if hit else "miss")
+
+
+class VectorStoreMultiSearchView(VectorStoreSearchView):
+    """
+    Search up to ``max_stores`` vector stores, listed in
+    ``vector_store_ids``, in parallel and return one page of the best
+    results across all of them. Each result names its ``vector_store_id``;
+    the other parameters are those of a single-store search.
+    """
+
+    max_stores = 20
+
+    def get_stores(self, request, vector_store_ids):
+        if (
+            not isinstance(vector_store_ids, list)
+            or not vector_store_ids
+            or not all(isinstance(item, str) for item in vector_store_ids)
+        ):
+            raise InvalidRequestError(
+                "vector_store_ids must be a non-empty array of strings",
+                param="vector_store_ids",
+            )
+        vector_store_ids = list(dict.fromkeys(vector_store_ids))
+        if len(vector_store_ids) > self.max_stores:
+            raise InvalidRequestError(
+                f"At most {self.max_stores} vector stores can be searched at once",
+                param="vector_store_ids",
+            )
+
+        pks = {}
+        for vector_store_id in vector_store_ids:
+            try:
+                pks[vector_store_id] = uuid.UUID(vector_store_id.removeprefix("vs_"))
+            except ValueError:
+                pks[vector_store_id] = None
+        stores = VectorStore.objects.filter(
+            pk__in=[pk for pk in pks.values() if pk],
+            user=request.auth.user,
+            deleting=False,
+        ).in_bulk()
+        for vector_store_id, pk in pks.items():
+            if pk not in stores:
+                raise NotFoundError(
+                    f"No vector store found with id '{vector_store_id}'.",
+                    param="vector_store_ids",
+                )
+        return [stores[pks[vector_store_id]] for vector_store_id in vector_store_ids]
+
+    def post(self, request):
+        stores = self.get_stores(request, request.data.get("vector_store_ids"))
+        query, options = self.parse_search(request.data)
+        results, hits = federated_search.search(stores, query, **options)
+        if hits == len(stores):
+            cache_status = "hit"
+        else:
+            cache_status = "partial" if hits else "miss"
+        return self.search_response(query, results, cache_status)
+
+
+class VectorStoreEntriesView(VectorStoreView):
+    """
+    Bulk-insert entries from an NDJSON body, one ``{"document_name",
+    "embedding", "metadata"}`` object per line. The body is streamed, so
+    it can be far larger than memory.
+    """
+
+    def post(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        result = ingest_lines(store, request._request)
+        return Response(
+            {
+                "object": "vector_store.entries.bulk_result",
+                "vector_store_id": f"vs_{store.pk}",
+                **result.as_dict(),
+            }
+        )
+
+
+class VectorStoreSnapshotView(VectorStoreView):
+    """Download a store as a binary snapshot (see ``vector_search/snapshots.py``)"""
+
+    def get(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        # Removed by the OS once the response closes it
+        snapshot = tempfile.TemporaryFile()
+        try:
+            export_snapshot(store, snapshot)
+        except BaseException:
+            snapshot.close()
+            raise
+        snapshot.seek(0)
+        return FileResponse(snapshot, as_attachment=True, filename=f"vs_{store.pk}.npz")
+
+
+class VectorStoreSnapshotRestoreView(VectorStoreView):
+    """
+    Create a vector store from a snapshot sent as the request body. The
+    ``name`` query parameter overrides the snapshot's store name.
+    """
+
+    def post(self, request):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.npz")
+            with open(path, "wb") as upload:
+                shutil.copyfileobj(request._request, upload)
+            # Returns once its memory maps of the file are released
+            store = restore_snapshot(
+                path, request.auth.user, request.query_params.get("name")
+            )
+        return Response(serialize_vector_store(store))
+
+
+class VectorStoreFilesMixin:
+    """Lookup, attachment and listing helpers for the file endpoints"""
+
+    def lookup(self, queryset, pk, message, param, **lookups):
+        if pk is not None:
+            lookups["pk"] = pk
+        try:
+            return queryset.get(**lookups)
+        except (ObjectDoesNotExist, ValidationError, ValueError):
+            raise NotFoundError(message, param=param)
+
+    def get_stored_file(self, request, file_id):
+        if not isinstance(file_id, str):
+            raise InvalidRequestError("file_id must be a string", param="file_id")
+        return self.lookup(
+            StoredFile.objects.filter(user=request.auth.user),
+            file_id.removeprefix("file-"),
+            f"No file found with id '{file_id}'.",
+            "file_id",
+        )
+
+    def get_vector_store_file(self, store, file_id):
+        return self.lookup(
+            VectorStoreFile.objects.filter(vector_store=store).select_related("file"),
+            None,
+            f"No file found with id '{file_id}' in vector store 'vs_{store.pk}'.",
+            "file_id",
+            file_id=file_id.removeprefix("file-"),
+        )
+
+    def get_batch(self, store, batch_id):
+        return self.lookup(
+            VectorStoreFileBatch.objects.filter(vector_store=store),
+            batch_id.removeprefix("vsfb_"),
+            f"No file batch found with id '{batch_id}'.",
+            "batch_id",
+        )
+
+    def attach_files(self, store, stored_files, data, batch=None):
+        """Create ``VectorStoreFile`` rows and queue them for processing"""
+        chunking_strategy = parse_chunking_strategy(data.get("chunking_strategy"))
+        attributes = data.get("attributes")
+        if attributes is not None and not isinstance(attributes, dict):
+            raise InvalidRequestError("attributes must be an object", param="attributes")
+
+        attached = []
+        created_count = 0
+        with transaction.atomic():
+            for stored_file in stored_files:
+                try:
+                    with transaction.atomic():
+                        vector_store_file = VectorStoreFile.objects.create(
+                            vector_store=store,
+                            file=stored_file,
+                            batch=batch,
+                            attributes=attributes,
+                            chunking_strategy=chunking_strategy,
+                        )
+                    created = True
+                except IntegrityError:
+                    # Already attached, possibly by a request racing this one
+                    vector_store_file = VectorStoreFile.objects.get(
+                        vector_store=store, file=stored_file
+                    )
+                    created = False
+                if created:
+                    created_count += 1
+                    file_processor.enqueue(vector_store_file.pk)
+                attached.append(vector_store_file)
+            VectorStore.adjust_file_stats(store.pk, in_progress=created_count)
+        return attached
+
+    def list_files(self, request, files):
+        """Page through ``files`` using the limit, order, after and filter parameters"""
+        params = request.query_params
+        try:
+            limit = int(params.get("limit", 20))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 100:
+            raise InvalidRequestError(
+                "limit must be an integer between 1 and 100", param="limit"
+            )
+        status_filter = params.get("filter")
+        if status_filter:
+            files = files.filter(status=status_filter)
+
+        descending = params.get("order", "desc") == "desc"
+        files = files.order_by(
+            *(["-created_at", "-pk"] if descending else ["created_at", "pk"])
+        )
+        after = params.get("after")
+        if after:
+            try:
+                cursor = files.filter(file_id=after.removeprefix("file-")).first()
+            except ValidationError:
+                cursor = None
+            if cursor is None:
+                raise InvalidRequestError(f"No file found with id '{after}'.", param="after")
+            if descending:
+                files = files.filter(
+                    Q(created_at__lt=cursor.created_at)
+                    | Q(created_at=cursor.created_at, pk__lt=cursor.pk)
+                )
+            else:
+                files = files.filter(
+                    Q(created_at__gt=cursor.created_at)
+                    | Q(created_at=cursor.created_at, pk__gt=cursor.pk)
+                )
+
+        page = list(files[: limit + 1])
+        data = [serialize_vector_store_file(f) for f in page[:limit]]
+        return Response(
+            {
+                "object": "list",
+                "data": data,
+                "first_id": data[0]["id"] if data else None,
+                "last_id": data[-1]["id"] if data else None,
+                "has_more": len(page) > limit,
+            }
+        )
+
+
+class VectorStoreFilesView(VectorStoreFilesMixin, VectorStoreView):
+    """Attach a stored file to a vector store, or list attached files"""
+
+    def get(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        file_processor.requeue_stale(store.pk)
+        return self.list_files(request, VectorStoreFile.objects.filter(vector_store=store))
+
+    def post(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        stored_file = self.get_stored_file(request, request.data.get("file_id"))
+        (vector_store_file,) = self.attach_files(store, [stored_file], request.data)
+        return Response(serialize_vector_store_file(vector_store_file))
+
+
+class VectorStoreFileDetailView(VectorStoreFilesMixin, VectorStoreView):
+    def get(self, request, vector_store_id, file_id):
+        store = self.get_store(request, vector_store_id)
+        file_processor.requeue_stale(store.pk)
+        vector_store_file = self.get_vector_store_file(store, file_id)
+        return Response(serialize_vector_store_file(vector_store_file))
+
+    def delete(self, request, vector_store_id, file_id):
+        """Detach a file and remove its chunks; the stored file is kept"""
+        store = self.get_store(request, vector_store_id)
+        vector_store_file = self.get_vector_store_file(store, file_id)
+        # A worker still processing the file stops at its next chunk
+        cancel_files(store.pk, VectorStoreFile.objects.filter(pk=vector_store_file.pk))
+        with transaction.atomic():
+            # Re-read the row locked so the stats released match its status
+            vector_store_file = (
+                VectorStoreFile.objects.select_for_update()
+                .filter(pk=vector_store_file.pk)
+                .first()
+            )
+            if vector_store_file is not None:
+                # Its pre_delete receiver removes the chunks
+                vector_store_file.delete()
+        return Response(
+            {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+        )
+
+
+class VectorStoreFileBatchCreateView(VectorStoreFilesMixin, VectorStoreView):
+    def post(self, request, vector_store_id):
+        store = self.get_store(request, vector_store_id)
+        file_ids = request.data.get("file_ids")
+        if not isinstance(file_ids, list) or not 1 <= len(file_ids) <= 500:
+            raise InvalidRequestError(
+                "file_ids must be a list of 1 to 500 file ids", param="file_ids"
+            )
+        stored_files = [self.get_stored_file(request, file_id) for file_id in file_ids]
+
+        with transaction.atomic():
+            batch = VectorStoreFileBatch.objects.create(vector_store=store)
+            attached = self.attach_files(store, stored_files, request.data, batch)
+            if not any(f.batch_id == batch.pk for f in attached):
+                # Every file was already attached: nothing left to process
+                batch.status = "completed"
+                batch.save(update_fields=["status", "updated_at"])
+        return Response(serialize_file_batch(batch))
+
+
+class VectorStoreFileBatchDetailView(VectorStoreFilesMixin, VectorStoreView):
+    def get(self, request, vector_store_id, batch_id):
+        store = self.get_store(request, vector_store_id)
+        file_processor.requeue_stale(store.pk)
+        return Response(serialize_file_batch(self.get_batch(store, batch_id)))
+
+
+class VectorStoreFileBatchCancelView(VectorStoreFilesMixin, VectorStoreView):
+    def post(self, request, vector_store_id, batch_id):
+        """Stop processing the batch's remaining files"""
+        store = self.get_store(request, vector_store_id)
+        batch = self.get_batch(store, batch_id)
+        with transaction.atomic():
+            cancel_files(store.pk, batch.files.all())
+            VectorStoreFileBatch.objects.filter(
+                pk=batch.pk, status="in_progress"
+            ).update(status="cancelled")
+        batch.refresh_from_db()
+        return Response(serialize_file_batch(batch))
+
+
+class VectorStoreFileBatchFilesView(VectorStoreFilesMixin, VectorStoreView):
+    def get(self, request, vector_store_id, batch_id):
+        store = self.get_store(request, vector_store_id)
+        file_processor.requeue_stale(store.pk)
+        batch = self.get_batch(store, batch_id)
+        return self.list_files(request, batch.files.all())
@@ -7,5 +7,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "openai_mock_server.settings")
+# Serve the /v1 endpoints with native async views
+os.environ.setdefault("OPENAI_API_ASYNC", "True")
 
 application = get_asgi_application()
@@ -74,6 +74,9 @@ DATABASES = {
     }
 }
 
+# Stops the background workers before the test database is destroyed
+TEST_RUNNER = "core.test_runner.TestRunner"
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,6 +125,94 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
 }
 
+# API key authentication cache (per process). Edits made in another
+# process become visible once the TTL expires; set the TTL to 0 to disable.
+API_KEY_CACHE_TTL = config("API_KEY_CACHE_TTL", default=30, cast=float)
+API_KEY_CACHE_MAX_SIZE = config("API_KEY_CACHE_MAX_SIZE", default=1024, cast=int)
+
+# APIKey.last_used is written back at most once per key per interval
+# (seconds). Set to 0 to write it on every request.
+API_KEY_LAST_USED_INTERVAL = config("API_KEY_LAST_USED_INTERVAL", default=30, cast=float)
+
+# Per-minute rate limiting for /v1 endpoints. The "shared" backend keeps
+# token buckets in a memory-mapped file shared by all workers on the host;
+# "memory" keeps them per process.
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="shared")
+RATE_LIMIT_SHARED_PATH = config("RATE_LIMIT_SHARED_PATH", default=None)
+RATE_LIMIT_SHARED_SLOTS = config("RATE_LIMIT_SHARED_SLOTS", default=4096, cast=int)
+RATE_LIMIT_SNAPSHOT_INTERVAL = config(
+    "RATE_LIMIT_SNAPSHOT_INTERVAL", default=60, cast=float
+)
+
+# Daily quotas per plan (None means unlimited). A key's requests_per_day
+# further lowers the request quota. Counters use the rate limit backend.
+QUOTA_ENABLED = config("QUOTA_ENABLED", default=True, cast=bool)
+QUOTA_SHARED_PATH = config("QUOTA_SHARED_PATH", default=None)
+API_PLAN_QUOTAS = {
+    "free": {"requests_per_day": 1000, "tokens_per_day": 100000},
+    "basic": {"requests_per_day": 10000, "tokens_per_day": 1000000},
+    "premium": {"requests_per_day": 100000, "tokens_per_day": 10000000},
+    "enterprise": {"requests_per_day": None, "tokens_per_day": None},
+}
+
+# Simulated latency for streamed chat completions (stream=true)
+STREAM_TIME_TO_FIRST_TOKEN_MS = config(
+    "STREAM_TIME_TO_FIRST_TOKEN_MS", default=200, cast=float
+)
+STREAM_INTER_TOKEN_DELAY_MS = config("STREAM_INTER_TOKEN_DELAY_MS", default=20, cast=float)
+
+# Serve /v1 with the async views in openai_api.async_views. Enabled by
+# default when running through openai_mock_server.asgi.
+OPENAI_API_ASYNC = config("OPENAI_API_ASYNC", default=False, cast=bool)
+
+# Embeddings are "random" or "deterministic" (derived from the input text
+# by feature hashing, so similar texts get similar vectors). Deterministic
+# vectors are cached up to EMBEDDING_CACHE_MAX_BYTES.
+EMBEDDING_MODE = config("EMBEDDING_MODE", default="random")
+EMBEDDING_CACHE_MAX_BYTES = config(
+    "EMBEDDING_CACHE_MAX_BYTES", default=128 * 1024 * 1024, cast=int
+)
+
+# Vector store search: queries are embedded deterministically with this model
+VECTOR_STORE_EMBEDDING_MODEL = config(
+    "VECTOR_STORE_EMBEDDING_MODEL", default="text-embedding-3-small"
+)
+# Memory-mapped embedding segments and IVF indexes are saved here. Stores
+# with index_type "ivf" are still searched exhaustively below
+# VECTOR_INDEX_MIN_ENTRIES entries; segments are compacted once a store
+# has more than VECTOR_SEGMENT_MAX_COUNT of them.
+VECTOR_INDEX_DIR = config("VECTOR_INDEX_DIR", default=str(BASE_DIR / "vector_indexes"))
+VECTOR_INDEX_MIN_ENTRIES = config("VECTOR_INDEX_MIN_ENTRIES", default=1000, cast=int)
+VECTOR_SEGMENT_MAX_COUNT = config("VECTOR_SEGMENT_MAX_COUNT", default=16, cast=int)
+# Stores with int8 quantization rescore this many candidates per result
+VECTOR_RESCORE_FACTOR = config("VECTOR_RESCORE_FACTOR", default=4, cast=int)
+# Entries per bulk_create/transaction when ingesting NDJSON
+VECTOR_INGEST_CHUNK_SIZE = config("VECTOR_INGEST_CHUNK_SIZE", default=2000, cast=int)
+# Threads chunking and embedding files attached to vector stores
+VECTOR_STORE_FILE_WORKERS = config("VECTOR_STORE_FILE_WORKERS", default=2, cast=int)
+# In-progress files untouched this long (their worker died) are requeued
+VECTOR_STORE_FILE_STALE_SECONDS = config(
+    "VECTOR_STORE_FILE_STALE_SECONDS", default=600, cast=int
+)
+# Threads searching the stores of a multi-store search in parallel
+VECTOR_SEARCH_WORKERS = config("VECTOR_SEARCH_WORKERS", default=4, cast=int)
+# Search results cached per worker (LRU, keyed on the store version); 0 disables
+VECTOR_SEARCH_CACHE_SIZE = config("VECTOR_SEARCH_CACHE_SIZE", default=1024, cast=int)
+# Stores loaded by the gunicorn master before forking workers (see
+# gunicorn.conf.py): comma-separated store ids, or "*" for every store
+VECTOR_PRELOAD_STORES = config("VECTOR_PRELOAD_STORES", default="")
+# Entries removed per transaction when a vector store is deleted
+VECTOR_DELETE_BATCH_SIZE = config("VECTOR_DELETE_BATCH_SIZE", default=1000, cast=int)
+
+# Usage logging
+# "sync" writes each usage record on the request thread; "buffered" queues
+# records in memory and writes them in batches from a background thread.
+USAGE_LOGGING_MODE = config("USAGE_LOGGING_MODE", default="sync")
+USAGE_BUFFER_MAX_SIZE = config("USAGE_BUFFER_MAX_SIZE", default=10000, cast=int)
+USAGE_FLUSH_BATCH_SIZE = config("USAGE_FLUSH_BATCH_SIZE", default=500, cast=int)
+USAGE_FLUSH_INTERVAL = config("USAGE_FLUSH_INTERVAL", default=2.0, cast=float)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",